@@ -1,7 +1,6 @@
 # Generated by Django 5.2 on 2025-09-03 02:51
 
-import django_mysql.models
-from django.db import migrations
+from django.db import migrations, models
 
 
 class Migration(migrations.Migration):
@@ -14,11 +13,11 @@ class Migration(migrations.Migration):
         migrations.AlterField(
             model_name='users',
             name='gender',
-            field=django_mysql.models.EnumField(choices=[('CISMALE', 'CISMALE'), ('CISFEMALE', 'CISFEMALE'), ('TRANSMALE', 'TRANSMALE'), ('TRANSFEMALE', 'TRANSFEMALE'), ('NONBINARY', 'NONBINARY'), ('INTERSEX', 'INTERSEX'), ('AGENDER', 'AGENDER'), ('OTHER', 'OTHER'), ('PREFERNOTTOSAY', 'PREFERNOTTOSAY')], null=True),
+            field=models.CharField(choices=[('CISMALE', 'CISMALE'), ('CISFEMALE', 'CISFEMALE'), ('TRANSMALE', 'TRANSMALE'), ('TRANSFEMALE', 'TRANSFEMALE'), ('NONBINARY', 'NONBINARY'), ('INTERSEX', 'INTERSEX'), ('AGENDER', 'AGENDER'), ('OTHER', 'OTHER'), ('PREFERNOTTOSAY', 'PREFERNOTTOSAY')], max_length=100, null=True),
         ),
         migrations.AlterField(
             model_name='users',
             name='sexuality',
-            field=django_mysql.models.EnumField(choices=[('HETEROSEXUAL', 'HETEROSEXUAL'), ('HOMOSEXUAL', 'HOMOSEXUAL'), ('BISEXUAL', 'BISEXUAL'), ('ASEXUAL', 'ASEXUAL'), ('PANSEXUAL', 'PANSEXUAL'), ('DEMISEXUAL', 'DEMISEXUAL'), ('POLYSEXUAL', 'POLYSEXUAL'), ('OTHER', 'OTHER'), ('PREFERNOTTOSAY', 'PREFERNOTTOSAY')], null=True),
+            field=models.CharField(choices=[('HETEROSEXUAL', 'HETEROSEXUAL'), ('HOMOSEXUAL', 'HOMOSEXUAL'), ('BISEXUAL', 'BISEXUAL'), ('ASEXUAL', 'ASEXUAL'), ('PANSEXUAL', 'PANSEXUAL'), ('DEMISEXUAL', 'DEMISEXUAL'), ('POLYSEXUAL', 'POLYSEXUAL'), ('OTHER', 'OTHER'), ('PREFERNOTTOSAY', 'PREFERNOTTOSAY')], max_length=100, null=True),
         ),
     ]
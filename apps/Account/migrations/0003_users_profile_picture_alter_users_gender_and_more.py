@@ -1,8 +1,7 @@
 # Generated by Django 5.2 on 2026-03-30 17:57
 
 import cloudinary.models
-import django_mysql.models
-from django.db import migrations
+from django.db import migrations, models
 
 
 class Migration(migrations.Migration):
@@ -22,7 +21,7 @@ class Migration(migrations.Migration):
         migrations.AlterField(
             model_name="users",
             name="gender",
-            field=django_mysql.models.EnumField(
+            field=models.CharField(
                 choices=[
                     ("CISMALE", "CISMALE"),
                     ("CISFEMALE", "CISFEMALE"),
@@ -32,13 +31,14 @@ class Migration(migrations.Migration):
                     ("OTHER", "OTHER"),
                     ("PREFERNOTTOSAY", "PREFERNOTTOSAY"),
                 ],
+                max_length=100,
                 null=True,
             ),
         ),
         migrations.AlterField(
             model_name="users",
             name="sexuality",
-            field=django_mysql.models.EnumField(
+            field=models.CharField(
                 choices=[
                     ("HETEROSEXUAL", "HETEROSEXUAL"),
                     ("HOMOSEXUAL", "HOMOSEXUAL"),
@@ -48,6 +48,7 @@ class Migration(migrations.Migration):
                     ("OTHER", "OTHER"),
                     ("PREFERNOTTOSAY", "PREFERNOTTOSAY"),
                 ],
+                max_length=100,
                 null=True,
             ),
         ),
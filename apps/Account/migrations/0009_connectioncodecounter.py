@@ -0,0 +1,31 @@
+# Generated by Django 5.2 on 2026-10-19 14:28
+
+from django.db import migrations, models
+
+
+def create_counter(apps, schema_editor):
+    ConnectionCodeCounter = apps.get_model("Account", "ConnectionCodeCounter")
+    ConnectionCodeCounter.objects.get_or_create(pk=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("Account", "0008_alter_users_profile_picture"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ConnectionCodeCounter",
+            fields=[
+                (
+                    "id",
+                    models.PositiveSmallIntegerField(
+                        default=1, primary_key=True, serialize=False
+                    ),
+                ),
+                ("next_value", models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(create_counter, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2 on 2026-10-19 14:39
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def set_partners(apps, schema_editor):
+    Users = apps.get_model("Account", "Users")
+    Relationship = apps.get_model("Relationships", "Relationship")
+    for relationship in Relationship.objects.order_by("id").iterator():
+        Users.objects.filter(pk=relationship.user_one_id).update(
+            partner_id=relationship.user_two_id, current_relationship=relationship)
+        Users.objects.filter(pk=relationship.user_two_id).update(
+            partner_id=relationship.user_one_id, current_relationship=relationship)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("Account", "0009_connectioncodecounter"),
+        ("Relationships", "0003_alter_relationshiprequest_status"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="users",
+            name="current_relationship",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="Relationships.relationship",
+            ),
+        ),
+        migrations.AddField(
+            model_name="users",
+            name="partner",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.RunPython(set_partners, migrations.RunPython.noop),
+    ]
@@ -48,6 +48,19 @@ class Users(AbstractUser):
     has_accepted_terms_and_conditions = models.BooleanField(default=False)
     has_accepted_privacy_policy = models.BooleanField(default=False)
 
+    # Denormalised from Relationship (see apps.Relationships.signals) so the
+    # partner is one join away
+    partner = models.ForeignKey(
+        "self", on_delete=models.SET_NULL, null=True, blank=True, related_name="+"
+    )
+    current_relationship = models.ForeignKey(
+        "Relationships.Relationship",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+
     def save(self, *args, **kwargs):
         super().save(*args, **kwargs)
         from apps.Privacy.models import UserPrivacy
@@ -56,3 +69,12 @@ class Users(AbstractUser):
 
     def __str__(self):
         return self.username
+
+
+class ConnectionCodeCounter(models.Model):
+    """
+    Single row holding the next counter value of
+    ``apps.Account.utils.ConnectionCodeAllocator``. Only ever moves forward.
+    """
+    id = models.PositiveSmallIntegerField(primary_key=True, default=1)
+    next_value = models.BigIntegerField(default=0)
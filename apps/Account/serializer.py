@@ -1,11 +1,10 @@
 from allauth.account.adapter import get_adapter
 from allauth.utils import get_username_max_length
 from django.db import transaction
-from django.db.models import Q
 from rest_framework import serializers
 
 from apps.Account.models import Gender, Sexuality, Users
-from apps.Account.utils import email_to_code
+from apps.Account.utils import connection_codes
 
 
 class CustomRegisterSerializer(serializers.Serializer):
@@ -56,7 +55,7 @@ class CustomRegisterSerializer(serializers.Serializer):
         user.password1 = self.validated_data["password1"]
         user.password2 = self.validated_data["password2"]
 
-        user.connection_code = email_to_code(self.validated_data["email"])
+        user.connection_code = self.connection_code
         user.has_accepted_terms_and_conditions = self.validated_data[
             "has_accepted_terms_and_conditions"
         ]
@@ -96,14 +95,17 @@ class CustomRegisterSerializer(serializers.Serializer):
             "username": self.validated_data["username"],
         }
 
-    @transaction.atomic
     def save(self, request):
-        adapter = get_adapter()
-        user = adapter.new_user(request)
-        self.cleaned_data = self.get_cleaned_data()
-        adapter.save_user(request, user, self)
-        self.custom_signup(user)
-        user.save()
+        # Allocated before the transaction: a failed signup must not roll
+        # back the allocator's counter, or its codes would be handed out twice
+        self.connection_code = connection_codes.allocate()
+        with transaction.atomic():
+            adapter = get_adapter()
+            user = adapter.new_user(request)
+            self.cleaned_data = self.get_cleaned_data()
+            adapter.save_user(request, user, self)
+            self.custom_signup(user)
+            user.save()
 
         return user
 
@@ -129,7 +131,9 @@ class CustomUserDetailsSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Users
-        exclude = ("password",)  # Exclude password for security
+        # Exclude password for security; the partner pointers are served
+        # through "relationship"
+        exclude = ("password", "partner", "current_relationship")
         read_only_fields = (
             "id",
             "date_joined",
@@ -139,22 +143,19 @@ class CustomUserDetailsSerializer(serializers.ModelSerializer):
         )
 
     def get_relationship(self, obj):
-        from apps.Relationships.models import Relationship
-
-        rel = Relationship.objects.filter(Q(user_one=obj) | Q(user_two=obj)).first()
-        if rel:
-            if rel.user_one.username == obj.username:
-                partner = rel.user_two
-            else:
-                partner = rel.user_one
-
-            return {
-                "relationship_start_date": rel.relationship_start_date,
-                "partner": {
-                    "name": partner.first_name + " " + partner.last_name,
-                    "username": partner.username,
-                    "id": partner.id,
-                },
-            }
-        else:
+        if obj.partner_id is None:
             return None
+        if not (Users.partner.is_cached(obj) and Users.current_relationship.is_cached(obj)):
+            # One query for both, unless the caller already select_related them
+            obj = Users.objects.select_related("partner", "current_relationship").get(pk=obj.pk)
+        partner = obj.partner
+        rel = obj.current_relationship
+
+        return {
+            "relationship_start_date": rel.relationship_start_date if rel else None,
+            "partner": {
+                "name": partner.first_name + " " + partner.last_name,
+                "username": partner.username,
+                "id": partner.id,
+            },
+        }
@@ -0,0 +1,24 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.Account.models import Users
+from services.connection_code_cache import connection_code_cache
+from services.user_availability import user_availability
+from services.websocket.user_cache import user_cache
+
+
+@receiver([post_save, post_delete], sender=Users)
+def invalidate_user_cache(sender, instance, **kwargs):
+    user_cache.invalidate(instance.pk)
+    if instance.connection_code:
+        connection_code_cache.invalidate(instance.connection_code)
+
+
+@receiver(post_save, sender=Users)
+def mark_user_taken(sender, instance, **kwargs):
+    user_availability.user_saved(instance)
+
+
+@receiver(post_delete, sender=Users)
+def forget_user(sender, instance, **kwargs):
+    user_availability.user_deleted(instance)
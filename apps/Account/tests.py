@@ -1,18 +1,29 @@
+import threading
+from datetime import date
 from io import BytesIO
+from unittest import mock
 
 from PIL import Image
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient, APITestCase
 
-from apps.Account.models import Gender, Sexuality, Users
+from apps.Account.models import ConnectionCodeCounter, Gender, Sexuality, Users
 from apps.Account.serializer import (
     CustomRegisterSerializer,
     CustomUserDetailsSerializer,
 )
-from apps.Account.utils import email_to_code
+from apps.Account.utils import (
+    CODE_SPACE,
+    CodePermutation,
+    ConnectionCodeAllocator,
+    email_to_code,
+    int_to_code,
+)
+from services.user_availability import BloomFilter, UserAvailability, user_availability
 
 
 class GenderEnumTest(TestCase):
@@ -123,6 +134,71 @@ class EmailToCodeUtilTest(TestCase):
         self.assertNotEqual(code1, code2)
 
 
+class ConnectionCodeAllocatorTest(TestCase):
+    """Test the connection code allocator"""
+
+    def setUp(self):
+        # Created by migration 0009, but not under --nomigrations or after a flush
+        self.start = ConnectionCodeCounter.objects.get_or_create(pk=1)[0].next_value
+
+    def test_permutation_is_a_bijection(self):
+        """Test distinct counters give distinct codes inside the code space"""
+        permutation = CodePermutation("test-key")
+        values = [permutation.permute(i) for i in range(20000)]
+        self.assertEqual(len(set(values)), len(values))
+        self.assertTrue(all(0 <= value < CODE_SPACE for value in values))
+        other = CodePermutation("other-key")
+        self.assertNotEqual(values[:10], [other.permute(i) for i in range(10)])
+        self.assertEqual(int_to_code(CODE_SPACE - 1), "ZZZZZZ")
+        self.assertEqual(int_to_code(0), "000000")
+
+    def test_blocks_are_reserved_from_the_counter(self):
+        """Test two allocators (two processes) never share a counter value"""
+        first = ConnectionCodeAllocator("test-key", block_size=10)
+        second = ConnectionCodeAllocator("test-key", block_size=10)
+
+        # One SELECT ... FOR UPDATE and one UPDATE (in a savepoint) per block
+        with self.assertNumQueries(4):
+            codes = [first.next_code() for _ in range(10)]
+        codes += [second.next_code() for _ in range(10)]
+        codes += [first.next_code() for _ in range(5)]
+
+        self.assertEqual(len(set(codes)), 25)
+        self.assertEqual(ConnectionCodeCounter.objects.get().next_value, self.start + 30)
+
+    def test_taken_codes_are_skipped(self):
+        """Test codes issued before the allocator are never handed out again"""
+        allocator = ConnectionCodeAllocator("test-key", block_size=10)
+        start = self.start
+        legacy_code = int_to_code(allocator.permutation.permute(start))
+        Users.objects.create_user(
+            username="legacy", email="legacy@example.com", password="password123",
+            connection_code=legacy_code)
+
+        code = allocator.allocate()
+
+        self.assertNotEqual(code, legacy_code)
+        self.assertEqual(code, int_to_code(allocator.permutation.permute(start + 1)))
+        # One extra counter value was used up by the skipped code
+        self.assertEqual(allocator.next_value(), start + 2)
+
+    def test_registration_uses_the_allocator(self):
+        """Test signing up assigns a fresh 6 character code"""
+        response = self.client.post(reverse("rest_register"), {
+            "first_name": "John",
+            "last_name": "Doe",
+            "email": "signup@example.com",
+            "username": "signup",
+            "password1": "strongpassword123",
+            "password2": "strongpassword123",
+        })
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        code = Users.objects.get(username="signup").connection_code
+        self.assertEqual(len(code), 6)
+        self.assertNotEqual(code, email_to_code("signup@example.com"))
+
+
 class CustomRegisterSerializerTest(TestCase):
     """Test CustomRegisterSerializer functionality"""
 
@@ -422,3 +498,142 @@ class CustomUserDetailsSerializerTest(TestCase):
         self.assertIn("username", data)
         self.assertIn("email", data)
         self.assertIn("id", data)
+
+    def test_relationship_without_partner_costs_no_query(self):
+        """Test users without a partner are serialized without touching relationships"""
+        with self.assertNumQueries(0):
+            self.assertIsNone(CustomUserDetailsSerializer().get_relationship(self.user))
+
+    def test_relationship_is_one_join_away(self):
+        """Test the partner pointer is maintained and resolved in a single query"""
+        from apps.Relationships.models import Relationship
+
+        partner = Users.objects.create_user(
+            username="partner", email="partner@example.com", password="testpassword123",
+            connection_code="PARTN1", first_name="Par", last_name="Tner")
+        relationship = Relationship.objects.create(
+            user_one=self.user, user_two=partner, relationship_start_date=date(2024, 2, 14))
+        user = Users.objects.get(pk=self.user.pk)
+        self.assertEqual(user.partner_id, partner.id)
+
+        with self.assertNumQueries(1):
+            relationship_data = CustomUserDetailsSerializer().get_relationship(user)
+        self.assertEqual(relationship_data, {
+            "relationship_start_date": date(2024, 2, 14),
+            "partner": {"name": "Par Tner", "username": "partner", "id": partner.id},
+        })
+        self.assertNotIn("partner", CustomUserDetailsSerializer(user).data)
+
+        user = Users.objects.select_related("partner", "current_relationship").get(pk=partner.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                CustomUserDetailsSerializer().get_relationship(user)["partner"]["id"], self.user.id)
+
+        Relationship.objects.filter(pk=relationship.pk).delete()
+        self.assertFalse(Users.objects.filter(partner__isnull=False).exists())
+        self.assertFalse(Users.objects.filter(current_relationship__isnull=False).exists())
+
+
+class BloomFilterTest(SimpleTestCase):
+    def test_no_false_negatives_and_bounded_false_positives(self):
+        bloom = BloomFilter(capacity=2000, error_rate=0.01)
+        for i in range(2000):
+            bloom.add(f"user{i}")
+
+        self.assertTrue(all(f"user{i}" in bloom for i in range(2000)))
+        false_positives = sum(f"other{i}" in bloom for i in range(10000))
+        self.assertLess(false_positives, 300)
+
+
+class UserAvailabilityTest(APITestCase):
+    """Test the signup form's username/email availability check"""
+
+    def setUp(self):
+        cache.clear()
+        user_availability.clear()
+        self.url = reverse("get_user_by_username")
+        self.user = Users.objects.create_user(
+            username="taken", email="taken@example.com", password="testpassword123",
+            connection_code="TAKE01")
+        # Builds the Bloom filter
+        self.client.get(self.url, {"username": "warmup"})
+
+    def test_unknown_names_cost_no_query(self):
+        with self.assertNumQueries(0):
+            for i in range(20):
+                response = self.client.get(self.url, {"username": f"scraped{i}"})
+                self.assertEqual(response.data["user_count"], 0)
+
+    def test_taken_answers_are_cached(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(self.url, {"email": "taken@example.com"}).data["user_count"], 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(self.url, {"email": "taken@example.com"}).data["user_count"], 1)
+
+    def test_registration_and_deletion_update_answers(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            newbie = Users.objects.create_user(
+                username="newbie", email="newbie@example.com", password="testpassword123",
+                connection_code="NEWB01")
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(self.url, {"username": "newbie"}).data["user_count"], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            newbie.delete()
+        # Still in the Bloom filter: checked once, then the negative is cached
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(self.url, {"username": "newbie"}).data["user_count"], 0)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(self.url, {"username": "newbie"}).data["user_count"], 0)
+
+    def test_answers_ignore_case(self):
+        """Test a signup updates the cached answer for every casing"""
+        self.assertFalse(user_availability.is_taken("username", "NEWCOMER"))
+        with self.captureOnCommitCallbacks(execute=True):
+            Users.objects.create_user(
+                username="newcomer", email="newcomer@example.com", password="testpassword123",
+                connection_code="NEWC01")
+
+        with self.assertNumQueries(0):
+            self.assertTrue(user_availability.is_taken("username", "NEWCOMER"))
+
+    def test_both_fields_use_cached_answers(self):
+        """Test a user registered by another worker is found despite its stale filter"""
+        with self.captureOnCommitCallbacks(execute=True):
+            Users.objects.create_user(
+                username="elsewhere", email="elsewhere@example.com", password="testpassword123",
+                connection_code="ELSE01")
+        user_availability.bloom = BloomFilter(100)
+
+        response = self.client.get(self.url, {"username": "elsewhere", "email": "elsewhere@example.com"})
+
+        self.assertEqual(response.data["user_count"], 1)
+
+    def test_available_answer_never_overrides_taken(self):
+        """Test a signup committing during the lookup keeps its "taken" answer"""
+        def signup_commits(field, value):
+            cache.set(user_availability.key(field, value), True)
+            return True
+
+        with mock.patch.object(user_availability, "might_exist", side_effect=signup_commits):
+            self.assertFalse(user_availability.is_taken("username", "racer"))
+
+        self.assertTrue(cache.get(user_availability.key("username", "racer")))
+
+    def test_filter_is_built_in_the_background(self):
+        """Test requests fall through to the database until the first filter is ready"""
+        availability = UserAvailability(build_in_background=True)
+        bloom = BloomFilter(100)
+        release = threading.Event()
+
+        def build():
+            release.wait(5)
+            return bloom
+
+        with mock.patch.object(availability, "build_bloom", side_effect=build):
+            self.assertIsNone(availability.get_bloom())
+            self.assertTrue(availability.might_exist("username", "anyone"))
+            release.set()
+            availability.builder.join(5)
+
+        self.assertIs(availability.get_bloom(), bloom)
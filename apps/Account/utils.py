@@ -1,4 +1,8 @@
 import hashlib
+import threading
+
+from django.conf import settings
+from django.db import transaction
 
 
 def email_to_code(email):
@@ -19,3 +23,124 @@ def email_to_code(email):
     # Pad or truncate to ensure 6 characters
     base36 = base36.zfill(6)  # ensure at least 6 chars
     return base36[:6].upper()
+
+
+CODE_ALPHABET = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+CODE_LENGTH = 6
+CODE_SPACE = len(CODE_ALPHABET) ** CODE_LENGTH  # 2,176,782,336
+
+
+def int_to_code(value):
+    code = ''
+    for _ in range(CODE_LENGTH):
+        value, i = divmod(value, len(CODE_ALPHABET))
+        code = CODE_ALPHABET[i] + code
+    return code
+
+
+class CodePermutation:
+    """
+    Keyed bijection of ``[0, CODE_SPACE)``: a four round Feistel network on
+    32 bits, cycle-walked back into the code space. Distinct counters always
+    map to distinct codes, and without the key consecutive codes look
+    unrelated.
+    """
+
+    rounds = 4
+    half_bits = 16
+
+    def __init__(self, key):
+        self.key = hashlib.sha256(key.encode()).digest()
+
+    def _round(self, round, half):
+        digest = hashlib.blake2b(
+            half.to_bytes(2, 'big'), digest_size=2, key=self.key,
+            salt=round.to_bytes(16, 'big')).digest()
+        return int.from_bytes(digest, 'big')
+
+    def _feistel(self, value):
+        mask = (1 << self.half_bits) - 1
+        left, right = value >> self.half_bits, value & mask
+        for round in range(self.rounds):
+            left, right = right, left ^ self._round(round, right)
+        return (left << self.half_bits) | right
+
+    def permute(self, value):
+        if not 0 <= value < CODE_SPACE:
+            raise ValueError(f"{value} is outside the connection code space")
+        # 2**32 is less than twice CODE_SPACE: about two rounds on average
+        value = self._feistel(value)
+        while value >= CODE_SPACE:
+            value = self._feistel(value)
+        return value
+
+
+class ConnectionCodeAllocator:
+    """
+    Hands out connection codes as the keyed permutation of a counter, so
+    codes never collide with each other and allocation costs no retries.
+
+    Each process reserves ``block_size`` counter values at a time from the
+    ``ConnectionCodeCounter`` row and hands them out from memory: one UPDATE
+    per block, not per registration. Values of a block that is never used up
+    (restarts, rolled back registrations) are simply skipped.
+
+    Codes issued before the allocator (``email_to_code``) or under a
+    different key may still be taken, so with ``check_taken`` a code that
+    already exists is skipped with one indexed lookup. Without legacy codes
+    it can be turned off and allocation touches the database once per block.
+    """
+
+    def __init__(self, key, block_size=100, check_taken=True):
+        self.permutation = CodePermutation(key)
+        self.block_size = block_size
+        self.check_taken = check_taken
+        self._next = 0
+        self._end = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls):
+        config = getattr(settings, 'CONNECTION_CODES', {})
+        return cls(
+            key=config.get('KEY', settings.SECRET_KEY),
+            block_size=config.get('BLOCK_SIZE', 100),
+            check_taken=config.get('CHECK_TAKEN', True),
+        )
+
+    def reserve_block(self):
+        """Reserve the next ``block_size`` counter values; return the first."""
+        from apps.Account.models import ConnectionCodeCounter
+
+        with transaction.atomic():
+            counter, _ = ConnectionCodeCounter.objects.select_for_update().get_or_create(pk=1)
+            start = counter.next_value
+            if start + self.block_size > CODE_SPACE:
+                raise RuntimeError("Connection code space exhausted")
+            counter.next_value = start + self.block_size
+            counter.save(update_fields=['next_value'])
+        return start
+
+    def next_value(self):
+        with self._lock:
+            if self._next >= self._end:
+                self._next = self.reserve_block()
+                self._end = self._next + self.block_size
+            value = self._next
+            self._next += 1
+            return value
+
+    def next_code(self):
+        return int_to_code(self.permutation.permute(self.next_value()))
+
+    def allocate(self):
+        """A connection code no user has."""
+        from apps.Account.models import Users
+
+        code = self.next_code()
+        while self.check_taken and Users.objects.filter(connection_code=code).exists():
+            code = self.next_code()
+        return code
+
+
+connection_codes = ConnectionCodeAllocator.from_settings()
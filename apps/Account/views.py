@@ -5,6 +5,7 @@ from rest_framework.views import APIView
 
 from apps.Account.models import Users
 from apps.Account.serializer import UserAccountSerializer
+from services.user_availability import user_availability
 
 
 class ManageUserView(APIView):
@@ -67,21 +68,24 @@ class GetUserByFilterView(APIView):
         try:
             username = request.query_params.get("username")
             email = request.query_params.get("email")
-            all_users = []
             if not username and not email:
                 return Response(
                     {"message": "Por favor insira um username ou e-mail"},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
+            # Both are unique, so the count is 0 or 1
+            if username and email:
+                taken = (
+                    user_availability.is_taken("username", username)
+                    and user_availability.is_taken("email", email)
+                    and Users.objects.filter(username=username, email=email).exists()
+                )
+            elif username:
+                taken = user_availability.is_taken("username", username)
             else:
-                if username and email:
-                    all_users = Users.objects.filter(username=username, email=email)
-                elif username:
-                    all_users = Users.objects.filter(username=username)
-                elif email:
-                    all_users = Users.objects.filter(email=email)
+                taken = user_availability.is_taken("email", email)
 
-            return Response({"user_count": len(all_users)}, status=status.HTTP_200_OK)
+            return Response({"user_count": int(taken)}, status=status.HTTP_200_OK)
         except Exception as e:
             return Response(
                 {"message": "Erro ao filtrar usuário", "full_error": str(e)},
@@ -1,43 +1,52 @@
 import json
 
+from services.socket_message import chat_group
 from services.websocket.consumer import BaseConsumer
+from services.websocket.presence import presence
+from services.websocket.ratelimit import RateLimitMixin
 
 
-class ChatConsumer(BaseConsumer):
+class ChatConsumer(RateLimitMixin, BaseConsumer):
+    present = False
+
     async def connect(self):
         chat_id = self.scope["url_route"]["kwargs"]["chat_id"]
         self.scope["chat_id"] = chat_id  # Add to scope for later use
         user = self.scope['user']
-        await self.channel_layer.group_add(
-            f'chat_{chat_id}',
-            self.channel_name
-        )
+        await self.join_group(chat_group(chat_id))
         if user.is_authenticated:
-            # Notify group that user is online
-            await self.channel_layer.group_send(
-                f"chat_{chat_id}",
-                {
-                    "type": "user_status",
-                    "user_id": str(user.id),
-                    "online": True,
-                }
-            )
+            self.present = True
+            # Notify group that user is online, unless another socket of
+            # theirs already did
+            if await presence.aconnect(user.id):
+                await self.send_user_status(chat_id, user.id, True)
         await super().connect()
 
     async def disconnect(self, close_code):
         user = self.scope['user']
         chat_id = self.scope["url_route"]["kwargs"]["chat_id"]
-        await self.channel_layer.group_discard(f"chat_{chat_id}", self.channel_name)
-        if user.is_authenticated:
-            # Notify group that user is offline
-            await self.channel_layer.group_send(
-                f"chat_{chat_id}",
-                {
-                    "type": "user_status",
-                    "user_id": str(user.id),
-                    "online": False,
-                }
-            )
+        await self.leave_group(chat_group(chat_id))
+        if self.present:
+            self.present = False
+            # Notify group that user is offline once their last socket has
+            # been gone for the grace period
+            await presence.adisconnect(
+                user.id, lambda: self.send_user_status(chat_id, user.id, False))
+
+    async def refresh_groups(self):
+        await super().refresh_groups()
+        if self.present:
+            await presence.arefresh(self.scope['user'].id)
+
+    async def send_user_status(self, chat_id, user_id, online):
+        await self.channel_layer.group_send(
+            chat_group(chat_id),
+            {
+                "type": "user_status",
+                "user_id": str(user_id),
+                "online": online,
+            }
+        )
 
     async def new_message_notification(self, event):
         await self.send(text_data=json.dumps({
@@ -71,7 +80,7 @@ class ChatConsumer(BaseConsumer):
 
         if data.get('type') == 'typing':
             await self.channel_layer.group_send(
-                f'chat_{data['chat_id']}',
+                chat_group(data['chat_id']),
                 {
                     "type": "typing_status",
                     "user_id": str(self.scope['user'].id),
@@ -80,7 +89,7 @@ class ChatConsumer(BaseConsumer):
             )
         elif data.get('type') == 'user_status':
             await self.channel_layer.group_send(
-                f'chat_{data['chat_id']}',
+                chat_group(data['chat_id']),
                 {
                     "type": "user_status",
                     "user_id": str(self.scope['user'].id),
@@ -89,7 +98,7 @@ class ChatConsumer(BaseConsumer):
             )
         elif data.get('type') == 'new_message_notification':
             await self.channel_layer.group_send(
-                f'chat_{data['chat_id']}',
+                chat_group(data['chat_id']),
                 {
                     "type": "new_message_notification",
                     "user_id": str(self.scope['user'].id),
@@ -0,0 +1,21 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from services.message_rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Recount the daily chat message rollups from the messages, e.g. to backfill them."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--since", type=date.fromisoformat, help="First day to recount (YYYY-MM-DD).")
+        parser.add_argument(
+            "--until", type=date.fromisoformat,
+            help="Day to stop before (YYYY-MM-DD); defaults to today, which live writes are counting.")
+
+    def handle(self, *args, **options):
+        until = options["until"] or timezone.localdate()
+        written = rebuild_rollups(since=options["since"], until=until)
+        self.stdout.write(f"Wrote {written} daily message counts")
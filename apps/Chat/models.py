@@ -45,3 +45,24 @@ class ChatMessages(models.Model):
 
     def __str__(self):
         return f"Message from {self.sender.username} in chat {self.chat.id}"
+
+
+class DailyMessageCount(models.Model):
+    """
+    Messages sent per chat, sender and local day, kept up to date as
+    messages are created (``services.message_rollups``), so statistics
+    read one row per day instead of every message.
+    """
+    id = models.BigAutoField(primary_key=True)
+    chat = models.ForeignKey(
+        Chat, on_delete=models.CASCADE, related_name='daily_message_counts')
+    sender = models.ForeignKey(Users, on_delete=models.CASCADE, related_name='+')
+    day = models.DateField()
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            # Also the index of the per-chat range scans, oldest day first
+            models.UniqueConstraint(
+                fields=['chat', 'day', 'sender'], name='unique_daily_message_count')
+        ]
@@ -1,15 +1,24 @@
 from datetime import date, time
+from io import StringIO
 
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.core.cache import cache
+from django.core.management import call_command
 from django.db import IntegrityError
 from django.test import TestCase
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APITestCase
 
 from apps.Account.models import Users
-from apps.Chat.models import Chat, ChatMessages
+from apps.Chat.models import Chat, ChatMessages, DailyMessageCount
 from apps.Chat.serializer import ChatMessagesSerializer, ChatSerializer
+from apps.Global.models import Notification
 from apps.Relationships.models import Relationship
+from services.socket_message import chat_group, user_group
+from services.websocket.subscribers import subscribers
 
 
 class ChatModelTest(TestCase):
@@ -365,6 +374,25 @@ class ChatViewsTest(APITestCase):
             'You cannot update the chat users, relationship or id', response.data['message'])
 
 
+    def test_typing_status_reaches_chat_group(self):
+        """Test the async partner status view publishes to the chat group"""
+        chat = Chat.objects.get(user_one=self.user1, user_two=self.user2)
+        channel_layer = get_channel_layer()
+        channel = async_to_sync(channel_layer.new_channel)()
+        async_to_sync(channel_layer.group_add)(chat_group(chat.id), channel)
+        subscribers.subscribe(chat_group(chat.id), channel)
+
+        self.client.force_authenticate(user=self.user1)
+        url = reverse('partner_status', kwargs={'user_id': self.user1.id})
+        response = self.client.post(
+            url, {"type": "typing", "chat_id": str(chat.id), "is_typing": True}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        event = async_to_sync(channel_layer.receive)(channel)
+        self.assertEqual(event['type'], 'typing_status')
+        self.assertTrue(event['content']['is_typing'])
+
+
 class ChatMessagesViewTest(APITestCase):
     """Test ChatMessages view functionality"""
 
@@ -484,6 +512,43 @@ class ChatMessagesViewTest(APITestCase):
         self.assertEqual(message.sender.id, self.user1.id)
         self.assertEqual(message.chat.id, self.chat.id)
 
+    def test_post_message_counts_in_daily_rollup(self):
+        """Test each posted message is counted for its sender and day"""
+        for user, message in ((self.user1, "one"), (self.user1, "two"), (self.user2, "three")):
+            self.client.force_authenticate(user=user)
+            self.client.post(reverse('messages'), {"message": message})
+
+        counts = dict(DailyMessageCount.objects.filter(
+            chat=self.chat, day=timezone.localdate()).values_list('sender_id', 'count'))
+        self.assertEqual(counts, {self.user1.id: 2, self.user2.id: 1})
+
+    def test_rollup_command_recounts_from_messages(self):
+        """Test the catch-up job rebuilds the rollups of messages written directly"""
+        for i in range(3):
+            ChatMessages.objects.create(chat=self.chat, sender=self.user2, message=f'msg {i}')
+        DailyMessageCount.objects.create(
+            chat=self.chat, sender=self.user2, day=timezone.localdate(), count=99)
+        out = StringIO()
+
+        call_command('rollup_chat_messages', '--until', '2999-01-01', stdout=out)
+
+        self.assertIn('Wrote 1 daily message counts', out.getvalue())
+        self.assertEqual(DailyMessageCount.objects.get(chat=self.chat).count, 3)
+
+    def test_post_message_to_offline_partner_goes_to_inbox(self):
+        """Test the partner gets an inbox notification unless they have a socket open"""
+        cache.clear()
+        self.client.force_authenticate(user=self.user1)
+        self.client.post(reverse('messages'), {"message": "are you there?"})
+
+        notification = Notification.objects.get(user=self.user2)
+        self.assertEqual(notification.type, 'new_message_notification')
+        self.assertEqual(notification.payload['message'], 'are you there?')
+
+        subscribers.subscribe(user_group(self.user2.id), "specific.user2")
+        self.client.post(reverse('messages'), {"message": "hi!"})
+        self.assertEqual(Notification.objects.filter(user=self.user2).count(), 1)
+
     def test_post_message_user_not_in_relationship(self):
         """Test POST a new message when user does not have a relationship"""
         self.client.force_authenticate(user=self.user3)
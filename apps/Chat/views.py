@@ -1,6 +1,8 @@
 import logging
 
+from asgiref.sync import sync_to_async
 from django.core.cache import cache
+from django.db import transaction
 from django.db.models import Q
 from rest_framework import status
 from rest_framework.generics import ListAPIView
@@ -9,8 +11,12 @@ from rest_framework.views import APIView
 
 from apps.Account.serializer import CustomUserDetailsSerializer
 from apps.Chat.serializer import ChatMessagesSerializer, ChatSerializer
+from services.message_rollups import record_message
+from services.notifications import notify_if_offline
+from services.outbox import enqueue_socket_message
 from services.pagination import CursorPagination
-from services.socket_message import send_socket_message
+from services.socket_message import asend_socket_message, chat_group
+from services.views import AsyncAPIView
 
 from .models import Chat, ChatMessages
 
@@ -29,19 +35,48 @@ def query_chat(user, patch_data=None):
         return Response({"message": "Error fetching chat", "full_error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 
-class PartnerStatusView(APIView):
-    def get(self, request, user_id):
-        online = cache.get(f'user_online_{user_id}') is not None
+def update_chat(user, patch_data):
+    chat = query_chat(user, patch_data)
+    chat.save()
+    return chat
+
+
+@transaction.atomic
+def create_message(chat, sender, message, partner_name):
+    # The notification is only published once the message is committed
+    new_message = ChatMessages.objects.create(
+        chat_id=chat.id, sender=sender, message=message)
+    record_message(new_message)
+    notification = {
+        'message': new_message.message,
+        "sender": partner_name,
+        "user_id": str(sender.id),
+    }
+    enqueue_socket_message(
+        chat_group(chat.id), "new_message_notification", notification)
+    partner_id = chat.user_two_id if chat.user_one_id == sender.id else chat.user_one_id
+    notify_if_offline(partner_id, "new_message_notification", notification)
+    return new_message
+
+
+async def aget_chat(user):
+    return await Chat.objects.aget(Q(user_one_id=user) | Q(user_two_id=user))
+
+
+class PartnerStatusView(AsyncAPIView):
+    throttle_scope = "partner_status"
+
+    async def get(self, request, user_id):
+        online = await cache.aget(f'user_online_{user_id}') is not None
         return Response({"user_id": user_id, "online": online})
 
-    def post(self, request, user_id):
+    async def post(self, request, user_id):
         try:
             data = request.data
-            print(data.get('type'))
             if data.get('type') == 'typing':
 
-                send_socket_message(
-                    f"chat_{data.get('chat_id')}", 'typing_status', {
+                await asend_socket_message(
+                    chat_group(data.get('chat_id')), 'typing_status', {
                         "type": "typing_status",
                         "user_id": str(user_id),
                         "is_typing": data.get("is_typing")
@@ -51,24 +86,25 @@ class PartnerStatusView(APIView):
             return Response({"message": "Could not alter partner status", "full_error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 
-class ChatView(APIView):
+class ChatView(AsyncAPIView):
     serializer_class = ChatSerializer
 
-    def get(self, request):
+    async def get(self, request):
         current_user = request.user
         try:
-            chat = query_chat(current_user)
-            return Response(chat.data)
+            chat = await aget_chat(current_user)
+            return Response(ChatSerializer(chat).data)
         except Exception as e:
             return Response({"message": "Error fetching chat view", "full_error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-    def patch(self, request):
+    async def patch(self, request):
         current_user = request.user
         try:
             if request.data.get('user_one') or request.data.get('user_two') or request.data.get('id') or request.data.get('relationship'):
                 return Response({"message": "You cannot update the chat users, relationship or id"}, status=status.HTTP_400_BAD_REQUEST)
-            chat = query_chat(current_user, request.data)
-            chat.save()
+            # Serializer validation queries the unique constraints, so the
+            # whole update runs in one sync call
+            chat = await sync_to_async(update_chat)(current_user, request.data)
 
             return Response(chat.data)
 
@@ -76,15 +112,16 @@ class ChatView(APIView):
             return Response({"message": "Error updating chat", "full_error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 
-class MessagesView(APIView):
+class MessagesView(AsyncAPIView):
+    throttle_scope = "messages"
 
-    def get(self, request):
+    async def get(self, request):
         current_user = request.user
         try:
-            chat = query_chat(current_user).data
+            chat = await aget_chat(current_user)
 
-            chat_messages = ChatMessages.objects.filter(
-                chat_id=chat.get('id'))
+            chat_messages = [
+                message async for message in ChatMessages.objects.filter(chat_id=chat.id)]
             messages_serializer = ChatMessagesSerializer(
                 chat_messages, many=True).data
 
@@ -92,29 +129,21 @@ class MessagesView(APIView):
         except Exception as e:
             return Response({"message": "Error fetching chat messages", "full_error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-    def post(self, request):
+    async def post(self, request):
         current_user = request.user
         try:
-            chat = query_chat(current_user).data
-            user_serialized = CustomUserDetailsSerializer(current_user).data
+            user_serialized = await sync_to_async(
+                lambda: CustomUserDetailsSerializer(current_user).data)()
             if user_serialized["relationship"] is None:
                 return Response({"message": f"{user_serialized['username']} is not with anyone and cannot send a message"}, status=status.HTTP_403_FORBIDDEN)
 
             relationship = user_serialized["relationship"]
             partner_name = relationship['partner']['name']
 
-            new_message = ChatMessages.objects.create(chat_id=chat.get(
-                'id'), sender=current_user, message=request.data.get('message'))
-            new_message_data = ChatMessagesSerializer(new_message).data
-
-            send_socket_message(
-                f'chat_{chat['id']}', "new_message_notification", {
-                    'message': new_message_data['message'],
-                    "sender": partner_name,
-                    "user_id": str(current_user.id),
-
-                })
-            return Response(new_message_data)
+            chat = await aget_chat(current_user)
+            new_message = await sync_to_async(create_message)(
+                chat, current_user, request.data.get('message'), partner_name)
+            return Response(ChatMessagesSerializer(new_message).data)
         except Exception as e:
             return Response({"message": "Error sending a new chat message", "full_error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
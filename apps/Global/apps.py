@@ -3,4 +3,4 @@ from django.apps import AppConfig
 
 class GlobalConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
-    name = "Global"
+    name = "apps.Global"
@@ -0,0 +1,19 @@
+# Generated by Django 5.2 on 2026-10-19 15:39
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("Global", "0002_notification"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="notification",
+            index=models.Index(fields=["user", "id"], name="notification_user_idx"),
+        ),
+    ]
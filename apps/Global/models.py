@@ -0,0 +1,54 @@
+from django.db import models
+
+from apps.Account.models import Users
+
+
+class SocketOutbox(models.Model):
+    """
+    Socket notification waiting to be published to the channel layer.
+
+    Rows are written in the same transaction as the change they announce, so
+    a rolled back write never produces a notification, and are deleted once
+    published by ``services.outbox.OutboxDispatcher``.
+    """
+    id = models.BigAutoField(primary_key=True)
+    group = models.CharField(max_length=255)
+    type = models.CharField(max_length=100)
+    content = models.JSONField()
+    # Set for per-user notifications, which also go to the user's replay log
+    user_id = models.UUIDField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # A dispatcher owns the row until then; expired claims are retried
+    claimed_until = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.type} to {self.group}"
+
+
+class Notification(models.Model):
+    """
+    Inbox copy of a socket notification that reached a user while none of
+    their sockets was open, so the client can catch up from the inbox
+    endpoint instead of rebuilding its state from the relationship and
+    message lists.
+    """
+    id = models.BigAutoField(primary_key=True)
+    user = models.ForeignKey(
+        Users, on_delete=models.CASCADE, related_name="notifications")
+    type = models.CharField(max_length=100)
+    payload = models.JSONField()
+    # Replay log sequence number of the event, as seen on the socket
+    seq = models.PositiveBigIntegerField(default=0)
+    read = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # The inbox's newest-first cursor, and the same for unread only
+            # (also the unread count); neither sorts
+            models.Index(fields=["user", "id"], name="notification_user_idx"),
+            models.Index(fields=["user", "read", "id"], name="notification_inbox_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.type} for {self.user_id}"
@@ -2,6 +2,11 @@ from unittest.mock import patch
 
 from django.test import TestCase
 from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from apps.Account.models import Users
+from apps.Global.models import Notification
 
 
 class GlobalViewsTestCase(TestCase):
@@ -46,3 +51,66 @@ class GlobalViewsTestCase(TestCase):
         self.assertEqual(
             response.json(), {"message": "Favor fornecer um nome para a pasta"}
         )
+
+
+class NotificationInboxTestCase(APITestCase):
+    def setUp(self):
+        self.user = Users.objects.create_user(
+            username="inboxuser", email="inboxuser@example.com",
+            password="testpassword123", connection_code="INBX01")
+        self.other = Users.objects.create_user(
+            username="inboxother", email="inboxother@example.com",
+            password="testpassword123", connection_code="INBX02")
+        self.notifications = Notification.objects.bulk_create(
+            Notification(user=self.user, type="relationship_request_notification",
+                         payload={"n": i}, seq=i + 1)
+            for i in range(60))
+        Notification.objects.create(
+            user=self.other, type="relationship_request_notification", payload={})
+        self.client.force_authenticate(user=self.user)
+
+    def test_inbox_is_paginated_newest_first(self):
+        response = self.client.get(reverse("notification_inbox"))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data["results"]
+        self.assertEqual(len(results), 50)
+        self.assertEqual(results[0]["payload"], {"n": 59})
+        self.assertIsNotNone(response.data["next"])
+
+        response = self.client.get(response.data["next"])
+        self.assertEqual([n["seq"] for n in response.data["results"]], list(range(10, 0, -1)))
+        self.assertIsNone(response.data["next"])
+
+    def test_inbox_unread_filter(self):
+        Notification.objects.filter(user=self.user, seq__gt=2).update(read=True)
+
+        response = self.client.get(reverse("notification_inbox"), {"unread": "true"})
+
+        self.assertEqual([n["seq"] for n in response.data["results"]], [2, 1])
+
+    def test_mark_ids_as_read(self):
+        ids = [self.notifications[0].id, self.notifications[1].id]
+
+        with self.assertNumQueries(2):
+            response = self.client.post(reverse("notifications_read"), {"ids": ids}, format="json")
+
+        self.assertEqual(response.data, {"updated": 2, "unread": 58})
+        self.assertTrue(all(Notification.objects.filter(id__in=ids).values_list("read", flat=True)))
+
+    def test_mark_up_to_and_all_as_read(self):
+        response = self.client.post(
+            reverse("notifications_read"), {"up_to": self.notifications[9].id}, format="json")
+        self.assertEqual(response.data, {"updated": 10, "unread": 50})
+
+        response = self.client.post(reverse("notifications_read"), {}, format="json")
+        self.assertEqual(response.data, {"updated": 50, "unread": 0})
+        # Other users' notifications are untouched
+        self.assertFalse(Notification.objects.get(user=self.other).read)
+
+    def test_mark_as_read_rejects_bad_ids(self):
+        for ids in (["x"], "12", [str(self.notifications[0].id)], [True], 5):
+            response = self.client.post(reverse("notifications_read"), {"ids": ids}, format="json")
+
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Notification.objects.filter(read=True).exists())
@@ -1,7 +1,10 @@
 from django.urls import path
 
-from apps.Global.views import PresignImageView
+from apps.Global.views import MarkNotificationsReadView, MetricsView, NotificationInboxView, PresignImageView
 
 urlpatterns = [
     path("global/image/presign/", PresignImageView.as_view(), name="presign_image"),
+    path("global/metrics/", MetricsView.as_view(), name="metrics"),
+    path("global/notifications/", NotificationInboxView.as_view(), name="notification_inbox"),
+    path("global/notifications/read/", MarkNotificationsReadView.as_view(), name="notifications_read"),
 ]
@@ -1,8 +1,15 @@
-from rest_framework import permissions
+from django.conf import settings
+from django.http import HttpResponse
+from rest_framework import permissions, status
+from rest_framework.generics import ListAPIView
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from apps.Global.models import Notification
+from apps.Global.serializer import NotificationSerializer
 from services.cloudinary_service import CloudinaryService
+from services.metrics import registry
+from services.pagination import NotificationPagination
 
 
 class PresignImageView(APIView):
@@ -36,3 +43,57 @@ class PresignImageView(APIView):
                 {"message": f"Erro ao tentar gerar url para arquivo: {str(e)}"},
                 status=500,
             )
+
+
+class MetricsAllowedIP(permissions.BasePermission):
+    def has_permission(self, request, view):
+        return request.META.get("REMOTE_ADDR") in settings.METRICS_ALLOWED_IPS
+
+
+class MetricsView(APIView):
+    authentication_classes = []
+    permission_classes = [MetricsAllowedIP]
+
+    def get(self, request) -> HttpResponse:
+        return HttpResponse(
+            registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8"
+        )
+
+
+class NotificationInboxView(ListAPIView):
+    """Notifications received while offline, newest first; ``?unread=true`` for unread only."""
+    serializer_class = NotificationSerializer
+    pagination_class = NotificationPagination
+
+    def get_queryset(self):
+        notifications = Notification.objects.filter(user=self.request.user)
+        if self.request.query_params.get("unread") == "true":
+            notifications = notifications.filter(read=False)
+        return notifications
+
+
+class MarkNotificationsReadView(APIView):
+    def post(self, request) -> Response:
+        """
+        Mark the given ``ids``, everything up to and including ``up_to``
+        (an id), or with neither, every notification as read, in one UPDATE.
+        """
+        try:
+            notifications = Notification.objects.filter(user=request.user, read=False)
+            ids = request.data.get("ids")
+            up_to = request.data.get("up_to")
+            if ids is not None:
+                if not isinstance(ids, list) or not all(
+                        isinstance(notification_id, int) and not isinstance(notification_id, bool)
+                        for notification_id in ids):
+                    return Response(
+                        {"message": "ids must be a list of notification ids"},
+                        status=status.HTTP_400_BAD_REQUEST)
+                notifications = notifications.filter(id__in=ids)
+            elif up_to is not None:
+                notifications = notifications.filter(id__lte=int(up_to))
+            updated = notifications.update(read=True)
+            unread = Notification.objects.filter(user=request.user, read=False).count()
+            return Response({"updated": updated, "unread": unread})
+        except Exception as e:
+            return Response({"message": "Error marking notifications as read", "full_error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
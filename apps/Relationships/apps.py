@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class RelationshipsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.Relationships'
+
+    def ready(self):
+        from apps.Relationships import signals  # noqa: F401
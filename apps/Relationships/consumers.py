@@ -1,8 +1,9 @@
 import json
 
 from services.websocket.consumer import BaseConsumer
+from services.websocket.ratelimit import RateLimitMixin
 
 
-class RelationshipConsumer(BaseConsumer):
+class RelationshipConsumer(RateLimitMixin, BaseConsumer):
     async def relationship_request_notification(self, event):
         await self.send(text_data=json.dumps(event['content']))
@@ -0,0 +1,23 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from services.request_expiry import RequestExpiry
+
+
+class Command(BaseCommand):
+    help = "Delete relationship requests pending for longer than RELATIONSHIP_REQUEST_EXPIRY allows."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, help="Override MAX_AGE_DAYS.")
+        parser.add_argument("--batch-size", type=int, help="Override BATCH_SIZE.")
+        parser.add_argument("--max-batches", type=int, help="Stop after this many batches.")
+
+    def handle(self, *args, **options):
+        expiry = RequestExpiry.from_settings()
+        if options["days"] is not None:
+            expiry.max_age = timedelta(days=options["days"])
+        if options["batch_size"] is not None:
+            expiry.batch_size = options["batch_size"]
+        expired = expiry.run(max_batches=options["max_batches"])
+        self.stdout.write(f"Expired {expired} relationship requests")
@@ -1,8 +1,6 @@
 # Generated by Django 5.2 on 2025-09-03 02:51
 
-import apps.Relationships.models
-import django_mysql.models
-from django.db import migrations
+from django.db import migrations, models
 
 
 class Migration(migrations.Migration):
@@ -15,6 +13,6 @@ class Migration(migrations.Migration):
         migrations.AlterField(
             model_name='relationshiprequest',
             name='status',
-            field=django_mysql.models.EnumField(choices=[('ACCEPTED', 'ACCEPTED'), ('PENDING', 'PENDING'), ('REJECTED', 'REJECTED'), ('BLOCKED', 'BLOCKED'), ('NONBINARY', 'NONBINARY'), ('INTERSEX', 'INTERSEX'), ('AGENDER', 'AGENDER'), ('OTHER', 'OTHER'), ('PREFERNOTTOSAY', 'PREFERNOTTOSAY')], default=apps.Relationships.models.Status['PENDING']),
+            field=models.CharField(choices=[('ACCEPTED', 'ACCEPTED'), ('PENDING', 'PENDING'), ('REJECTED', 'REJECTED'), ('BLOCKED', 'BLOCKED'), ('NONBINARY', 'NONBINARY'), ('INTERSEX', 'INTERSEX'), ('AGENDER', 'AGENDER'), ('OTHER', 'OTHER'), ('PREFERNOTTOSAY', 'PREFERNOTTOSAY')], default='PENDING', max_length=100),
         ),
     ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2 on 2026-10-19 14:49
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("Relationships", "0003_alter_relationshiprequest_status"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="relationshiprequest",
+            index=models.Index(
+                fields=["receiver", "status", "id"], name="request_inbox_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="relationshiprequest",
+            index=models.Index(
+                fields=["requester", "status", "id"], name="request_outbox_idx"
+            ),
+        ),
+    ]
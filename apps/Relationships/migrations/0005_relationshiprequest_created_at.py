@@ -0,0 +1,28 @@
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("Relationships", "0004_relationshiprequest_indexes"),
+    ]
+
+    operations = [
+        # Existing requests count as created now, so they expire one
+        # MAX_AGE_DAYS after the deploy rather than all at once
+        migrations.AddField(
+            model_name="relationshiprequest",
+            name="created_at",
+            field=models.DateTimeField(
+                auto_now_add=True, default=django.utils.timezone.now
+            ),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name="relationshiprequest",
+            index=models.Index(
+                fields=["status", "created_at"], name="request_expiry_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,76 @@
+from django.db import migrations, models
+
+STATUSES = {"PENDING": 0, "ACCEPTED": 1, "REJECTED": 2}
+
+
+def to_integers(apps, schema_editor):
+    RelationshipRequest = apps.get_model("Relationships", "RelationshipRequest")
+    for label, value in STATUSES.items():
+        RelationshipRequest.objects.filter(status=label).update(status_code=value)
+
+
+def to_labels(apps, schema_editor):
+    RelationshipRequest = apps.get_model("Relationships", "RelationshipRequest")
+    for label, value in STATUSES.items():
+        RelationshipRequest.objects.filter(status_code=value).update(status=label)
+
+
+class Migration(migrations.Migration):
+    """
+    Replace the MySQL ENUM status with a portable small integer: copy it
+    into a new column, drop the ENUM column and its indexes, then take over
+    its name and rebuild the indexes on the integer.
+    """
+
+    dependencies = [
+        ("Relationships", "0005_relationshiprequest_created_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="relationshiprequest",
+            name="status_code",
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.RunPython(to_integers, to_labels),
+        migrations.RemoveIndex(
+            model_name="relationshiprequest", name="request_inbox_idx"),
+        migrations.RemoveIndex(
+            model_name="relationshiprequest", name="request_outbox_idx"),
+        migrations.RemoveIndex(
+            model_name="relationshiprequest", name="request_expiry_idx"),
+        migrations.RemoveField(
+            model_name="relationshiprequest",
+            name="status",
+        ),
+        migrations.RenameField(
+            model_name="relationshiprequest",
+            old_name="status_code",
+            new_name="status",
+        ),
+        migrations.AlterField(
+            model_name="relationshiprequest",
+            name="status",
+            field=models.PositiveSmallIntegerField(
+                choices=[(0, "PENDING"), (1, "ACCEPTED"), (2, "REJECTED")], default=0
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="relationshiprequest",
+            index=models.Index(
+                fields=["receiver", "status", "id"], name="request_inbox_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="relationshiprequest",
+            index=models.Index(
+                fields=["requester", "status", "id"], name="request_outbox_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="relationshiprequest",
+            index=models.Index(
+                fields=["status", "created_at"], name="request_expiry_idx"
+            ),
+        ),
+    ]
@@ -1,22 +1,13 @@
-from enum import Enum
-
-from django.db import models
-from django_mysql.models import EnumField
+from django.db import models, transaction
 
 from apps.Account.models import Users
 
 
-class Status(Enum):
-    ACCEPTED = 'ACCEPTED'
-    PENDING = 'PENDING'
-    REJECTED = 'REJECTED'
-
-    @classmethod
-    def choices(cls):
-        return [(key.value, key.name) for key in cls]
-
-
-STATUS_CHOICES = [e.value for e in Status]
+class Status(models.IntegerChoices):
+    # Stored as a small integer; the API speaks the labels
+    PENDING = 0, 'PENDING'
+    ACCEPTED = 1, 'ACCEPTED'
+    REJECTED = 2, 'REJECTED'
 
 
 class Relationship(models.Model):
@@ -35,16 +26,17 @@ class Relationship(models.Model):
 
     def save(self, *args, **kwargs):
         is_new = self.pk is None
-        super().save(*args, **kwargs)
-        if is_new:
-            from apps.Chat.models import Chat
-            from apps.Relationships.models import Relationship
-            relationship = Relationship.objects.get(id=self.pk)
-            Chat.objects.get_or_create(
-                user_one=self.user_one,
-                user_two=self.user_two,
-                relationship=relationship
-            )
+        # The couple's chat is created with the relationship or not at all;
+        # inside a caller's transaction this adds no savepoint
+        with transaction.atomic(savepoint=False):
+            super().save(*args, **kwargs)
+            if is_new:
+                from apps.Chat.models import Chat
+                Chat.objects.create(
+                    user_one_id=self.user_one_id,
+                    user_two_id=self.user_two_id,
+                    relationship=self
+                )
 
     class Meta:
         constraints = [
@@ -55,7 +47,7 @@ class Relationship(models.Model):
 
 class RelationshipRequest(models.Model):
     id = models.AutoField(primary_key=True)
-    status = EnumField(choices=STATUS_CHOICES, default=Status.PENDING)
+    status = models.PositiveSmallIntegerField(choices=Status.choices, default=Status.PENDING)
     requester = models.ForeignKey(
         Users,
         on_delete=models.CASCADE,
@@ -68,9 +60,18 @@ class RelationshipRequest(models.Model):
         null=True,
         related_name='receiver'
     )
+    created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         constraints = [
             models.UniqueConstraint(
                 fields=['requester', 'receiver'], name='unique_relationship_request')
         ]
+        indexes = [
+            # Cover the status filter, the pending count and the newest-first
+            # cursor of the incoming and outgoing request lists
+            models.Index(fields=['receiver', 'status', 'id'], name='request_inbox_idx'),
+            models.Index(fields=['requester', 'status', 'id'], name='request_outbox_idx'),
+            # Oldest pending requests first for services/request_expiry.py
+            models.Index(fields=['status', 'created_at'], name='request_expiry_idx'),
+        ]
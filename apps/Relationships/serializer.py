@@ -2,10 +2,26 @@
 
 from rest_framework import serializers
 
-from .models import Relationship
+from .models import Relationship, RelationshipRequest
 
 
 class RelationshipSerializer(serializers.ModelSerializer):
     class Meta:
         model = Relationship
         fields = '__all__'
+
+
+class RequestUserSerializer(serializers.Serializer):
+    id = serializers.UUIDField()
+    username = serializers.CharField()
+    first_name = serializers.CharField()
+
+
+class RelationshipRequestSerializer(serializers.ModelSerializer):
+    status = serializers.CharField(source='get_status_display')
+    requester = RequestUserSerializer()
+    receiver = RequestUserSerializer()
+
+    class Meta:
+        model = RelationshipRequest
+        fields = ['id', 'status', 'requester', 'receiver']
@@ -0,0 +1,32 @@
+from django.db.models import Case, Q, UUIDField, Value, When
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.Account.models import Users
+from apps.Relationships.models import Relationship
+
+
+# Users.partner and Users.current_relationship mirror the couple's
+# Relationship row for CustomUserDetailsSerializer.
+
+@receiver(post_save, sender=Relationship)
+def link_partners(sender, instance, created, **kwargs):
+    if not created:
+        return
+    one, two = instance.user_one_id, instance.user_two_id
+    Users.objects.filter(pk__in=[one, two]).update(
+        current_relationship=instance,
+        partner=Case(When(pk=one, then=Value(two)), default=Value(one), output_field=UUIDField()),
+    )
+    # Keep the instances the relationship was created with in step
+    for field, partner_id in (("user_one", two), ("user_two", one)):
+        if Relationship._meta.get_field(field).is_cached(instance):
+            user = getattr(instance, field)
+            user.partner_id, user.current_relationship = partner_id, instance
+
+
+@receiver(post_delete, sender=Relationship)
+def unlink_partners(sender, instance, **kwargs):
+    # current_relationship is cleared by its SET_NULL
+    one, two = instance.user_one_id, instance.user_two_id
+    Users.objects.filter(Q(pk=one, partner=two) | Q(pk=two, partner=one)).update(partner=None)
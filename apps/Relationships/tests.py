@@ -1,14 +1,21 @@
-from datetime import date
+from datetime import date, timedelta
+from io import StringIO
+from unittest import mock
 
+from django.core.cache import cache
+from django.core.management import call_command
 from django.db import IntegrityError
 from django.test import TestCase
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APIClient, APITestCase
 
 from apps.Account.models import Users
 from apps.Relationships.models import Relationship, RelationshipRequest, Status
 from apps.Relationships.serializer import RelationshipSerializer
+from services.connection_code_cache import connection_code_cache
+from services.pending_requests import pending_request_counts
 
 
 class StatusEnumTest(TestCase):
@@ -16,14 +23,22 @@ class StatusEnumTest(TestCase):
 
     def test_status_choices(self):
         """Test that Status enum returns proper choices"""
-        choices = Status.choices()
+        choices = Status.choices
         self.assertIsInstance(choices, list)
 
         # Check some specific choices
-        choice_values = [choice[0] for choice in choices]
-        self.assertIn('ACCEPTED', choice_values)
-        self.assertIn('PENDING', choice_values)
-        self.assertIn('REJECTED', choice_values)
+        choice_labels = [choice[1] for choice in choices]
+        self.assertIn('ACCEPTED', choice_labels)
+        self.assertIn('PENDING', choice_labels)
+        self.assertIn('REJECTED', choice_labels)
+
+    def test_status_is_stored_as_small_integer(self):
+        """Test the status column holds the integer value"""
+        self.assertEqual(
+            [choice[0] for choice in Status.choices], [0, 1, 2])
+        self.assertEqual(
+            RelationshipRequest._meta.get_field('status').get_internal_type(),
+            'PositiveSmallIntegerField')
 
 
 class RelationshipModelTest(TestCase):
@@ -126,12 +141,12 @@ class RelationshipRequestModelTest(TestCase):
         request = RelationshipRequest.objects.create(
             requester=self.requester,
             receiver=self.receiver,
-            status='PENDING'
+            status=Status.PENDING
         )
 
         self.assertEqual(request.requester, self.requester)
         self.assertEqual(request.receiver, self.receiver)
-        self.assertEqual(request.status, 'PENDING')
+        self.assertEqual(request.status, Status.PENDING)
         self.assertIsNotNone(request.id)
 
     def test_unique_relationship_request_constraint(self):
@@ -140,7 +155,7 @@ class RelationshipRequestModelTest(TestCase):
         RelationshipRequest.objects.create(
             requester=self.requester,
             receiver=self.receiver,
-            status='PENDING'
+            status=Status.PENDING
         )
 
         # Try to create duplicate request
@@ -148,7 +163,7 @@ class RelationshipRequestModelTest(TestCase):
             RelationshipRequest.objects.create(
                 requester=self.requester,
                 receiver=self.receiver,
-                status='PENDING'
+                status=Status.PENDING
             )
 
 
@@ -259,7 +274,7 @@ class RelationshipViewsTest(APITestCase):
             requester=self.user1,
             receiver=self.user2
         )
-        self.assertEqual(request.status, 'PENDING')
+        self.assertEqual(request.status, Status.PENDING)
 
     def test_create_relationship_request_own_code(self):
         """Test creating relationship request with own connection code"""
@@ -272,13 +287,54 @@ class RelationshipViewsTest(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertIn('other than your own', response.data['message'])
 
+    def test_create_relationship_request_query_count(self):
+        """Test a warm request is one INSERT plus its outbox row, with no user lookups"""
+        self.client.force_authenticate(user=self.user1)
+        url = reverse('create_relationship_request')
+        connection_code_cache.resolve('USER02')
+
+        # SAVEPOINT, INSERT request, INSERT outbox row, RELEASE SAVEPOINT
+        with self.assertNumQueries(4):
+            response = self.client.post(url, {'connection_code': 'USER02'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_create_relationship_request_twice(self):
+        """Test a repeated request is refused by the unique constraint"""
+        self.client.force_authenticate(user=self.user1)
+        url = reverse('create_relationship_request')
+        self.client.post(url, {'connection_code': 'USER02'})
+
+        response = self.client.post(url, {'connection_code': 'USER02'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['full_error'], 'Request already exists')
+        self.assertEqual(RelationshipRequest.objects.count(), 1)
+
+    def test_create_relationship_request_unknown_code(self):
+        self.client.force_authenticate(user=self.user1)
+        response = self.client.post(
+            reverse('create_relationship_request'), {'connection_code': 'NOPE00'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_connection_code_cache_is_invalidated(self):
+        """Test user changes are seen by the next lookup"""
+        self.assertEqual(connection_code_cache.resolve('USER02').first_name, 'User2')
+        self.user2.first_name = 'Renamed'
+        self.user2.save()
+        self.assertEqual(connection_code_cache.resolve('USER02').first_name, 'Renamed')
+
+        self.user2.delete()
+        self.assertIsNone(connection_code_cache.resolve('USER02'))
+
     def test_respond_relationship_request_accept(self):
         """Test accepting a relationship request"""
         # Create a request first
         request = RelationshipRequest.objects.create(
             requester=self.user1,
             receiver=self.user2,
-            status='PENDING'
+            status=Status.PENDING
         )
 
         self.client.force_authenticate(user=self.user2)
@@ -304,7 +360,7 @@ class RelationshipViewsTest(APITestCase):
         request = RelationshipRequest.objects.create(
             requester=self.user1,
             receiver=self.user2,
-            status='PENDING'
+            status=Status.PENDING
         )
 
         self.client.force_authenticate(user=self.user2)
@@ -319,4 +375,255 @@ class RelationshipViewsTest(APITestCase):
 
         # Verify request status was updated
         request.refresh_from_db()
-        self.assertEqual(request.status, 'REJECTED')
+        self.assertEqual(request.status, Status.REJECTED)
+
+    def test_respond_relationship_request_accept_query_count(self):
+        """Test accepting provisions everything in one transaction with a fixed budget"""
+        from apps.Chat.models import Chat
+
+        request = RelationshipRequest.objects.create(
+            requester=self.user1, receiver=self.user2, status=Status.PENDING)
+        self.client.force_authenticate(user=self.user2)
+        url = reverse('respond_relationship_request', kwargs={'pk': request.id})
+
+        # SAVEPOINT, SELECT ... FOR UPDATE, INSERT relationship, UPDATE users'
+        # partner, INSERT chat, UPDATE request, INSERT outbox row, RELEASE SAVEPOINT
+        with self.assertNumQueries(8):
+            response = self.client.post(url, {'accept': True})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        relationship = Relationship.objects.get(user_one=self.user1, user_two=self.user2)
+        self.assertTrue(Chat.objects.filter(
+            relationship=relationship, user_one=self.user1, user_two=self.user2).exists())
+        request.refresh_from_db()
+        self.assertEqual(request.status, Status.ACCEPTED)
+        self.assertEqual(Users.objects.get(pk=self.user1.pk).partner_id, self.user2.id)
+
+    def test_respond_relationship_request_existing_relationship(self):
+        """Test accepting when the couple already has a relationship is refused"""
+        Relationship.objects.create(user_one=self.user1, user_two=self.user2)
+        request = RelationshipRequest.objects.create(
+            requester=self.user1, receiver=self.user2, status=Status.PENDING)
+        self.client.force_authenticate(user=self.user2)
+        url = reverse('respond_relationship_request', kwargs={'pk': request.id})
+
+        response = self.client.post(url, {'accept': True})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['full_error'], 'Request already accepted')
+        request.refresh_from_db()
+        self.assertEqual(request.status, Status.PENDING)
+
+    def test_respond_relationship_request_twice(self):
+        """Test an answered request is left alone"""
+        request = RelationshipRequest.objects.create(
+            requester=self.user1, receiver=self.user2, status=Status.PENDING)
+        self.client.force_authenticate(user=self.user2)
+        url = reverse('respond_relationship_request', kwargs={'pk': request.id})
+        self.client.post(url, {'accept': True})
+
+        response = self.client.post(url, {'accept': False})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('already been accepted', response.data['message'])
+        self.assertEqual(Relationship.objects.count(), 1)
+        request.refresh_from_db()
+        self.assertEqual(request.status, Status.ACCEPTED)
+
+
+class RelationshipRequestListTest(APITestCase):
+    """Test the request inbox, outbox and pending count"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.users = [
+            Users.objects.create_user(
+                username=f'lister{i}', email=f'lister{i}@example.com', password='testpassword123',
+                connection_code=f'LIST0{i}', first_name=f'Lister{i}')
+            for i in range(4)
+        ]
+        self.receiver = self.users[0]
+        self.requests = [
+            RelationshipRequest.objects.create(
+                requester=requester, receiver=self.receiver, status=Status.PENDING)
+            for requester in self.users[1:]
+        ]
+        RelationshipRequest.objects.filter(pk=self.requests[0].pk).update(status=Status.REJECTED)
+
+    def test_inbox_lists_pending_requests_newest_first(self):
+        self.client.force_authenticate(user=self.receiver)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('relationship_request_inbox'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data['results']
+        self.assertEqual([r['id'] for r in results], [self.requests[2].id, self.requests[1].id])
+        self.assertEqual(results[0]['requester']['first_name'], 'Lister3')
+        self.assertEqual(results[0]['receiver']['id'], str(self.receiver.id))
+
+    def test_status_filter(self):
+        self.client.force_authenticate(user=self.receiver)
+        url = reverse('relationship_request_inbox')
+
+        response = self.client.get(url, {'status': 'rejected'})
+        self.assertEqual([r['id'] for r in response.data['results']], [self.requests[0].id])
+
+        response = self.client.get(url, {'status': 'maybe'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_outbox_lists_sent_requests(self):
+        self.client.force_authenticate(user=self.users[3])
+
+        response = self.client.get(reverse('relationship_request_outbox'))
+
+        self.assertEqual([r['id'] for r in response.data['results']], [self.requests[2].id])
+        self.client.force_authenticate(user=self.receiver)
+        response = self.client.get(reverse('relationship_request_outbox'))
+        self.assertEqual(response.data['results'], [])
+
+    def test_pending_count_is_cached_and_maintained(self):
+        self.client.force_authenticate(user=self.receiver)
+        url = reverse('pending_request_count')
+
+        self.assertEqual(self.client.get(url).data, {'pending': 2})
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url).data, {'pending': 2})
+
+        # Adjusted once the transactions commit
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                reverse('respond_relationship_request', kwargs={'pk': self.requests[1].id}),
+                {'accept': False})
+        self.assertEqual(pending_request_counts.get(self.users[2].id), 0)
+        self.client.force_authenticate(user=self.users[1])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('create_relationship_request'), {'connection_code': 'LIST02'})
+        with self.assertNumQueries(0):
+            self.assertEqual(pending_request_counts.get(self.users[2].id), 1)
+
+        self.client.force_authenticate(user=self.receiver)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url).data, {'pending': 1})
+
+    def test_change_during_count_is_not_cached(self):
+        """Test a request committed while a read counts does not leave a stale count"""
+        count = pending_request_counts.count
+
+        def count_then_commit(user_id):
+            counted = count(user_id)
+            pending_request_counts._adjust(user_id, 1)
+            return counted
+
+        with mock.patch.object(pending_request_counts, 'count', side_effect=count_then_commit):
+            self.assertEqual(pending_request_counts.get(self.receiver.id), 2)
+
+        self.assertIsNone(cache.get(pending_request_counts.key(self.receiver.id)))
+
+
+class RequestExpiryTest(TestCase):
+    """Test expire_relationship_requests"""
+
+    def setUp(self):
+        cache.clear()
+        self.receiver = Users.objects.create_user(
+            username='popular', email='popular@example.com', password='testpassword123',
+            connection_code='POPU01')
+        self.requesters = [
+            Users.objects.create_user(
+                username=f'suitor{i}', email=f'suitor{i}@example.com',
+                password='testpassword123', connection_code=f'SUIT0{i}')
+            for i in range(5)
+        ]
+        self.requests = [
+            RelationshipRequest.objects.create(
+                requester=requester, receiver=self.receiver, status=Status.PENDING)
+            for requester in self.requesters
+        ]
+        old = timezone.now() - timedelta(days=31)
+        RelationshipRequest.objects.filter(pk__in=[r.pk for r in self.requests[:4]]).update(created_at=old)
+        RelationshipRequest.objects.filter(pk=self.requests[3].pk).update(status=Status.REJECTED)
+
+    def test_stale_pending_requests_are_deleted_in_batches(self):
+        self.assertEqual(pending_request_counts.get(self.receiver.id), 4)
+        out = StringIO()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('expire_relationship_requests', '--days', '30', '--batch-size', '2', stdout=out)
+
+        self.assertIn('Expired 3 relationship requests', out.getvalue())
+        self.assertEqual(
+            set(RelationshipRequest.objects.values_list('id', flat=True)),
+            {self.requests[3].id, self.requests[4].id})
+        self.assertEqual(pending_request_counts.get(self.receiver.id), 1)
+        # The pair is free again
+        RelationshipRequest.objects.create(
+            requester=self.requesters[0], receiver=self.receiver, status=Status.PENDING)
+
+    def test_max_batches(self):
+        call_command('expire_relationship_requests', '--batch-size', '1', '--max-batches', '2', stdout=StringIO())
+
+        self.assertEqual(RelationshipRequest.objects.count(), 3)
+
+
+class RelationshipStatsTest(APITestCase):
+    """Test the relationship stats endpoint"""
+
+    def setUp(self):
+        from apps.Chat.models import Chat, DailyMessageCount
+
+        self.user1 = Users.objects.create_user(
+            username='stats1', email='stats1@example.com', password='testpassword123',
+            connection_code='STAT01')
+        self.user2 = Users.objects.create_user(
+            username='stats2', email='stats2@example.com', password='testpassword123',
+            connection_code='STAT02')
+        self.today = timezone.localdate()
+        relationship = Relationship.objects.create(
+            user_one=self.user1, user_two=self.user2,
+            relationship_start_date=self.today - timedelta(days=100))
+        chat = Chat.objects.get(relationship=relationship)
+        DailyMessageCount.objects.bulk_create([
+            DailyMessageCount(chat=chat, sender=self.user1, day=self.today, count=5),
+            DailyMessageCount(chat=chat, sender=self.user2, day=self.today, count=3),
+            DailyMessageCount(chat=chat, sender=self.user2, day=self.today - timedelta(days=2), count=2),
+            # Outside a 7 day window
+            DailyMessageCount(chat=chat, sender=self.user1, day=self.today - timedelta(days=50), count=10),
+        ])
+        self.user1.refresh_from_db()
+
+    def test_stats_are_read_from_rollups(self):
+        self.client.force_authenticate(user=self.user1)
+
+        # relationship and chat, totals per sender, per-day series
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('relationship_stats'), {'days': 7})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['days_together'], 100)
+        self.assertEqual(response.data['total_messages'], 20)
+        self.assertEqual(response.data['messages_by_user'], {
+            str(self.user1.id): 15, str(self.user2.id): 5})
+        self.assertEqual(response.data['messages_per_day'], [
+            {'day': self.today - timedelta(days=2), 'count': 2},
+            {'day': self.today, 'count': 8},
+        ])
+        self.assertEqual(response.data['average_messages_per_day'], round(10 / 7, 2))
+
+    def test_stats_without_relationship(self):
+        loner = Users.objects.create_user(
+            username='loner', email='loner@example.com', password='testpassword123',
+            connection_code='LONE01')
+        self.client.force_authenticate(user=loner)
+
+        response = self.client.get(reverse('relationship_stats'))
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_stats_window_is_bounded(self):
+        self.client.force_authenticate(user=self.user1)
+
+        response = self.client.get(reverse('relationship_stats'), {'days': 1000})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -7,6 +7,14 @@ urlpatterns = [
          name='create_relationship_request'),
     path('relationship/respond/<int:pk>/',
          views.RespondRelationshipRequestView.as_view(), name='respond_relationship_request'),
+    path('relationship/requests/inbox/', views.RelationshipRequestInboxView.as_view(),
+         name='relationship_request_inbox'),
+    path('relationship/requests/outbox/', views.RelationshipRequestOutboxView.as_view(),
+         name='relationship_request_outbox'),
+    path('relationship/requests/pending/count/', views.PendingRequestCountView.as_view(),
+         name='pending_request_count'),
+    path('relationship/stats/', views.RelationshipStatsView.as_view(),
+         name='relationship_stats'),
     path('relationship/', views.ManageRelationshipsView.as_view(),
          name='manage_relationship')
 ]
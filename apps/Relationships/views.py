@@ -1,39 +1,105 @@
 
-from datetime import date
+from datetime import date, timedelta
 
-from django.db.models import Q
+from asgiref.sync import sync_to_async
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
 from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.generics import ListAPIView
 from rest_framework.response import Response
-from rest_framework.views import APIView
 
-from apps.Account.models import Users
-from apps.Relationships.models import Relationship, RelationshipRequest
-from apps.Relationships.serializer import RelationshipSerializer
-from services.socket_message import send_socket_message
-
-
-class ManageRelationshipsView(APIView):
+from apps.Relationships.models import Relationship, RelationshipRequest, Status
+from apps.Relationships.serializer import RelationshipRequestSerializer, RelationshipSerializer
+from services.connection_code_cache import connection_code_cache
+from services.message_rollups import message_totals, messages_per_day
+from services.outbox import enqueue_user_message
+from services.pagination import RelationshipRequestPagination
+from services.pending_requests import pending_request_counts
+from services.views import AsyncAPIView
+
+
+# The notifications go through the outbox in the same transaction as the
+# change, so they are only sent once it commits.
+
+@transaction.atomic
+def create_relationship_request(requester, receiver):
+    # A single INSERT: repeats are rejected by unique_relationship_request
+    RelationshipRequest.objects.create(
+        requester_id=requester.id,
+        receiver_id=receiver.id,
+        status=Status.PENDING
+    )
+    pending_request_counts.incr(receiver.id)
+    enqueue_user_message(receiver.id, 'relationship_request_notification', {
+        'message': f'{requester.first_name} has asked you to be in a loving relationship with you',
+        'requester_id': str(requester.id),
+        'requester_name': requester.first_name
+    })
+
+
+@transaction.atomic
+def respond_relationship_request(pk, current_user, accept, relationship_start_date):
+    """
+    Accept or reject a pending request in one transaction. Returns the
+    request and whether this call answered it.
+
+    The request row is locked, so concurrent answers are serialised and the
+    loser sees the new status; a request that is no longer pending is left
+    untouched. Accepting costs six statements between the transaction's
+    SAVEPOINT and RELEASE (eight queries in all): the locking SELECT
+    (requester joined), the Relationship and Chat INSERTs, the partner
+    UPDATE of ``link_partners``, the status UPDATE and the outbox INSERT.
+    """
+    relationship_request = RelationshipRequest.objects.select_for_update(
+        of=('self',)).select_related('requester').get(pk=pk)
+    if relationship_request.status != Status.PENDING:
+        return relationship_request, False
+
+    if accept:
+        Relationship.objects.create(
+            user_one_id=relationship_request.requester_id,
+            user_two_id=relationship_request.receiver_id,
+            relationship_start_date=relationship_start_date
+        )
+        message = f'{current_user.first_name} said yes! Congrats!'
+    else:
+        message = f'{current_user.first_name} has said no, I\'m sorry...'
+    relationship_request.status = Status.ACCEPTED if accept else Status.REJECTED
+    RelationshipRequest.objects.filter(
+        pk=relationship_request.pk).update(status=relationship_request.status)
+    pending_request_counts.decr(relationship_request.receiver_id)
+    enqueue_user_message(relationship_request.requester_id, 'relationship_request_notification', {
+        'message': message,
+        'requester_id': str(current_user.id),
+        'requester_name': current_user.first_name
+    })
+    return relationship_request, True
+
+
+class ManageRelationshipsView(AsyncAPIView):
     def get_relationships(self, user):
-        relationship = Relationship.objects.filter(
+        return Relationship.objects.filter(
             Q(user_one_id=user) | Q(user_two_id=user)
         )
-        serializer = RelationshipSerializer(relationship, many=True).data
-        return serializer
 
-    def get(self, request):
+    async def get(self, request):
         current_user = request.user
         try:
-            relationship = self.get_relationships(current_user)
-            return Response(relationship, status=status.HTTP_200_OK)
+            relationship = [
+                relationship async for relationship in self.get_relationships(current_user)]
+            serializer = RelationshipSerializer(relationship, many=True).data
+            return Response(serializer, status=status.HTTP_200_OK)
         except Exception as e:
             return Response({"message": "Error requesting user relationship", "full_error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-    def delete(self, request):
+    async def delete(self, request):
         current_user = request.user
         try:
             relationship = self.get_relationships(current_user)
-            if len(relationship):
-                relationship.delete()
+            if await relationship.aexists():
+                await relationship.adelete()
                 return Response({"message": "You have ended things with your partner"}, status=status.HTTP_200_OK)
             else:
                 return Response({"message": "You don't have a relationship to terminate"}, status=status.HTTP_409_CONFLICT)
@@ -41,37 +107,35 @@ class ManageRelationshipsView(APIView):
             return Response({"message": "Error terminating relationship", "full_error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 
-class CreateRelationshipRequestView(APIView):
-    def post(self, request):
+class CreateRelationshipRequestView(AsyncAPIView):
+    async def post(self, request):
         current_user = request.user
         try:
             connection_code = request.data.get('connection_code')
             if not connection_code:
                 return Response({"message": "Please provide a connection code"}, status=status.HTTP_400_BAD_REQUEST)
-            partner = Users.objects.get(connection_code=connection_code)
+            partner = await connection_code_cache.aresolve(connection_code)
+            if partner is None:
+                return Response({"message": "Error in creating relationship request", "full_error": "No user has this connection code"}, status=status.HTTP_400_BAD_REQUEST)
             if partner.id == current_user.id:
                 return Response({"message": "Please provide a user code other than your own"}, status=status.HTTP_400_BAD_REQUEST)
-            RelationshipRequest.objects.get_or_create(
-                requester=Users.objects.get(pk=current_user.id),
-                receiver=Users.objects.get(pk=partner.id),
-                status='PENDING'
-            )
-            send_socket_message(f"user_{partner.id}", 'relationship_request_notification', {
-                'message': f'{current_user.first_name} has asked you to be in a loving relationship with you',
-                'requester_id': str(current_user.id),
-                'requester_name': current_user.first_name
-            })
+            try:
+                await sync_to_async(create_relationship_request)(current_user, partner)
+            except IntegrityError:
+                if await RelationshipRequest.objects.filter(requester=current_user, receiver_id=partner.id).aexists():
+                    return Response({"message": "Error in creating relationship request", "full_error": 'Request already exists'}, status=status.HTTP_400_BAD_REQUEST)
+                # The cached partner was deleted meanwhile
+                await sync_to_async(connection_code_cache.invalidate)(connection_code)
+                raise
 
             return Response({"message": f"{current_user.first_name} has asked {partner.first_name} to be in a loving relationship with them!"}, status=status.HTTP_200_OK)
 
         except Exception as e:
-            if 'Duplicate entry' in str(e):
-                return Response({"message": "Error in creating relationship request", "full_error": 'Request already exists'}, status=status.HTTP_400_BAD_REQUEST)
             return Response({"message": "Error in creating relationship request", "full_error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 
-class RespondRelationshipRequestView(APIView):
-    def post(self, request, pk):
+class RespondRelationshipRequestView(AsyncAPIView):
+    async def post(self, request, pk):
         current_user = request.user
         today = date.today()
 
@@ -80,45 +144,111 @@ class RespondRelationshipRequestView(APIView):
                 return Response({"message": "Please provide an existing request id"}, status=status.HTTP_400_BAD_REQUEST)
 
             accept = request.data.get('accept')
-            relationship_request = RelationshipRequest.objects.get(pk=pk)
-
-            if relationship_request.status != 'PENDING':
-                return Response({"message": f"Relationship has already been {relationship_request.status.lower()}"}, status=status.HTTP_400_BAD_REQUEST)
+            if accept is True or str(accept).lower() == 'true':
+                accept = True
+            elif accept is False or str(accept).lower() == 'false':
+                accept = False
             else:
-                partner = Users.objects.get(
-                    pk=relationship_request.requester.id)
-                if accept is True or str(accept).lower() == 'true':
-                    relationship_start_date = request.data.get(
-                        'relationship_start_date') or today
-                    Relationship.objects.create(
-                        user_one=relationship_request.requester,
-                        user_two=relationship_request.receiver,
-                        relationship_start_date=relationship_start_date
-                    )
-
-                    RelationshipRequest.objects.filter(
-                        pk=pk).update(status='ACCEPTED')
-                    send_socket_message(f"user_{partner.id}", 'relationship_request_notification', {
-                        'message': f'{current_user.first_name} said yes! Congrats!',
-                        'requester_id': str(current_user.id),
-                        'requester_name': current_user.first_name
-                    })
-
-                    return Response({"message": f"{current_user.first_name} and {partner.first_name} are now dating! Congratulations!"}, status=status.HTTP_200_OK)
-
-                elif accept is False or str(accept).lower() == 'false':
-                    RelationshipRequest.objects.filter(
-                        pk=pk).update(status='REJECTED')
-
-                    send_socket_message(f"user_{partner.id}", 'relationship_request_notification',  {
-                        'message': f'{current_user.first_name} has said no, I\'m sorry...',
-                        'requester_id': str(current_user.id),
-                        'requester_name': current_user.first_name
-                    })
-
-                    return Response({"message": f"{current_user.first_name} has rejected {partner.first_name}'s love confession :("}, status=status.HTTP_200_OK)
-
+                return Response({"message": "Please say whether you accept the request"}, status=status.HTTP_400_BAD_REQUEST)
+            relationship_start_date = request.data.get(
+                'relationship_start_date') or today
+
+            relationship_request, answered = await sync_to_async(respond_relationship_request)(
+                pk, current_user, accept, relationship_start_date)
+            if not answered:
+                return Response({"message": f"Relationship has already been {relationship_request.get_status_display().lower()}"}, status=status.HTTP_400_BAD_REQUEST)
+
+            partner = relationship_request.requester
+            if accept:
+                return Response({"message": f"{current_user.first_name} and {partner.first_name} are now dating! Congratulations!"}, status=status.HTTP_200_OK)
+            return Response({"message": f"{current_user.first_name} has rejected {partner.first_name}'s love confession :("}, status=status.HTTP_200_OK)
+
+        except IntegrityError:
+            # The couple already has a relationship
+            return Response({"message": "Error in creating another relationship", "full_error": 'Request already accepted'}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
-            if 'Duplicate entry' in str(e):
-                return Response({"message": "Error in creating another relationship", "full_error": 'Request already accepted'}, status=status.HTTP_400_BAD_REQUEST)
             return Response({"message": "Error in responding to relationship request", "full_error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+
+class RelationshipRequestListView(ListAPIView):
+    """
+    Requests the user received (inbox) or sent (outbox), newest first;
+    ``?status=`` picks PENDING (default), ACCEPTED or REJECTED.
+    """
+    serializer_class = RelationshipRequestSerializer
+    pagination_class = RelationshipRequestPagination
+    user_field = None
+
+    def get_queryset(self):
+        request_status = self.request.query_params.get('status', 'PENDING').upper()
+        if request_status not in Status.names:
+            raise ValidationError({"status": f"Expected one of {', '.join(Status.names)}"})
+        return RelationshipRequest.objects.filter(
+            **{self.user_field: self.request.user}, status=Status[request_status]
+        ).select_related('requester', 'receiver').only(
+            'id', 'status',
+            'requester__id', 'requester__username', 'requester__first_name',
+            'receiver__id', 'receiver__username', 'receiver__first_name')
+
+
+class RelationshipRequestInboxView(RelationshipRequestListView):
+    user_field = 'receiver'
+
+
+class RelationshipRequestOutboxView(RelationshipRequestListView):
+    user_field = 'requester'
+
+
+class PendingRequestCountView(AsyncAPIView):
+    async def get(self, request):
+        try:
+            pending = await pending_request_counts.aget(request.user.id)
+            return Response({"pending": pending}, status=status.HTTP_200_OK)
+        except Exception as e:
+            return Response({"message": "Error counting relationship requests", "full_error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+
+def relationship_stats(relationship_id, days):
+    """
+    Statistics of a relationship and its chat, read from the daily message
+    rollups: three queries, however many messages the couple has sent.
+    """
+    relationship = Relationship.objects.filter(pk=relationship_id).values(
+        'user_one_id', 'user_two_id', 'relationship_start_date',
+        chat_id=F('chat_relationship__id')).first()
+    if relationship is None:
+        return None
+    today = timezone.localdate()
+    start_date = relationship['relationship_start_date']
+    totals = message_totals(relationship['chat_id'])
+    since = today - timedelta(days=days - 1)
+    daily = messages_per_day(relationship['chat_id'], since)
+    return {
+        'relationship_start_date': start_date,
+        'days_together': (today - start_date).days if start_date else None,
+        'total_messages': sum(totals.values()),
+        'messages_by_user': {
+            str(user_id): totals.get(user_id, 0)
+            for user_id in (relationship['user_one_id'], relationship['user_two_id'])
+        },
+        'messages_per_day': [{'day': day, 'count': count} for day, count in daily],
+        'average_messages_per_day': round(sum(count for _, count in daily) / days, 2),
+    }
+
+
+class RelationshipStatsView(AsyncAPIView):
+    async def get(self, request):
+        """``?days=`` (1-366, default 30) sets the window of the per-day series and average."""
+        current_user = request.user
+        try:
+            days = int(request.query_params.get('days', 30))
+            if not 1 <= days <= 366:
+                return Response({"message": "Please provide between 1 and 366 days"}, status=status.HTTP_400_BAD_REQUEST)
+            if current_user.current_relationship_id is None:
+                return Response({"message": "You don't have a relationship"}, status=status.HTTP_404_NOT_FOUND)
+            stats = await sync_to_async(relationship_stats)(current_user.current_relationship_id, days)
+            if stats is None:
+                return Response({"message": "You don't have a relationship"}, status=status.HTTP_404_NOT_FOUND)
+            return Response(stats, status=status.HTTP_200_OK)
+        except Exception as e:
+            return Response({"message": "Error fetching relationship stats", "full_error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
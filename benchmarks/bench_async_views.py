@@ -0,0 +1,158 @@
+"""
+Load test for the async Chat and Relationships views.
+
+Concurrent clients call the typing-status and chat endpoints through the
+real ASGI handler, once against sync ``APIView`` copies of the views (run in
+Django's thread-sensitive executor, reaching the channel layer through
+``async_to_sync``) and once against the async views. The in-memory channel
+layer is used so the numbers isolate the thread hops, not Redis.
+
+    python -m benchmarks.bench_async_views --clients 100 --requests 20
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from benchmarks.common import Timer, benchmark_database, report
+
+urlpatterns = []
+
+
+def build_urls():
+    from django.db.models import Q
+    from django.urls import include, path
+    from rest_framework.response import Response
+    from rest_framework.views import APIView
+
+    from apps.Chat.models import Chat
+    from apps.Chat.serializer import ChatSerializer
+    from services.socket_message import chat_group, send_socket_message
+
+    class SyncPartnerStatusView(APIView):
+        def post(self, request, user_id):
+            data = request.data
+            send_socket_message(chat_group(data.get('chat_id')), 'typing_status', {
+                "type": "typing_status",
+                "user_id": str(user_id),
+                "is_typing": data.get("is_typing")
+            })
+            return Response({"is_typing": data.get("is_typing")})
+
+    class SyncChatView(APIView):
+        def get(self, request):
+            chat = Chat.objects.get(Q(user_one_id=request.user) | Q(user_two_id=request.user))
+            return Response(ChatSerializer(chat).data)
+
+    urlpatterns[:] = [
+        path("api/", include("apps.Chat.urls")),
+        path("sync/chat/", SyncChatView.as_view()),
+        path("sync/chat/is_partner_online/<uuid:user_id>/", SyncPartnerStatusView.as_view()),
+    ]
+
+
+async def call(app, method, path, token, body=None):
+    payload = json.dumps(body).encode() if body is not None else b""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [
+            (b"host", b"localhost"),
+            (b"authorization", f"Bearer {token}".encode()),
+            (b"content-type", b"application/json"),
+        ],
+        "client": ("127.0.0.1", 50000),
+        "server": ("localhost", 80),
+    }
+    messages = [{"type": "http.request", "body": payload, "more_body": False}]
+    response = {}
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        # Django waits for a disconnect while the view runs; none comes
+        await asyncio.Future()
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+
+    await app(scope, receive, send)
+    return response["status"]
+
+
+async def load(app, prefix, couples, requests_per_client):
+    latencies = []
+    errors = 0
+
+    async def client(user, token, chat_id):
+        nonlocal errors
+        for i in range(requests_per_client):
+            start = time.perf_counter()
+            if i % 2:
+                status = await call(app, "GET", f"{prefix}chat/", token)
+            else:
+                status = await call(
+                    app, "POST", f"{prefix}chat/is_partner_online/{user.id}/", token,
+                    {"type": "typing", "chat_id": str(chat_id), "is_typing": True})
+            latencies.append(time.perf_counter() - start)
+            errors += status != 200
+
+    with Timer() as timer:
+        await asyncio.gather(*(
+            client(user, token, chat_id)
+            for pair, chat_id in couples for user, token in pair
+        ))
+    return timer.elapsed, latencies, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=20)
+    args = parser.parse_args()
+
+    with benchmark_database():
+        from django.core.handlers.asgi import ASGIHandler
+        from django.test.utils import override_settings
+        from rest_framework_simplejwt.tokens import AccessToken
+
+        from apps.Account.models import Users
+        from apps.Chat.models import Chat
+        from apps.Relationships.models import Relationship
+
+        couples = []
+        for i in range(max(1, args.clients // 2)):
+            pair = [
+                Users.objects.create_user(
+                    username=f"load{i}{side}", email=f"load{i}{side}@example.com",
+                    connection_code=f"L{i:04d}{side}", password="benchpass")
+                for side in "ab"
+            ]
+            Relationship.objects.create(user_one=pair[0], user_two=pair[1])
+            chat = Chat.objects.get(user_one=pair[0])
+            couples.append(([(user, str(AccessToken.for_user(user))) for user in pair], chat.id))
+
+        build_urls()
+        layers = {"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+        with override_settings(ROOT_URLCONF=__name__, CHANNEL_LAYERS=layers):
+            app = ASGIHandler()
+            total = len(couples) * 2 * args.requests
+            for label, prefix in (("sync APIView", "/sync/"), ("async views", "/api/")):
+                elapsed, latencies, errors = asyncio.run(
+                    load(app, prefix, couples, args.requests))
+                report(label, total, elapsed, latencies)
+                if errors:
+                    print(f"  {errors} non-200 responses")
+
+
+if __name__ == "__main__":
+    main()
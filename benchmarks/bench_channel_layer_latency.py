@@ -0,0 +1,62 @@
+"""
+group_send -> receive latency of RedisChannelLayer vs LocalFirstRedisChannelLayer.
+
+Every member of a two-member ``chat_<id>`` group lives in this process, as
+on a single daphne node, so the hybrid layer never publishes to Redis.
+Needs redis-server on PATH.
+
+    python -m benchmarks.bench_channel_layer_latency --messages 5000
+"""
+
+import argparse
+import asyncio
+import time
+import uuid
+
+from benchmarks.common import Timer, report
+from benchmarks.redis_servers import local_redis_servers, redis_server_available
+
+
+async def measure(layer, messages):
+    from services.socket_message import chat_group
+
+    group = chat_group(uuid.uuid4())
+    members = [await layer.new_channel() for _ in range(2)]
+    for channel in members:
+        await layer.group_add(group, channel)
+
+    latencies = []
+    with Timer() as timer:
+        for i in range(messages):
+            start = time.perf_counter()
+            await layer.group_send(group, {"type": "new_message_notification", "seq": i})
+            for channel in members:
+                await layer.receive(channel)
+            latencies.append(time.perf_counter() - start)
+
+    await layer.flush()
+    await layer.close_pools()
+    return timer.elapsed, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=5000)
+    args = parser.parse_args()
+
+    if not redis_server_available():
+        raise SystemExit("redis-server not found on PATH")
+
+    from channels_redis.core import RedisChannelLayer
+
+    from services.channel_layers import LocalFirstRedisChannelLayer
+
+    with local_redis_servers(1) as hosts:
+        for layer_class in (RedisChannelLayer, LocalFirstRedisChannelLayer):
+            elapsed, latencies = asyncio.run(
+                measure(layer_class(hosts=hosts), args.messages))
+            report(layer_class.__name__, args.messages, elapsed, latencies)
+
+
+if __name__ == "__main__":
+    main()
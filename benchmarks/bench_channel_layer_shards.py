@@ -0,0 +1,70 @@
+"""
+group_send throughput of ShardedRedisChannelLayer as Redis shards are added.
+
+Starts local redis-server processes (redis-server must be on PATH), joins
+``--groups`` groups shaped like ``chat_<id>`` with two member channels each,
+then fans ``--messages`` group_sends out from ``--producers`` concurrent
+producers and reports messages per second for every shard count.
+
+    python -m benchmarks.bench_channel_layer_shards --max-shards 4
+"""
+
+import argparse
+import asyncio
+import collections
+import uuid
+
+from benchmarks.common import Timer, report
+from benchmarks.redis_servers import local_redis_servers, redis_server_available
+
+
+async def run(hosts, groups, messages, producers):
+    from services.channel_layers import ShardedRedisChannelLayer
+    from services.socket_message import chat_group
+
+    layer = ShardedRedisChannelLayer(hosts=hosts, capacity=messages)
+    group_names = [chat_group(uuid.uuid4()) for _ in range(groups)]
+    for group in group_names:
+        for _ in range(2):
+            await layer.group_add(group, await layer.new_channel())
+
+    placement = collections.Counter(layer.group_shard(g) for g in group_names)
+    queue = asyncio.Queue()
+    for i in range(messages):
+        queue.put_nowait(group_names[i % groups])
+
+    async def producer():
+        while not queue.empty():
+            group = queue.get_nowait()
+            await layer.group_send(group, {"type": "typing_status", "is_typing": True})
+
+    with Timer() as timer:
+        await asyncio.gather(*(producer() for _ in range(producers)))
+
+    await layer.flush()
+    await layer.close_pools()
+    return timer.elapsed, placement
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--max-shards", type=int, default=4)
+    parser.add_argument("--groups", type=int, default=1000)
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--producers", type=int, default=64)
+    args = parser.parse_args()
+
+    if not redis_server_available():
+        raise SystemExit("redis-server not found on PATH")
+
+    with local_redis_servers(args.max_shards) as all_hosts:
+        for shards in range(1, args.max_shards + 1):
+            elapsed, placement = asyncio.run(
+                run(all_hosts[:shards], args.groups, args.messages, args.producers)
+            )
+            report(f"{shards} shard(s)", args.messages, elapsed)
+            print("    groups per shard:", dict(sorted(placement.items())))
+
+
+if __name__ == "__main__":
+    main()
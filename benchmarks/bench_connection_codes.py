@@ -0,0 +1,128 @@
+"""
+Connection code allocation benchmark: email_to_code truncation vs the
+ConnectionCodeAllocator permutation.
+
+Part one needs no database: it derives codes for ``--users`` synthetic
+emails both ways and counts the collisions, i.e. the registrations the
+unique constraint would reject. Part two registers ``--registrations``
+users on top of ``--existing`` seeded ones in a throwaway database and
+measures registration throughput with each allocator.
+
+    python -m benchmarks.bench_connection_codes --users 3000000 --existing 200000
+"""
+
+import argparse
+import time
+
+from benchmarks.common import Timer, benchmark_database, report
+
+
+def email(i):
+    return f"user{i}@bench.invalid"
+
+
+def count_collisions(codes):
+    seen = set()
+    collisions = 0
+    for code in codes:
+        if code in seen:
+            collisions += 1
+        else:
+            seen.add(code)
+    return collisions
+
+
+def offline(users):
+    from apps.Account.utils import ConnectionCodeAllocator, email_to_code, int_to_code
+
+    with Timer() as timer:
+        collisions = count_collisions(email_to_code(email(i)) for i in range(users))
+    report("email_to_code", users, timer.elapsed)
+    print(f"  {collisions} collisions ({collisions / users * 100:.3f}% of registrations rejected)")
+
+    allocator = ConnectionCodeAllocator("bench-key")
+    with Timer() as timer:
+        collisions = count_collisions(
+            int_to_code(allocator.permutation.permute(i)) for i in range(users))
+    report("keyed permutation", users, timer.elapsed)
+    print(f"  {collisions} collisions")
+
+
+def seed(existing):
+    from apps.Account.models import Users
+    from apps.Account.utils import email_to_code
+
+    codes = set()
+    batch = []
+    for i in range(existing):
+        code = email_to_code(email(i))
+        if code in codes:
+            continue
+        codes.add(code)
+        batch.append(Users(username=f"seed{i}", email=email(i), connection_code=code))
+        if len(batch) == 5000:
+            Users.objects.bulk_create(batch)
+            batch = []
+    Users.objects.bulk_create(batch)
+    return len(codes)
+
+
+def register(start, count, code_for):
+    """Insert ``count`` users like a signup does; return (latencies, rejected)."""
+    from django.db import IntegrityError, transaction
+
+    from apps.Account.models import Users
+
+    latencies = []
+    rejected = 0
+    for i in range(start, start + count):
+        begin = time.perf_counter()
+        try:
+            code = code_for(i)
+            with transaction.atomic():
+                Users.objects.create(
+                    username=f"bench{i}", email=email(i), connection_code=code)
+        except IntegrityError:
+            rejected += 1
+        latencies.append(time.perf_counter() - begin)
+    return latencies, rejected
+
+
+def online(existing, registrations):
+    from apps.Account.utils import ConnectionCodeAllocator, email_to_code
+
+    seeded = seed(existing)
+    print(f"seeded {seeded} users")
+
+    with Timer() as timer:
+        latencies, rejected = register(
+            existing, registrations, lambda i: email_to_code(email(i)))
+    report("register email_to_code", registrations, timer.elapsed, latencies)
+    print(f"  {rejected} rejected by the unique constraint")
+
+    start = existing + registrations
+    for check_taken in (True, False):
+        allocator = ConnectionCodeAllocator("bench-key", check_taken=check_taken)
+        with Timer() as timer:
+            latencies, rejected = register(
+                start, registrations, lambda i: allocator.allocate())
+        label = "register allocator" + (" (checked)" if check_taken else "")
+        report(label, registrations, timer.elapsed, latencies)
+        print(f"  {rejected} rejected by the unique constraint")
+        start += registrations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=3_000_000)
+    parser.add_argument("--existing", type=int, default=200_000)
+    parser.add_argument("--registrations", type=int, default=2000)
+    args = parser.parse_args()
+
+    with benchmark_database():
+        offline(args.users)
+        online(args.existing, args.registrations)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Login burst benchmark: PBKDF2 in the request threads vs the bounded
+process pool of services.password_hashing.
+
+``--concurrency`` threads (a worker's request threads) verify passwords
+like a login does, ``--logins`` in total, while a probe thread stands in
+for the other requests of the worker: it repeatedly does a little Python
+work and records how long each round takes. Reported: logins/s and login
+latency, and the probe's latency, inline and with each ``--workers`` pool
+size. Run it on the production core count; the difference comes from the
+cores the pool leaves free.
+
+    python -m benchmarks.bench_password_hashing --logins 200 --concurrency 32 --workers 1 2 4
+"""
+
+import argparse
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import Timer, report
+
+
+def probe(stop, latencies):
+    while not stop.is_set():
+        begin = time.perf_counter()
+        sum(i * i for i in range(20000))
+        latencies.append(time.perf_counter() - begin)
+        time.sleep(0.005)
+
+
+def login_burst(label, hasher, encoded, password, logins, concurrency):
+    latencies = []
+    probe_latencies = []
+    stop = threading.Event()
+    prober = threading.Thread(target=probe, args=(stop, probe_latencies))
+
+    def login(_):
+        begin = time.perf_counter()
+        assert hasher.verify(password, encoded)
+        latencies.append(time.perf_counter() - begin)
+
+    prober.start()
+    with Timer() as timer:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(login, range(logins)))
+    stop.set()
+    prober.join()
+    report(f"login {label}", logins, timer.elapsed, latencies)
+    report(f"  other requests {label}", len(probe_latencies), timer.elapsed, probe_latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--workers", type=int, nargs="+", default=[max(1, (os.cpu_count() or 2) // 2)])
+    parser.add_argument("--iterations", type=int, help="PBKDF2 iterations (default: Django's).")
+    args = parser.parse_args()
+
+    import django
+
+    django.setup()
+    from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+    from services import password_hashing
+
+    class InlineHasher(PBKDF2PasswordHasher):
+        iterations = args.iterations or PBKDF2PasswordHasher.iterations
+
+    class PooledHasher(password_hashing.PooledPBKDF2PasswordHasher):
+        iterations = InlineHasher.iterations
+
+    password = "correct horse battery staple"
+    encoded = InlineHasher().encode(password, InlineHasher().salt())
+    print(f"{os.cpu_count()} cores, {InlineHasher.iterations} iterations, "
+          f"{args.concurrency} concurrent logins")
+
+    login_burst("inline", InlineHasher(), encoded, password, args.logins, args.concurrency)
+    for workers in args.workers:
+        pool = password_hashing.PasswordHashingPool(workers=workers)
+        password_hashing.password_hashing_pool = pool
+        # Start the processes before timing
+        for _ in range(workers):
+            PooledHasher().verify(password, encoded)
+        login_burst(f"pool of {workers}", PooledHasher(), encoded, password,
+                    args.logins, args.concurrency)
+        pool.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Reconnect-storm benchmark for JWTAuthMiddleware.
+
+Simulates a deploy: every user reconnects several times at once. Each
+handshake goes through the real middleware (token check + user lookup) in
+front of an app that returns immediately, so the numbers isolate auth cost.
+
+    python -m benchmarks.bench_ws_handshakes --users 200 --reconnects 10
+"""
+
+import argparse
+import asyncio
+import time
+
+from benchmarks.common import Timer, benchmark_database, report
+
+
+async def storm(middleware, tokens, reconnects, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def noop_app(scope, receive, send):
+        return None
+
+    app = middleware(noop_app)
+
+    async def handshake(token):
+        async with semaphore:
+            start = time.perf_counter()
+            await app(
+                {"type": "websocket", "query_string": f"token={token}".encode()},
+                None,
+                None,
+            )
+            latencies.append(time.perf_counter() - start)
+
+    with Timer() as timer:
+        await asyncio.gather(
+            *(handshake(token) for _ in range(reconnects) for token in tokens)
+        )
+    return timer.elapsed, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--reconnects", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=200)
+    args = parser.parse_args()
+
+    with benchmark_database():
+        from django.contrib.auth import get_user_model
+        from rest_framework_simplejwt.tokens import AccessToken
+
+        from services.websocket import middleware
+        from services.websocket.user_cache import UserCache
+
+        User = get_user_model()
+        tokens = []
+        for i in range(args.users):
+            user = User.objects.create(
+                username=f"storm{i}",
+                email=f"storm{i}@example.com",
+                connection_code=f"S{i:05d}",
+            )
+            tokens.append(str(AccessToken.for_user(user)))
+
+        total = args.users * args.reconnects
+        configured_cache = middleware.user_cache
+        for label, cache in (
+            ("uncached (DB per handshake)", UserCache(max_size=0)),
+            ("cached", configured_cache),
+        ):
+            cache.clear()
+            middleware.user_cache = cache
+            elapsed, latencies = asyncio.run(
+                storm(middleware.JWTAuthMiddleware, tokens,
+                      args.reconnects, args.concurrency)
+            )
+            report(label, total, elapsed, latencies)
+        middleware.user_cache = configured_cache
+
+
+if __name__ == "__main__":
+    main()
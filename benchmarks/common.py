@@ -0,0 +1,62 @@
+"""
+Shared helpers for the benchmark scripts.
+
+Benchmarks run against a throwaway test database created with the same
+machinery as the test suite, so they never touch development data.
+"""
+
+import os
+import statistics
+import time
+from contextlib import contextmanager
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mcda_api_project.settings')
+
+
+@contextmanager
+def benchmark_database():
+    import django
+
+    django.setup()
+    from django.test.utils import (
+        setup_databases,
+        setup_test_environment,
+        teardown_databases,
+        teardown_test_environment,
+    )
+
+    setup_test_environment()
+    old_config = setup_databases(verbosity=0, interactive=False)
+    try:
+        yield
+    finally:
+        teardown_databases(old_config, verbosity=0)
+        teardown_test_environment()
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def report(label, count, elapsed, latencies=None):
+    line = f"{label:<32} {count:>7} ops  {elapsed:8.3f}s  {count / elapsed:10.1f} ops/s"
+    if latencies:
+        line += "  p50 {:.2f}ms  p99 {:.2f}ms  mean {:.2f}ms".format(
+            percentile(latencies, 50) * 1000,
+            percentile(latencies, 99) * 1000,
+            statistics.mean(latencies) * 1000,
+        )
+    print(line)
+
+
+class Timer:
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
@@ -0,0 +1,55 @@
+"""
+Throwaway local redis-server processes for channel layer benchmarks and tests.
+"""
+
+import shutil
+import socket
+import subprocess
+import tempfile
+import time
+from contextlib import contextmanager
+
+
+def redis_server_available():
+    return shutil.which("redis-server") is not None
+
+
+def _wait_for_port(port, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.1):
+                return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"redis-server on port {port} did not start")
+
+
+@contextmanager
+def local_redis_servers(count, base_port=16379):
+    """Start ``count`` persistence-free redis-servers and yield their hosts."""
+    processes = []
+    workdir = tempfile.mkdtemp(prefix="mcda-redis-")
+    try:
+        for offset in range(count):
+            port = base_port + offset
+            processes.append(subprocess.Popen(
+                [
+                    "redis-server",
+                    "--port", str(port),
+                    "--bind", "127.0.0.1",
+                    "--save", "",
+                    "--appendonly", "no",
+                    "--dir", workdir,
+                ],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            ))
+            _wait_for_port(port)
+        yield [("127.0.0.1", base_port + offset) for offset in range(count)]
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait(timeout=5)
+        shutil.rmtree(workdir, ignore_errors=True)
@@ -17,6 +17,8 @@ from apps.Relationships.routing import relationship_ws_urlpatterns # noqa: E402
 from apps.Chat.routing import chat_ws_urlpatterns # noqa: E402
 from django.conf import settings  # noqa: E402
 from django.core.asgi import get_asgi_application # noqa: E402
+from services.outbox import OutboxDispatcherMiddleware # noqa: E402
+from services.websocket.drain import install_drain_signal_handler # noqa: E402
 
 ws_urls = relationship_ws_urlpatterns + chat_ws_urlpatterns
 application = get_asgi_application()
@@ -33,7 +35,9 @@ else:
         )
     )
 
-application = ProtocolTypeRouter({
+install_drain_signal_handler()
+
+application = OutboxDispatcherMiddleware(ProtocolTypeRouter({
     "http": application,
     "websocket": websocket_app,
-})
\ No newline at end of file
+}))
\ No newline at end of file
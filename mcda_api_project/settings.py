@@ -73,6 +73,7 @@ INSTALLED_APPS = [
     "apps.Privacy",
     "apps.Relationships",
     "apps.Chat",
+    "apps.Global",
     "cloudinary",
     "cloudinary_storage",
 ]
@@ -112,15 +113,142 @@ TEMPLATES = [
 WSGI_APPLICATION = "mcda_api_project.wsgi.application"
 ASGI_APPLICATION = "mcda_api_project.asgi.application"
 
+# Comma separated "host:port" or redis:// URLs. With several hosts, groups are
+# sharded across them on a consistent hash ring (services/channel_layers.py).
+# Every daphne/uvicorn worker must list the hosts in the same order.
+# Consumers living in the sending process are served in-process; only members
+# in other processes are published to through Redis.
+REDIS_HOSTS = [
+    host if "://" in host else (host.rsplit(":", 1)[0], int(host.rsplit(":", 1)[1]))
+    for host in os.getenv("REDIS_HOSTS", "127.0.0.1:6379").split(",")
+]
+
 CHANNEL_LAYERS = {
     "default": {
-        "BACKEND": "channels_redis.core.RedisChannelLayer",
+        "BACKEND": "services.channel_layers.LocalFirstRedisChannelLayer",
         "CONFIG": {
-            "hosts": [("127.0.0.1", 6379)],
+            "hosts": REDIS_HOSTS,
+            # Memberships not refreshed by a live socket expire (see WS_HEARTBEAT)
+            "group_expiry": 3600,
         },
     },
 }
 
+# Shared by every worker: the replay log, WebSocket subscriber counts and
+# presence only work across processes with a shared cache.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.getenv("REDIS_CACHE_URL", "redis://127.0.0.1:6379/1"),
+    }
+}
+
+# Open sockets per channel layer group (services/websocket/subscribers.py).
+# Producers skip group_send for groups known to have no sockets. Sockets of
+# crashed workers drop out TTL seconds after their last WS_HEARTBEAT refresh.
+WS_SUBSCRIBERS = {
+    "ENABLED": True,
+    "TTL": 7200,  # seconds
+}
+
+# Debounced user_status broadcasts (services/websocket/presence.py). A user is
+# online while any of their chat sockets is open and announced offline only
+# after the last one has been closed for GRACE seconds (0 announces at once).
+WS_PRESENCE = {
+    "GRACE": 10,  # seconds
+    "TTL": 7200,  # seconds, kept alive by WS_HEARTBEAT
+}
+
+# Minimal user records cached by JWTAuthMiddleware (services/websocket/user_cache.py)
+WS_USER_CACHE = {
+    "MAX_SIZE": 10000,
+    "TTL": 300,  # seconds
+    # Also share records between workers through the Django cache
+    "USE_SHARED_CACHE": False,
+}
+
+# Connection code -> (id, first_name) lookups for relationship requests
+# (services/connection_code_cache.py), invalidated on Users save/delete
+CONNECTION_CODE_CACHE = {
+    "MAX_SIZE": 50000,
+    "TTL": 300,  # seconds
+    "USE_SHARED_CACHE": True,
+}
+
+# Pending relationship request count per receiver, for the badge
+# (services/pending_requests.py). Kept in the Django cache, adjusted on
+# create/respond and recounted after TTL.
+PENDING_REQUEST_COUNTS = {
+    "TTL": 300,  # seconds
+}
+
+# Username/email availability checks of the signup form
+# (services/user_availability.py): answers are cached for TTL seconds, and a
+# per-process Bloom filter sized for BLOOM_CAPACITY users (grown to twice the
+# user count) answers "available" without a query; it is rebuilt every
+# BLOOM_MAX_AGE seconds in a background thread (BUILD_IN_BACKGROUND). A deleted user's username/email may read as taken
+# for up to TTL seconds; if the cache loses a new user's entries, other
+# workers may read them as available until their filter is rebuilt.
+USER_AVAILABILITY = {
+    "TTL": 60,  # seconds
+    "BLOOM_CAPACITY": 100000,
+    "BLOOM_ERROR_RATE": 0.01,
+    "BLOOM_MAX_AGE": 3600,  # seconds
+    "BUILD_IN_BACKGROUND": True,
+}
+
+# Pending relationship requests older than MAX_AGE_DAYS are deleted by
+# `manage.py expire_relationship_requests` (services/request_expiry.py) in
+# transactions of BATCH_SIZE rows, sleeping PAUSE seconds in between.
+RELATIONSHIP_REQUEST_EXPIRY = {
+    "MAX_AGE_DAYS": 30,
+    "BATCH_SIZE": 500,
+    "PAUSE": 0.0,  # seconds
+}
+
+# Per-user log of recent socket events replayed to reconnecting clients that
+# send ?last_seq=<n> (services/websocket/replay.py). Stored in the Django cache,
+# which must be shared by all workers unless ALLOW_LOCAL_CACHE is set.
+WS_REPLAY_LOG = {
+    "MAX_EVENTS": 100,
+    "TTL": 86400,  # seconds per event; the sequence counter never expires
+    "ALLOW_LOCAL_CACHE": False,
+}
+
+# Graceful WebSocket draining before restarts (services/websocket/drain.py).
+# `kill -USR1 <worker pid>` refuses new sockets, asks open ones to reconnect in
+# WAVES batches with jittered delays spread over WINDOW seconds, then exits.
+WS_DRAIN = {
+    "SIGNAL": "SIGUSR1",
+    "WINDOW": 60,  # seconds
+    "WAVES": 10,
+    "CLOSE_CODE": 1012,  # Service Restart
+}
+
+# Transactional outbox for socket notifications (services/outbox.py). Each
+# ASGI worker publishes committed rows in batches of BATCH_SIZE and polls every
+# POLL_INTERVAL seconds for leftovers; claimed rows are retried after LEASE.
+SOCKET_OUTBOX = {
+    "BATCH_SIZE": 100,
+    "POLL_INTERVAL": 1.0,  # seconds
+    "LEASE": 30,  # seconds
+}
+
+# Application level ping/pong for WebSocket consumers (services/websocket/heartbeat.py).
+# Sockets get {"type": "ping"} every INTERVAL seconds (0 disables) and are closed
+# with CLOSE_CODE after TIMEOUT seconds without any client frame. Live sockets
+# re-add their groups every GROUP_REFRESH seconds, which must stay below the
+# channel layer's group_expiry.
+WS_HEARTBEAT = {
+    "INTERVAL": 25,  # seconds
+    "TIMEOUT": 75,  # seconds
+    "CLOSE_CODE": 4000,
+    "GROUP_REFRESH": 1800,  # seconds
+}
+
+# Client addresses allowed to scrape /api/global/metrics/ (Prometheus text format)
+METRICS_ALLOWED_IPS = os.getenv("METRICS_ALLOWED_IPS", "127.0.0.1").split(",")
+
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
@@ -147,12 +275,43 @@ if "test" in sys.argv or "pytest" in sys.modules:
             "BACKEND": "channels.layers.InMemoryChannelLayer",
         },
     }
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        },
+    }
+    # Tests run in a single process
+    WS_REPLAY_LOG = {**WS_REPLAY_LOG, "ALLOW_LOCAL_CACHE": True}
+    # A thread's own connection would not see the test's transaction
+    USER_AVAILABILITY = {**USER_AVAILABILITY, "BUILD_IN_BACKGROUND": False}
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
 AUTH_USER_MODEL = "Account.Users"
 
+# With WORKERS > 0, PBKDF2 runs in a bounded process pool
+# (services/password_hashing.py) so signup/login bursts cannot take every core:
+# WORKERS processes hash at once, up to MAX_PENDING more requests queue for
+# them and the rest wait for a slot. Opt-in and not yet measured on more
+# than one core (benchmarks/bench_password_hashing.py); 0 keeps Django's
+# hasher.
+PASSWORD_HASHING = {
+    "WORKERS": int(os.getenv("PASSWORD_HASHING_WORKERS", 0)),
+    "MAX_PENDING": 100,
+}
+
+PASSWORD_HASHERS = [
+    "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+    "django.contrib.auth.hashers.Argon2PasswordHasher",
+    "django.contrib.auth.hashers.BCryptSHA256PasswordHasher",
+    "django.contrib.auth.hashers.ScryptPasswordHasher",
+]
+if PASSWORD_HASHING["WORKERS"]:
+    # Same algorithm and format: hashes of either hasher verify with the other
+    PASSWORD_HASHERS.insert(0, "services.password_hashing.PooledPBKDF2PasswordHasher")
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator",
@@ -171,9 +330,40 @@ AUTH_PASSWORD_VALIDATORS = [
 REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": ("rest_framework.permissions.IsAuthenticated",),
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "services.authentication.CachedJWTAuthentication",
     ),
     "EXCEPTION_HANDLER": "services.exceptions.custom_exception.custom_exception_handler",
+    # Only views with a throttle_scope listed in RATE_LIMITS are throttled
+    "DEFAULT_THROTTLE_CLASSES": ("services.throttling.TokenBucketThrottle",),
+}
+
+# Connection code allocation (apps/Account/utils.py): codes are a keyed
+# permutation of a counter, reserved BLOCK_SIZE at a time per process. Keep
+# KEY stable once codes have been issued. CHECK_TAKEN skips codes that already
+# exist (codes from before the allocator, or from another KEY) at the cost of
+# one indexed lookup per signup.
+CONNECTION_CODES = {
+    "KEY": os.getenv("CONNECTION_CODE_KEY", SECRET_KEY),
+    "BLOCK_SIZE": 100,
+    "CHECK_TAKEN": True,
+}
+
+# Token-bucket rate limits per user (services/ratelimit.py): each scope refills
+# RATE tokens per second up to BURST. "ws.<event type>" scopes limit incoming
+# WebSocket frames ("ws.default" for the other types), the rest are DRF
+# throttle_scopes. Buckets are checked in-process first, then in the Django
+# cache so the limit holds across workers (SHARED).
+RATE_LIMITS = {
+    "SHARED": True,
+    "LOCAL_MAX_SIZE": 10000,
+    "SCOPES": {
+        "ws.default": {"RATE": 5, "BURST": 20},
+        "ws.typing": {"RATE": 2, "BURST": 10},
+        "ws.user_status": {"RATE": 0.5, "BURST": 5},
+        "ws.new_message_notification": {"RATE": 1, "BURST": 10},
+        "partner_status": {"RATE": 2, "BURST": 10},
+        "messages": {"RATE": 1, "BURST": 10},
+    },
 }
 
 AUTHENTICATION_BACKENDS = [
@@ -211,6 +401,16 @@ SIMPLE_JWT = {
     "ROTATE_REFRESH_TOKENS": True,
 }
 
+# Verified access tokens shared by the HTTP and WebSocket auth paths
+# (services/authentication.py). Entries never outlive the token's "exp".
+JWT_VERIFIED_TOKEN_CACHE = {
+    "MAX_SIZE": 50000,
+    "TTL": 600,  # seconds
+    # Dotted path to a callable(token) -> bool returning True for revoked tokens;
+    # it may query the database (the WebSocket path runs it in a thread)
+    "REVOCATION_CHECK": None,
+}
+
 # dj-rest-auth
 REST_AUTH = {
     "USE_JWT": True,
@@ -0,0 +1,105 @@
+import hashlib
+import time
+
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.utils.module_loading import import_string
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+
+from services.ttl_cache import TTLCache
+
+
+def token_digest(raw_token):
+    if isinstance(raw_token, str):
+        raw_token = raw_token.encode()
+    return hashlib.sha256(raw_token).hexdigest()
+
+
+class VerifiedTokenCache:
+    """
+    Verified JWTs keyed by a digest of the raw token, shared by the HTTP
+    (``CachedJWTAuthentication``) and WebSocket (``JWTAuthMiddleware``) paths.
+
+    The signature is checked once per token and process; later requests with
+    the same token only pay for a hash and a dict lookup. Entries never
+    outlive the token's ``exp`` claim, and the optional ``REVOCATION_CHECK``
+    hook is consulted on every lookup so revoked tokens are refused at once.
+    The hook may query the database: async callers use ``aget_or_verify``,
+    which runs it in a thread.
+    """
+
+    def __init__(self, max_size=50000, ttl=600, revocation_check=None):
+        self.tokens = TTLCache(max_size=max_size, ttl=ttl)
+        self.revocation_check = revocation_check
+
+    @classmethod
+    def from_settings(cls):
+        config = getattr(settings, "JWT_VERIFIED_TOKEN_CACHE", {})
+        revocation_check = config.get("REVOCATION_CHECK")
+        if isinstance(revocation_check, str):
+            revocation_check = import_string(revocation_check)
+        return cls(
+            max_size=config.get("MAX_SIZE", 50000),
+            ttl=config.get("TTL", 600),
+            revocation_check=revocation_check,
+        )
+
+    def get_or_verify(self, raw_token, verify):
+        """
+        Return the validated token for ``raw_token``, calling ``verify`` with
+        the raw token on a cache miss. Raises ``TokenError`` when the token
+        has been revoked.
+        """
+        digest, token = self._lookup(raw_token, verify)
+        if self.revocation_check is not None and self.revocation_check(token):
+            self._refuse(digest)
+        return token
+
+    async def aget_or_verify(self, raw_token, verify):
+        """``get_or_verify`` for the event loop, with the revocation hook in a thread."""
+        digest, token = self._lookup(raw_token, verify)
+        if self.revocation_check is not None and \
+                await database_sync_to_async(self.revocation_check)(token):
+            self._refuse(digest)
+        return token
+
+    def _lookup(self, raw_token, verify):
+        digest = token_digest(raw_token)
+        token = self.tokens.get(digest)
+        if token is None:
+            token = verify(raw_token)
+            self.tokens.set(digest, token, ttl=self._remaining_lifetime(token))
+        return digest, token
+
+    def _refuse(self, digest):
+        self.tokens.delete(digest)
+        raise TokenError("Token has been revoked")
+
+    def revoke(self, raw_token):
+        """Forget a token in this process so the next use is re-verified."""
+        self.tokens.delete(token_digest(raw_token))
+
+    def clear(self):
+        self.tokens.clear()
+
+    @staticmethod
+    def _remaining_lifetime(token):
+        exp = token.get("exp")
+        if exp is None:
+            return None
+        return exp - time.time()
+
+
+verified_tokens = VerifiedTokenCache.from_settings()
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """``JWTAuthentication`` that skips signature verification for tokens it has already verified."""
+
+    def get_validated_token(self, raw_token):
+        try:
+            return verified_tokens.get_or_verify(
+                raw_token, super().get_validated_token)
+        except TokenError as e:
+            raise InvalidToken(e.args[0])
@@ -0,0 +1,104 @@
+import asyncio
+import bisect
+import copy
+import hashlib
+
+from channels_redis.core import RedisChannelLayer
+
+
+class HashRing:
+    """
+    Consistent hash ring with virtual nodes.
+
+    Each of the ``size`` shards owns ``replicas`` points on a 64 bit ring and
+    a key belongs to the first point clockwise from its hash. Growing the
+    ring from N to N + 1 shards moves roughly 1 / (N + 1) of the keys, where
+    the contiguous ranges used by channels_redis move about half of them.
+    """
+
+    def __init__(self, size, replicas=160):
+        self.size = size
+        points = sorted(
+            (self._hash(f"shard-{shard}-{replica}"), shard)
+            for shard in range(size)
+            for replica in range(replicas)
+        )
+        self._points = [point for point, _ in points]
+        self._shards = [shard for _, shard in points]
+
+    @staticmethod
+    def _hash(value):
+        if isinstance(value, str):
+            value = value.encode("utf8")
+        return int.from_bytes(hashlib.md5(value).digest()[:8], "big")
+
+    def get_shard(self, key):
+        if self.size == 1:
+            return 0
+        index = bisect.bisect(self._points, self._hash(key))
+        return self._shards[index % len(self._points)]
+
+
+class ShardedRedisChannelLayer(RedisChannelLayer):
+    """
+    ``RedisChannelLayer`` that places groups (``chat_<id>``, ``user_<id>``)
+    and process channels on its hosts with a ``HashRing``, so shards can be
+    added without reshuffling most group memberships.
+
+    Every process talking to the same hosts must use the same host order.
+    """
+
+    def __init__(self, hosts=None, ring_replicas=160, **kwargs):
+        super().__init__(hosts=hosts, **kwargs)
+        self.ring = HashRing(self.ring_size, replicas=ring_replicas)
+
+    def consistent_hash(self, value):
+        return self.ring.get_shard(value)
+
+    def group_shard(self, group):
+        """Index of the host holding ``group``'s membership set."""
+        return self.consistent_hash(group)
+
+
+class LocalFirstRedisChannelLayer(ShardedRedisChannelLayer):
+    """
+    Sharded Redis layer that hands messages for channels owned by this
+    process straight to their receive buffers.
+
+    ``group_send`` still reads the group's members from Redis, but only the
+    members living in other processes are published to; the consumers in
+    this process are served without the Redis write, the BRPOP round trip
+    and the msgpack encode/decode. Direct ``send`` to a local channel never
+    touches Redis at all.
+    """
+
+    def is_local_channel(self, channel):
+        if "!" not in channel:
+            return False
+        if not self.non_local_name(channel).endswith(self.client_prefix + "!"):
+            return False
+        # Receive buffers are asyncio queues bound to the receiving loop
+        loop = self.receive_event_loop
+        return loop is None or loop is asyncio.get_running_loop()
+
+    def deliver_locally(self, channel, message):
+        # Copied like the Redis round trip would, so consumers never share state
+        self.receive_buffer[channel].put_nowait(copy.deepcopy(message))
+
+    async def send(self, channel, message):
+        if self.is_local_channel(channel):
+            assert isinstance(message, dict), "message is not a dict"
+            self.deliver_locally(channel, message)
+            return
+        await super().send(channel, message)
+
+    def _map_channel_keys_to_connection(self, channel_names, message):
+        # Private to channels_redis (pinned in requirements.txt); the contract
+        # is checked by tests/test_channel_layers.py
+        remote_channels = []
+        for channel in channel_names:
+            if self.is_local_channel(channel):
+                self.deliver_locally(channel, message)
+            else:
+                remote_channels.append(channel)
+        return super()._map_channel_keys_to_connection(remote_channels, message)
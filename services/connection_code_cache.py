@@ -0,0 +1,87 @@
+from dataclasses import dataclass
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+
+from services.ttl_cache import TTLCache
+
+
+@dataclass(frozen=True)
+class CodeOwner:
+    """The part of a user a relationship request needs."""
+    id: object
+    first_name: str
+
+
+class ConnectionCodeCache:
+    """
+    Connection code -> ``CodeOwner`` lookups for relationship requests, so
+    typing a partner's code does not cost a ``Users`` query.
+
+    Like ``UserCache``, a process-local TTL'd LRU is checked first and,
+    with ``USE_SHARED_CACHE``, the Django cache second. Entries are dropped
+    on ``Users`` save/delete (see ``apps.Account.signals``); other processes
+    converge once their local TTL runs out. Unknown codes are not cached, so
+    a new user's code resolves at once.
+    """
+
+    key_prefix = "connection_code_"
+
+    def __init__(self, max_size=50000, ttl=300, use_shared_cache=True):
+        self.local = TTLCache(max_size=max_size, ttl=ttl)
+        self.ttl = ttl
+        self.use_shared_cache = use_shared_cache
+
+    @classmethod
+    def from_settings(cls):
+        config = getattr(settings, "CONNECTION_CODE_CACHE", {})
+        return cls(
+            max_size=config.get("MAX_SIZE", 50000),
+            ttl=config.get("TTL", 300),
+            use_shared_cache=config.get("USE_SHARED_CACHE", True),
+        )
+
+    def get_local(self, code):
+        """Return the owner of ``code`` from the local cache, or None. Never blocks."""
+        return self.local.get(code)
+
+    def resolve(self, code):
+        """Return the ``CodeOwner`` of ``code``, or None if no user has it."""
+        owner = self.local.get(code)
+        if owner is None and self.use_shared_cache:
+            owner = cache.get(self.key_prefix + code)
+            if owner is not None:
+                self.local.set(code, owner)
+        if owner is None:
+            owner = self._fetch(code)
+            if owner is None:
+                return None
+            self.local.set(code, owner)
+            if self.use_shared_cache:
+                cache.set(self.key_prefix + code, owner, self.ttl)
+        return owner
+
+    async def aresolve(self, code):
+        owner = self.get_local(code)
+        if owner is not None:
+            return owner
+        return await sync_to_async(self.resolve)(code)
+
+    def invalidate(self, code):
+        self.local.delete(code)
+        if self.use_shared_cache:
+            cache.delete(self.key_prefix + code)
+
+    def clear(self):
+        self.local.clear()
+
+    @staticmethod
+    def _fetch(code):
+        User = get_user_model()
+        record = User.objects.filter(connection_code=code).values("id", "first_name").first()
+        return CodeOwner(**record) if record is not None else None
+
+
+connection_code_cache = ConnectionCodeCache.from_settings()
@@ -0,0 +1,96 @@
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+
+def record_message(message):
+    """
+    Count ``message`` in its chat's ``DailyMessageCount`` row for the day.
+    Call it in the transaction that creates the message: one UPDATE, plus
+    an INSERT for the sender's first message of the day.
+    """
+    from apps.Chat.models import DailyMessageCount
+
+    day = timezone.localdate(message.timestamp)
+    counts = DailyMessageCount.objects.filter(
+        chat_id=message.chat_id, day=day, sender_id=message.sender_id)
+    if counts.update(count=F('count') + 1):
+        return
+    try:
+        with transaction.atomic():
+            DailyMessageCount.objects.create(
+                chat_id=message.chat_id, day=day, sender_id=message.sender_id, count=1)
+    except IntegrityError:
+        # Another of the sender's devices created it meanwhile
+        counts.update(count=F('count') + 1)
+
+
+def rebuild_rollups(since=None, until=None, batch_size=1000):
+    """
+    Recount ``DailyMessageCount`` from ``ChatMessages`` for the days in
+    ``[since, until)`` (all days when None); return the rows written.
+
+    For backfilling and repairs. The counts are overwritten, so messages
+    sent while a day is being recounted may be missed: leave out the
+    current day unless writes are stopped.
+    """
+    from apps.Chat.models import ChatMessages, DailyMessageCount
+
+    messages = ChatMessages.objects.all()
+    if since is not None:
+        messages = messages.filter(timestamp__date__gte=since)
+    if until is not None:
+        messages = messages.filter(timestamp__date__lt=until)
+    days = (
+        messages.annotate(day=TruncDate('timestamp'))
+        .values('chat_id', 'day', 'sender_id')
+        .annotate(count=Count('id'))
+        .order_by()
+    )
+    # MySQL's ON DUPLICATE KEY UPDATE takes no conflict target
+    unique_fields = (
+        ['chat', 'day', 'sender']
+        if connection.features.supports_update_conflicts_with_target else None
+    )
+
+    written = 0
+    batch = []
+    for row in days.iterator(chunk_size=batch_size):
+        batch.append(DailyMessageCount(**row))
+        if len(batch) == batch_size:
+            written += _upsert(batch, unique_fields)
+            batch = []
+    if batch:
+        written += _upsert(batch, unique_fields)
+    return written
+
+
+def _upsert(batch, unique_fields):
+    from apps.Chat.models import DailyMessageCount
+
+    DailyMessageCount.objects.bulk_create(
+        batch, update_conflicts=True, unique_fields=unique_fields, update_fields=['count'])
+    return len(batch)
+
+
+def message_totals(chat_id):
+    """Messages sent in the chat by each sender, ``{sender_id: count}``."""
+    from apps.Chat.models import DailyMessageCount
+
+    return dict(
+        DailyMessageCount.objects.filter(chat_id=chat_id)
+        .values('sender_id').annotate(total=Sum('count')).order_by()
+        .values_list('sender_id', 'total')
+    )
+
+
+def messages_per_day(chat_id, since):
+    """``[(day, count)]`` for the days since ``since`` with messages, oldest first."""
+    from apps.Chat.models import DailyMessageCount
+
+    return list(
+        DailyMessageCount.objects.filter(chat_id=chat_id, day__gte=since)
+        .values('day').annotate(total=Sum('count')).order_by('day')
+        .values_list('day', 'total')
+    )
@@ -0,0 +1,27 @@
+from services.socket_message import user_group
+from services.websocket.subscribers import subscribers
+
+
+def build_notification(user_id, type: str, content: dict):
+    """Unsaved inbox copy of a socket event, for ``bulk_create``."""
+    from apps.Global.models import Notification
+
+    return Notification(
+        user_id=user_id, type=type, payload=content, seq=content.get("seq", 0))
+
+
+def store_notification(user_id, type: str, content: dict):
+    notification = build_notification(user_id, type, content)
+    notification.save()
+    return notification
+
+
+def notify_if_offline(user_id, type: str, content: dict):
+    """
+    Keep ``content`` in the user's inbox unless one of their sockets is
+    known to be open. Used for events published to a shared group, e.g. a
+    chat, where the group having listeners says nothing about this user.
+    """
+    if subscribers.has_live_subscribers(user_group(user_id)):
+        return None
+    return store_notification(user_id, type, content)
@@ -0,0 +1,203 @@
+import asyncio
+import logging
+from datetime import timedelta
+
+from asgiref.sync import async_to_sync
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from services.socket_message import user_group
+from services.websocket import metrics
+from services.websocket.subscribers import subscribers
+
+logger = logging.getLogger("django")
+
+
+def enqueue_socket_message(channel_name: str, type: str, message: dict, user_id=None):
+    """
+    Transactional ``send_socket_message``: the notification is stored in the
+    outbox within the caller's transaction and published after it commits.
+    Nothing is sent if the transaction rolls back.
+    """
+    from apps.Global.models import SocketOutbox
+
+    SocketOutbox.objects.create(
+        group=channel_name, type=type, content=message, user_id=user_id)
+    # robust: a channel layer outage must not fail the committed request;
+    # the row stays in the outbox and is retried
+    transaction.on_commit(outbox_dispatcher.wake, robust=True)
+
+
+def enqueue_user_message(user_id, type: str, message: dict):
+    """
+    Transactional notification for every socket of ``user_id``: recorded in
+    the replay log (``seq`` added) and, unless a socket of theirs is known to
+    be open, kept in their notification inbox.
+    """
+    enqueue_socket_message(user_group(user_id), type, message, user_id=user_id)
+
+
+class OutboxDispatcher:
+    """
+    Publishes ``SocketOutbox`` rows to the channel layer in batches.
+
+    Under ASGI, ``OutboxDispatcherMiddleware`` runs one dispatcher task per
+    worker on its event loop: committed transactions wake it and it also
+    polls every ``poll_interval`` seconds for rows left behind by other
+    processes or crashed workers. Without a running task (WSGI, management
+    commands, tests) ``wake`` dispatches inline instead.
+
+    Rows are claimed for ``lease`` seconds before publishing and deleted
+    after, so a notification is delivered at least once; several
+    dispatchers can share the table. A retried row is recorded in the
+    replay log under its first sequence number, and its inbox notification
+    is only stored together with the row's deletion, so retries add no
+    copies to either.
+    """
+
+    def __init__(self, batch_size=100, poll_interval=1.0, lease=30):
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self.loop = None
+        self.task = None
+        self._wakeup = None
+
+    @classmethod
+    def from_settings(cls):
+        config = getattr(settings, "SOCKET_OUTBOX", {})
+        return cls(
+            batch_size=config.get("BATCH_SIZE", 100),
+            poll_interval=config.get("POLL_INTERVAL", 1.0),
+            lease=config.get("LEASE", 30),
+        )
+
+    def claim_batch(self):
+        from apps.Global.models import SocketOutbox
+
+        now = timezone.now()
+        with transaction.atomic():
+            rows = list(
+                SocketOutbox.objects.select_for_update(skip_locked=True)
+                .filter(Q(claimed_until__isnull=True) | Q(claimed_until__lt=now))
+                .order_by("id")[:self.batch_size]
+            )
+            SocketOutbox.objects.filter(id__in=[row.id for row in rows]).update(
+                claimed_until=now + timedelta(seconds=self.lease))
+        return rows
+
+    def build_events(self, rows):
+        """
+        Record per-user rows in the replay log and return ``(events, inbox)``:
+        the events of the groups that may have open sockets, and unsaved
+        inbox notifications for per-user rows whose user has no socket known
+        to be open.
+        """
+        from services.notifications import build_notification
+        from services.websocket.replay import replay_log
+
+        events = []
+        inbox = []
+        for row in rows:
+            if row.user_id is not None:
+                content = replay_log.record(
+                    row.user_id, row.type, row.content, event_id=f"outbox_{row.id}")["content"]
+            else:
+                content = row.content
+            publish = subscribers.has_subscribers(row.group)
+            # A user whose sockets are unknown gets the event both ways
+            if row.user_id is not None and not (publish and subscribers.has_live_subscribers(row.group)):
+                inbox.append(build_notification(row.user_id, row.type, content))
+            if not publish:
+                metrics.group_sends_skipped_total.inc(group_type=metrics.group_type(row.group))
+                continue
+            events.append((row.group, {"type": row.type, "content": content}))
+        return events, inbox
+
+    def complete_rows(self, rows, inbox):
+        """Store the inbox notifications of published ``rows`` and delete them, atomically."""
+        from apps.Account.models import Users
+        from apps.Global.models import Notification, SocketOutbox
+
+        with transaction.atomic():
+            if inbox:
+                # The user may have been deleted since the row was written
+                existing = set(Users.objects.filter(
+                    id__in={notification.user_id for notification in inbox}).values_list("id", flat=True))
+                Notification.objects.bulk_create(
+                    notification for notification in inbox if notification.user_id in existing)
+            SocketOutbox.objects.filter(id__in=[row.id for row in rows]).delete()
+
+    async def dispatch_pending(self, thread_sensitive=False):
+        """
+        Publish everything claimable; return the number of notifications sent.
+
+        The database work runs in the executor's threads, not in the single
+        thread that serves the worker's sync views, unless ``thread_sensitive``
+        (inline dispatch, which must see its caller's connection).
+        """
+        def in_thread(func):
+            return database_sync_to_async(func, thread_sensitive=thread_sensitive)
+
+        channel_layer = get_channel_layer()
+        sent = 0
+        while True:
+            rows = await in_thread(self.claim_batch)()
+            if not rows:
+                return sent
+            events, inbox = await in_thread(self.build_events)(rows)
+            await asyncio.gather(*(
+                channel_layer.group_send(group, event) for group, event in events))
+            await in_thread(self.complete_rows)(rows, inbox)
+            sent += len(rows)
+            if len(rows) < self.batch_size:
+                return sent
+
+    async def run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.dispatch_pending()
+            except Exception:
+                logger.exception("Socket outbox dispatch failed")
+
+    def start(self):
+        """Run the dispatcher on the current event loop, once per loop."""
+        loop = asyncio.get_running_loop()
+        if self.task is not None and not self.task.done() and self.loop is loop:
+            return
+        self.loop = loop
+        self._wakeup = asyncio.Event()
+        self.task = loop.create_task(self.run())
+
+    def running(self):
+        return (self.task is not None and not self.task.done()
+                and self.loop is not None and not self.loop.is_closed())
+
+    def wake(self):
+        if self.running():
+            self.loop.call_soon_threadsafe(self._wakeup.set)
+        else:
+            async_to_sync(self.dispatch_pending)(thread_sensitive=True)
+
+
+class OutboxDispatcherMiddleware:
+    """ASGI middleware starting the worker's ``OutboxDispatcher`` task."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        outbox_dispatcher.start()
+        return await self.app(scope, receive, send)
+
+
+outbox_dispatcher = OutboxDispatcher.from_settings()
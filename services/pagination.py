@@ -6,3 +6,14 @@ class CursorPagination(CursorPagination):
     page_size = 50
     # Ordering the records
     ordering = 'timestamp'
+
+
+class NotificationPagination(CursorPagination):
+    # Newest first; id follows insertion order and is unique, so the
+    # cursor is stable while new notifications arrive
+    ordering = '-id'
+
+
+class RelationshipRequestPagination(CursorPagination):
+    # Newest first, like NotificationPagination
+    ordering = '-id'
@@ -0,0 +1,87 @@
+import base64
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.utils.crypto import pbkdf2
+from django.utils.encoding import force_bytes
+
+from services import password_hashing_worker
+
+
+class PasswordHashingPool:
+    """
+    A bounded process pool for PBKDF2, so signup and login bursts use at
+    most ``workers`` cores and leave the rest to other requests.
+
+    At most ``workers + max_pending`` hashes are submitted at once; further
+    callers wait for a slot. The pool is started on first use with the
+    spawn method (forking a threaded server is unsafe) and restarted if a
+    worker dies; with ``workers=0`` hashing runs in the caller's thread.
+    The workers only import ``services.password_hashing_worker``, which
+    keeps Django out of them.
+    """
+
+    def __init__(self, workers=0, max_pending=100):
+        self.workers = workers
+        self.slots = threading.BoundedSemaphore(workers + max_pending)
+        self.executor = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls):
+        config = getattr(settings, "PASSWORD_HASHING", {})
+        return cls(
+            workers=config.get("WORKERS", 0),
+            max_pending=config.get("MAX_PENDING", 100),
+        )
+
+    def get_executor(self):
+        with self._lock:
+            if self.executor is None:
+                self.executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+            return self.executor
+
+    def pbkdf2(self, password, salt, iterations, digest):
+        if not self.workers:
+            return pbkdf2(password, salt, iterations, digest=digest)
+        with self.slots:
+            executor = self.get_executor()
+            try:
+                return executor.submit(
+                    password_hashing_worker.pbkdf2, digest().name, force_bytes(password), force_bytes(salt), iterations
+                ).result()
+            except BrokenProcessPool:
+                self.shutdown(executor)
+                return pbkdf2(password, salt, iterations, digest=digest)
+
+    def shutdown(self, executor=None):
+        """Stop the pool (only if it is still ``executor``); the next hash starts a new one."""
+        with self._lock:
+            if self.executor is None or executor not in (None, self.executor):
+                return
+            executor, self.executor = self.executor, None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+password_hashing_pool = PasswordHashingPool.from_settings()
+
+
+class PooledPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    ``PBKDF2PasswordHasher`` computing the hash in ``password_hashing_pool``.
+    Same algorithm and format, so existing hashes keep verifying and the
+    stock hasher can read the new ones.
+    """
+
+    def encode(self, password, salt, iterations=None):
+        self._check_encode_args(password, salt)
+        iterations = iterations or self.iterations
+        hash = password_hashing_pool.pbkdf2(password, salt, iterations, self.digest)
+        hash = base64.b64encode(hash).decode("ascii").strip()
+        return "%s$%d$%s$%s" % (self.algorithm, iterations, salt, hash)
+
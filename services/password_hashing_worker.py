@@ -0,0 +1,11 @@
+"""
+What the password hashing pool's processes run. They are started with
+spawn and import this module afresh, so it must not import Django (or
+anything that does): plain bytes in and out.
+"""
+
+import hashlib
+
+
+def pbkdf2(digest_name, password, salt, iterations):
+    return hashlib.pbkdf2_hmac(digest_name, password, salt, iterations)
@@ -0,0 +1,97 @@
+import uuid
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+
+class PendingRequestCounts:
+    """
+    Number of pending relationship requests each user has received, for the
+    badge, kept in the Django cache so reading it costs no ``COUNT(*)``.
+
+    A missing entry is counted from the database (on the
+    ``request_inbox_idx`` index) and cached for ``ttl`` seconds. Creating
+    and answering requests adjust an existing entry once their transaction
+    commits. Bulk changes such as ``services.request_expiry`` invalidate
+    instead.
+
+    A change that finds no entry, or invalidates one, bumps the user's
+    version, and a read that cached its count while the version moved drops
+    it again. So a change committed during the COUNT is not lost for a
+    whole TTL. One race remains: a change committed just before the COUNT
+    whose adjustment lands after the read cached its count is counted
+    twice. That drift, like the drift from changes that bypass the counter
+    (cascading deletes, admin), lasts at most ``ttl`` seconds.
+    """
+
+    key_prefix = "pending_requests_"
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+
+    @classmethod
+    def from_settings(cls):
+        config = getattr(settings, "PENDING_REQUEST_COUNTS", {})
+        return cls(ttl=config.get("TTL", 300))
+
+    def key(self, user_id):
+        return f"{self.key_prefix}{user_id}"
+
+    def version_key(self, user_id):
+        return f"{self.key_prefix}{user_id}_version"
+
+    def count(self, user_id):
+        from apps.Relationships.models import RelationshipRequest, Status
+
+        return RelationshipRequest.objects.filter(
+            receiver_id=user_id, status=Status.PENDING).count()
+
+    def get(self, user_id):
+        count = cache.get(self.key(user_id))
+        if count is None:
+            version = cache.get(self.version_key(user_id))
+            count = self.count(user_id)
+            # add: never overwrite a value adjusted meanwhile
+            if cache.add(self.key(user_id), count, self.ttl) and \
+                    cache.get(self.version_key(user_id)) != version:
+                # A change committed while counting may be missing
+                cache.delete(self.key(user_id))
+        return count
+
+    async def aget(self, user_id):
+        count = await cache.aget(self.key(user_id))
+        if count is None:
+            count = await sync_to_async(self.get)(user_id)
+        return count
+
+    def _adjust(self, user_id, delta):
+        try:
+            if cache.incr(self.key(user_id), delta) < 0:
+                self.invalidate(user_id)
+        except ValueError:
+            # Not cached, but a read may be counting right now
+            self._bump(user_id)
+
+    def _bump(self, user_id):
+        cache.set(self.version_key(user_id), uuid.uuid4().hex, self.ttl)
+
+    def incr(self, user_id):
+        """Count a new request for ``user_id`` once the transaction commits."""
+        transaction.on_commit(lambda: self._adjust(user_id, 1), robust=True)
+
+    def decr(self, user_id):
+        """Count an answered request of ``user_id`` once the transaction commits."""
+        transaction.on_commit(lambda: self._adjust(user_id, -1), robust=True)
+
+    def invalidate(self, user_id):
+        self._bump(user_id)
+        cache.delete(self.key(user_id))
+
+    def invalidate_on_commit(self, user_id):
+        """Recount ``user_id`` on the next read once the transaction commits."""
+        transaction.on_commit(lambda: self.invalidate(user_id), robust=True)
+
+
+pending_request_counts = PendingRequestCounts.from_settings()
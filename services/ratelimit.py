@@ -0,0 +1,195 @@
+"""
+Token-bucket rate limiting shared by the DRF throttle
+(``services.throttling.TokenBucketThrottle``) and the WebSocket consumers
+(``services.websocket.ratelimit.RateLimitMixin``).
+
+A scope (e.g. ``ws.typing``) refills ``RATE`` tokens per second up to
+``BURST``; every call takes one token and is refused when none is left.
+"""
+
+import math
+import threading
+import time
+from dataclasses import dataclass
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+from services.metrics import registry
+from services.ttl_cache import TTLCache
+
+throttled_total = registry.counter(
+    "ratelimit_throttled_total", "Calls refused by the token-bucket rate limiter.",
+    ["scope", "backend"])
+
+# Refill and take one token atomically. TIME is Redis' clock, so workers
+# with skewed clocks still share one bucket. Returns {allowed, tokens left}.
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'stamp')
+local tokens = tonumber(bucket[1]) or burst
+local stamp = tonumber(bucket[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - stamp) * rate)
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'stamp', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return {allowed, tostring(tokens)}
+"""
+
+
+@dataclass(frozen=True)
+class Limit:
+    rate: float  # tokens per second
+    burst: int
+
+    def refill(self, tokens, elapsed):
+        return min(self.burst, tokens + max(0.0, elapsed) * self.rate)
+
+    def wait(self, tokens):
+        """Seconds until the next token."""
+        return max(0.0, (1 - tokens) / self.rate)
+
+    @property
+    def ttl(self):
+        """Seconds for an empty bucket to fill up; a full bucket need not be stored."""
+        return math.ceil(self.burst / self.rate) + 1
+
+
+class LocalBuckets:
+    """Buckets of this process, in a bounded LRU."""
+
+    def __init__(self, max_size=10000, timer=time.monotonic):
+        self.buckets = TTLCache(max_size=max_size, ttl=86400, timer=timer)
+        self._timer = timer
+        self._lock = threading.Lock()
+
+    def take(self, key, limit):
+        now = self._timer()
+        with self._lock:
+            tokens, stamp = self.buckets.get(key, (limit.burst, now))
+            tokens = limit.refill(tokens, now - stamp)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self.buckets.set(key, (tokens, now), limit.ttl)
+        return allowed, tokens
+
+    def clear(self):
+        self.buckets.clear()
+
+
+class SharedBuckets:
+    """
+    Buckets in the Django cache, shared by every worker. With the Redis
+    backend each take is one atomic script call; other backends only get
+    a process-wide lock around a read-modify-write.
+    """
+
+    key_prefix = "ratelimit_"
+
+    def __init__(self, backend=cache, timer=time.time):
+        self.cache = backend
+        self._timer = timer
+        self._lock = threading.Lock()
+        self._script = None
+
+    def _redis(self):
+        # django.core.cache.backends.redis.RedisCache keeps its client here
+        client = getattr(getattr(self.cache, "_cache", None), "get_client", None)
+        return client(write=True) if client is not None else None
+
+    def take(self, key, limit):
+        key = f"{self.key_prefix}{key}"
+        client = self._redis()
+        if client is not None:
+            if self._script is None:
+                self._script = client.register_script(TOKEN_BUCKET_SCRIPT)
+            allowed, tokens = self._script(
+                keys=[self.cache.make_and_validate_key(key)], args=[limit.rate, limit.burst],
+                client=client)
+            return bool(allowed), float(tokens)
+
+        now = self._timer()
+        with self._lock:
+            tokens, stamp = self.cache.get(key, (limit.burst, now))
+            tokens = limit.refill(tokens, now - stamp)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self.cache.set(key, (tokens, now), limit.ttl)
+        return allowed, tokens
+
+
+class RateLimiter:
+    """
+    Per-scope token buckets, checked in-process first: a client flooding
+    one worker is refused without a cache round trip, and only calls the
+    local bucket lets through reach the shared bucket that enforces the
+    limit across workers. Scopes without a configured limit are unlimited.
+    """
+
+    def __init__(self, limits=None, shared=True, local_max_size=10000):
+        self.limits = limits or {}
+        self.shared = shared
+        self.local = LocalBuckets(max_size=local_max_size)
+        self.shared_buckets = SharedBuckets()
+
+    @classmethod
+    def from_settings(cls):
+        config = getattr(settings, "RATE_LIMITS", {})
+        return cls(
+            limits={
+                scope: Limit(rate=limit["RATE"], burst=limit["BURST"])
+                for scope, limit in config.get("SCOPES", {}).items()
+            },
+            shared=config.get("SHARED", True),
+            local_max_size=config.get("LOCAL_MAX_SIZE", 10000),
+        )
+
+    def get_limit(self, scope):
+        return self.limits.get(scope)
+
+    def _result(self, scope, backend, limit, allowed, tokens):
+        if allowed:
+            return True, 0.0
+        throttled_total.inc(scope=scope, backend=backend)
+        return False, limit.wait(tokens)
+
+    def take(self, scope, ident):
+        """
+        Take a token of ``ident``'s bucket for ``scope``; return
+        ``(allowed, seconds until the next token)``.
+        """
+        limit = self.get_limit(scope)
+        if limit is None:
+            return True, 0.0
+        key = f"{scope}_{ident}"
+        allowed, wait = self._result(scope, "local", limit, *self.local.take(key, limit))
+        if allowed and self.shared:
+            allowed, wait = self._result(
+                scope, "shared", limit, *self.shared_buckets.take(key, limit))
+        return allowed, wait
+
+    async def atake(self, scope, ident):
+        """``take`` for async code; only the shared bucket costs a thread hop."""
+        limit = self.get_limit(scope)
+        if limit is None:
+            return True, 0.0
+        key = f"{scope}_{ident}"
+        allowed, wait = self._result(scope, "local", limit, *self.local.take(key, limit))
+        if allowed and self.shared:
+            allowed, wait = self._result(
+                scope, "shared", limit,
+                *await sync_to_async(self.shared_buckets.take)(key, limit))
+        return allowed, wait
+
+
+rate_limiter = RateLimiter.from_settings()
@@ -0,0 +1,70 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from services.pending_requests import pending_request_counts
+
+
+class RequestExpiry:
+    """
+    Deletes relationship requests left pending for more than ``max_age``.
+
+    Deleting rather than marking them frees the requester/receiver pair
+    (``unique_relationship_request``), so the requester may ask again, and
+    keeps the table and its indexes from growing with abandoned requests.
+
+    Each batch is one transaction that locks at most ``batch_size`` of the
+    oldest stale rows (``request_expiry_idx``), skipping rows an answer is
+    holding, and deletes them by primary key, so no lock is held for long.
+    Run it periodically with ``manage.py expire_relationship_requests``.
+    """
+
+    def __init__(self, max_age=timedelta(days=30), batch_size=500, pause=0.0):
+        self.max_age = max_age
+        self.batch_size = batch_size
+        self.pause = pause
+
+    @classmethod
+    def from_settings(cls):
+        config = getattr(settings, "RELATIONSHIP_REQUEST_EXPIRY", {})
+        return cls(
+            max_age=timedelta(days=config.get("MAX_AGE_DAYS", 30)),
+            batch_size=config.get("BATCH_SIZE", 500),
+            pause=config.get("PAUSE", 0.0),
+        )
+
+    def expire_batch(self, cutoff):
+        """Delete up to ``batch_size`` requests pending since before ``cutoff``; return how many."""
+        from apps.Relationships.models import RelationshipRequest, Status
+
+        with transaction.atomic():
+            batch = list(
+                RelationshipRequest.objects.select_for_update(skip_locked=True)
+                .filter(status=Status.PENDING, created_at__lt=cutoff)
+                .order_by('created_at')
+                .values_list('id', 'receiver_id')[:self.batch_size]
+            )
+            if not batch:
+                return 0
+            RelationshipRequest.objects.filter(id__in=[id for id, _ in batch]).delete()
+            for receiver_id in {receiver_id for _, receiver_id in batch}:
+                pending_request_counts.invalidate_on_commit(receiver_id)
+        return len(batch)
+
+    def run(self, max_batches=None):
+        """Expire stale requests batch by batch; return the number deleted."""
+        cutoff = timezone.now() - self.max_age
+        expired = 0
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            count = self.expire_batch(cutoff)
+            expired += count
+            batches += 1
+            if count < self.batch_size:
+                break
+            if self.pause:
+                time.sleep(self.pause)
+        return expired
@@ -1,8 +1,28 @@
 from asgiref.sync import async_to_sync
 from channels.layers import get_channel_layer
 
+from services.websocket import metrics
+from services.websocket.subscribers import subscribers
+
+
+# Group names are also the shard keys of the channel layer, so they are only
+# ever built here.
+def chat_group(chat_id) -> str:
+    return f'chat_{chat_id}'
+
+
+def user_group(user_id) -> str:
+    return f'user_{user_id}'
+
 
 def send_socket_message(channel_name: str, type: str, message: dict):
+    """
+    Publish to a group. Returns False without touching the channel layer
+    when no socket is subscribed to it.
+    """
+    if not subscribers.has_subscribers(channel_name):
+        metrics.group_sends_skipped_total.inc(group_type=metrics.group_type(channel_name))
+        return False
     channel_layer = get_channel_layer()
     async_to_sync(channel_layer.group_send)(
         channel_name,
@@ -11,3 +31,21 @@ def send_socket_message(channel_name: str, type: str, message: dict):
             'content': message
         }
     )
+    return True
+
+
+async def asend_socket_message(channel_name: str, type: str, message: dict):
+    """``send_socket_message`` for async code, without the thread hop."""
+    if not await subscribers.ahas_subscribers(channel_name):
+        metrics.group_sends_skipped_total.inc(group_type=metrics.group_type(channel_name))
+        return False
+    channel_layer = get_channel_layer()
+    await channel_layer.group_send(
+        channel_name,
+        {
+            'type': type,
+            'content': message
+        }
+    )
+    return True
+
@@ -0,0 +1,29 @@
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.throttling import BaseThrottle
+
+from services.ratelimit import rate_limiter
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Throttles the unsafe methods of views with a ``throttle_scope`` per user
+    (per client address for anonymous requests) using the ``RATE_LIMITS``
+    token buckets. Reads are never throttled.
+    """
+
+    def __init__(self):
+        self.wait_seconds = None
+
+    def allow_request(self, request, view):
+        scope = getattr(view, "throttle_scope", None)
+        if scope is None or request.method in SAFE_METHODS:
+            return True
+        if request.user and request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = self.get_ident(request)
+        allowed, self.wait_seconds = rate_limiter.take(scope, ident)
+        return allowed
+
+    def wait(self):
+        return self.wait_seconds
@@ -0,0 +1,185 @@
+import hashlib
+import logging
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+
+logger = logging.getLogger("django")
+
+
+class BloomFilter:
+    """
+    Set membership with false positives but no false negatives: ``value not
+    in bloom`` means it was never added. Sized for ``capacity`` values at
+    ``error_rate`` false positives; positions come from one blake2b digest
+    by double hashing.
+    """
+
+    def __init__(self, capacity, error_rate=0.01):
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, value):
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "big")
+        second = int.from_bytes(digest[8:], "big") | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def add(self, value):
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, value):
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(value))
+
+
+class UserAvailability:
+    """
+    Answers "is this username/email taken?" for the signup form without
+    loading users, cheapest first:
+
+    1. A shared cache of recent answers, available ones included, for
+       ``ttl`` seconds. Saving a user marks its username and email taken
+       once the transaction commits; deleting one forgets them.
+    2. A per-process Bloom filter of every username and email (lower-cased,
+       as MySQL compares them). A value it has never seen is available
+       without a query, which absorbs enumeration by scrapers. It is built
+       with one streaming query on first use and rebuilt after
+       ``bloom_max_age`` seconds to shed deleted users, in a background
+       thread unless ``build_in_background`` is off: requests keep using
+       the old filter, or the database until the first is ready. Users
+       saved in other processes meanwhile are covered by the cached
+       "taken" answers, which live as long.
+    3. An ``exists()`` on the unique username/email index.
+
+    "Available" answers are only cached with ``add()``, so one computed
+    before a signup committed never overwrites its "taken". Staleness is
+    bounded: a deleted user's values may read as taken for ``ttl``
+    seconds, and if the cache loses a new user's entries before
+    ``bloom_max_age``, other processes may read them as available until
+    their filter is rebuilt. The unique index still refuses the signup.
+    """
+
+    key_prefix = "user_availability_"
+
+    def __init__(self, ttl=60, bloom_capacity=100000, bloom_error_rate=0.01,
+                 bloom_max_age=3600, build_in_background=True, timer=time.monotonic):
+        self.ttl = ttl
+        self.bloom_capacity = bloom_capacity
+        self.bloom_error_rate = bloom_error_rate
+        self.bloom_max_age = bloom_max_age
+        self.build_in_background = build_in_background
+        self.bloom = None
+        self.bloom_built_at = None
+        self.builder = None
+        self._building = False
+        self._timer = timer
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls):
+        config = getattr(settings, "USER_AVAILABILITY", {})
+        return cls(
+            ttl=config.get("TTL", 60),
+            bloom_capacity=config.get("BLOOM_CAPACITY", 100000),
+            bloom_error_rate=config.get("BLOOM_ERROR_RATE", 0.01),
+            bloom_max_age=config.get("BLOOM_MAX_AGE", 3600),
+            build_in_background=config.get("BUILD_IN_BACKGROUND", True),
+        )
+
+    def key(self, field, value):
+        # Values are user input: hash them into a valid cache key, lower-cased
+        # like the filter and MySQL's collation compare them
+        return f"{self.key_prefix}{field}_{hashlib.md5(value.lower().encode()).hexdigest()}"
+
+    def build_bloom(self):
+        from apps.Account.models import Users
+
+        bloom = BloomFilter(
+            max(self.bloom_capacity, 2 * Users.objects.count()), self.bloom_error_rate)
+        for username, email in Users.objects.values_list("username", "email").iterator(chunk_size=5000):
+            bloom.add(f"username:{username.lower()}")
+            bloom.add(f"email:{email.lower()}")
+        return bloom
+
+    def get_bloom(self):
+        """
+        The current filter, None until the first is built. A stale one is
+        rebuilt in a background thread (or, with ``build_in_background``
+        off, in the calling thread) while other callers keep using it.
+        """
+        with self._lock:
+            stale = self.bloom is None or self._timer() - self.bloom_built_at > self.bloom_max_age
+            if not stale or self._building:
+                return self.bloom
+            self._building = True
+        if not self.build_in_background:
+            self._rebuild()
+            return self.bloom
+        self.builder = threading.Thread(
+            target=self._rebuild, name="user-availability-bloom", daemon=True)
+        self.builder.start()
+        return self.bloom
+
+    def _rebuild(self):
+        try:
+            bloom = self.build_bloom()
+            with self._lock:
+                self.bloom, self.bloom_built_at = bloom, self._timer()
+        except Exception:
+            logger.exception("Building the user availability Bloom filter failed")
+        finally:
+            self._building = False
+            if self.build_in_background:
+                # The thread's own connection
+                connection.close()
+
+    def might_exist(self, field, value):
+        bloom = self.get_bloom()
+        return bloom is None or f"{field}:{value.lower()}" in bloom
+
+    def is_taken(self, field, value):
+        """Whether a user has ``value`` as their ``field`` (username or email)."""
+        from apps.Account.models import Users
+
+        taken = cache.get(self.key(field, value))
+        if taken is not None:
+            return taken
+        if not self.might_exist(field, value):
+            return False
+        taken = Users.objects.filter(**{field: value}).exists()
+        if taken:
+            cache.set(self.key(field, value), True, self.ttl)
+        else:
+            # Never replace a "taken" written by a signup since the query
+            cache.add(self.key(field, value), False, self.ttl)
+        return taken
+
+    def user_saved(self, user):
+        """Record ``user``'s username and email as taken, here and for every process."""
+        fields = {"username": user.username, "email": user.email}
+        with self._lock:
+            if self.bloom is not None:
+                for field, value in fields.items():
+                    self.bloom.add(f"{field}:{value.lower()}")
+        transaction.on_commit(lambda: cache.set_many(
+            {self.key(field, value): True for field, value in fields.items()},
+            max(self.ttl, self.bloom_max_age)), robust=True)
+
+    def user_deleted(self, user):
+        transaction.on_commit(lambda: cache.delete_many([
+            self.key("username", user.username), self.key("email", user.email)]), robust=True)
+
+    def clear(self):
+        with self._lock:
+            self.bloom = None
+
+
+user_availability = UserAvailability.from_settings()
@@ -1,9 +1,102 @@
+import asyncio
 import json
+from urllib.parse import parse_qs
 
+from asgiref.sync import sync_to_async
+from channels.consumer import get_handler_name
 from channels.generic.websocket import AsyncWebsocketConsumer
 
+from services.socket_message import user_group
+from services.websocket import metrics
+from services.websocket.drain import drainer
+from services.websocket.heartbeat import heartbeat, is_pong
+from services.websocket.replay import replay_log
+from services.websocket.subscribers import subscribers
+
 
 class BaseConsumer(AsyncWebsocketConsumer):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.consumer_name = type(self).__name__
+        self.joined_groups = set()
+        self.accepted = False
+        self.heartbeat_task = None
+        self.last_seen = None
+
+    async def websocket_connect(self, message):
+        # A draining worker refuses handshakes so clients land elsewhere
+        if drainer.draining:
+            await self.close(code=drainer.close_code)
+            return
+        await super().websocket_connect(message)
+
+    async def websocket_receive(self, message):
+        self.last_seen = asyncio.get_running_loop().time()
+        # Heartbeat replies never reach receive()
+        if message.get("text") is not None and is_pong(message["text"]):
+            return
+        await super().websocket_receive(message)
+
+    async def websocket_disconnect(self, message):
+        drainer.unregister(self)
+        if self.heartbeat_task is not None:
+            self.heartbeat_task.cancel()
+        try:
+            await super().websocket_disconnect(message)
+        finally:
+            # Subclasses overriding disconnect() may not leave every group
+            for group in list(self.joined_groups):
+                await self.leave_group(group)
+            if self.accepted:
+                metrics.connections_active.dec(consumer=self.consumer_name)
+
+    async def dispatch(self, message):
+        with metrics.handler_seconds.time(
+                consumer=self.consumer_name, event_type=message["type"]):
+            await super().dispatch(message)
+
+    async def accept(self, subprotocol=None, headers=None):
+        await super().accept(subprotocol, headers)
+        self.accepted = True
+        metrics.connections_active.inc(consumer=self.consumer_name)
+        metrics.connections_total.inc(consumer=self.consumer_name)
+        self.last_seen = asyncio.get_running_loop().time()
+        if heartbeat.enabled:
+            self.heartbeat_task = asyncio.create_task(heartbeat.run(self))
+
+    async def send(self, text_data=None, bytes_data=None, close=False):
+        payload = text_data.encode() if text_data is not None else bytes_data or b""
+        await super().send(text_data=text_data, bytes_data=bytes_data, close=close)
+        metrics.frames_sent_total.inc(consumer=self.consumer_name)
+        metrics.bytes_sent_total.inc(len(payload), consumer=self.consumer_name)
+
+    async def join_group(self, group):
+        await self.channel_layer.group_add(group, self.channel_name)
+        if group not in self.joined_groups:
+            self.joined_groups.add(group)
+            await subscribers.asubscribe(group, self.channel_name)
+            metrics.group_joins_total.inc(group_type=metrics.group_type(group))
+            metrics.group_memberships.inc(group_type=metrics.group_type(group))
+
+    async def leave_group(self, group):
+        await self.channel_layer.group_discard(group, self.channel_name)
+        if group in self.joined_groups:
+            self.joined_groups.discard(group)
+            await subscribers.aunsubscribe(group, self.channel_name)
+            metrics.group_memberships.dec(group_type=metrics.group_type(group))
+
+    async def refresh_groups(self):
+        for group in list(self.joined_groups):
+            await self.channel_layer.group_add(group, self.channel_name)
+            await subscribers.arefresh(group, self.channel_name)
+
+    async def reap(self, close_code):
+        """Drop an unresponsive socket: stop its fan-out now, then close it."""
+        metrics.connections_reaped_total.inc(consumer=self.consumer_name)
+        for group in list(self.joined_groups):
+            await self.leave_group(group)
+        await self.close(code=close_code)
+
     async def connect(self):
         try:
             self.user = self.scope["user"]
@@ -13,15 +106,44 @@ class BaseConsumer(AsyncWebsocketConsumer):
                 await self.close(code=403)
                 return
 
-            self.group_name = f"user_{getattr(self.user, 'id')}"
-            await self.channel_layer.group_add(self.group_name, self.channel_name)
+            self.group_name = user_group(getattr(self.user, 'id'))
+            await self.join_group(self.group_name)
             await self.accept()
+            drainer.register(self)
             await self.send(text_data=json.dumps({"message": "Connected!"}))
+            await self.replay_missed_events()
         except Exception:
             await self.close(code=1011)  # Internal error
 
+    async def replay_missed_events(self):
+        """
+        Re-deliver the user's events newer than the ``last_seq`` query
+        parameter, e.g. ``?last_seq=41``. Clients that do not send it skip the
+        lookup entirely. An event sent while replaying may arrive twice, so
+        clients drop any ``seq`` they have already seen.
+        """
+        params = parse_qs(self.scope.get('query_string', b'').decode())
+        last_seq = params.get('last_seq')
+        if not last_seq or not last_seq[0].isdigit():
+            return
+
+        events = await sync_to_async(replay_log.events_since)(
+            self.user.id, int(last_seq[0]))
+        for event in events:
+            # Events of types this consumer does not render are skipped,
+            # as they would be on a live socket of the same kind
+            if hasattr(self, get_handler_name(event)):
+                await self.dispatch(event)
+
+    async def drain_reconnect(self, event):
+        await self.send(text_data=json.dumps({
+            "type": "reconnect",
+            "delay_ms": event["delay_ms"],
+        }))
+        await self.close(code=event["close_code"])
+
     async def disconnect(self, close_code):
-        await self.channel_layer.group_discard(self.group_name, self.channel_name)
+        await self.leave_group(self.group_name)
 
     async def receive(self, text_data):
         text_data_json = json.loads(text_data)
@@ -0,0 +1,109 @@
+import asyncio
+import logging
+import math
+import os
+import random
+import signal
+import threading
+
+from django.conf import settings
+
+logger = logging.getLogger("django")
+
+
+class ConnectionDrainer:
+    """
+    Drains this worker's WebSocket connections before a restart.
+
+    Once draining, new handshakes are refused and the live sockets are told
+    to reconnect in ``waves`` batches spread over ``window`` seconds. Each
+    client gets a random delay within its wave, so the reconnects land on the
+    other workers (and on ``JWTAuthMiddleware`` and MySQL) as a trickle rather
+    than all at once. When the last socket is gone the worker is stopped.
+    """
+
+    def __init__(self, window=60, waves=10, close_code=1012):
+        self.window = window
+        self.waves = waves
+        self.close_code = close_code
+        self.consumers = set()
+        self.draining = False
+        self.loop = None
+        self._empty = None
+
+    @classmethod
+    def from_settings(cls):
+        config = getattr(settings, "WS_DRAIN", {})
+        return cls(
+            window=config.get("WINDOW", 60),
+            waves=config.get("WAVES", 10),
+            close_code=config.get("CLOSE_CODE", 1012),
+        )
+
+    def register(self, consumer):
+        self.loop = asyncio.get_running_loop()
+        self.consumers.add(consumer)
+
+    def unregister(self, consumer):
+        self.consumers.discard(consumer)
+        if self._empty is not None and not self.consumers:
+            self._empty.set()
+
+    async def drain(self, on_empty=None):
+        self.draining = True
+        self._empty = asyncio.Event()
+        consumers = list(self.consumers)
+        random.shuffle(consumers)
+        logger.info("Draining %s WebSocket connections over %ss",
+                    len(consumers), self.window)
+
+        interval = self.window / self.waves
+        wave_size = max(1, math.ceil(len(consumers) / self.waves))
+        for start in range(0, len(consumers), wave_size):
+            if start:
+                await asyncio.sleep(interval)
+            for consumer in consumers[start:start + wave_size]:
+                await consumer.channel_layer.send(consumer.channel_name, {
+                    "type": "drain_reconnect",
+                    "delay_ms": int(random.uniform(0, interval) * 1000),
+                    "close_code": self.close_code,
+                })
+
+        if self.consumers:
+            try:
+                await asyncio.wait_for(self._empty.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                logger.warning("%s WebSocket connections did not close in time",
+                               len(self.consumers))
+        if on_empty is not None:
+            on_empty()
+
+
+def stop_worker():
+    # daphne and uvicorn both shut down cleanly on SIGTERM
+    os.kill(os.getpid(), signal.SIGTERM)
+
+
+def install_drain_signal_handler():
+    """
+    Start draining when the worker receives ``WS_DRAIN["SIGNAL"]``
+    (SIGUSR1 by default), e.g. ``kill -USR1 <daphne pid>`` before a deploy.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        return
+    signum = getattr(signal, getattr(settings, "WS_DRAIN", {}).get("SIGNAL", "SIGUSR1"))
+
+    def handle(signum, frame):
+        if drainer.draining:
+            return
+        if drainer.loop is None:
+            # No socket was ever opened in this worker
+            stop_worker()
+            return
+        drainer.loop.call_soon_threadsafe(
+            lambda: drainer.loop.create_task(drainer.drain(on_empty=stop_worker)))
+
+    signal.signal(signum, handle)
+
+
+drainer = ConnectionDrainer.from_settings()
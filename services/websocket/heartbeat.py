@@ -0,0 +1,68 @@
+import asyncio
+import json
+
+from django.conf import settings
+
+PING = json.dumps({"type": "ping"})
+
+
+def is_pong(text_data):
+    if '"pong"' not in text_data:
+        return False
+    try:
+        return json.loads(text_data).get("type") == "pong"
+    except (ValueError, AttributeError):
+        return False
+
+
+class Heartbeat:
+    """
+    Application level keepalive for ``BaseConsumer`` sockets.
+
+    Every ``interval`` seconds the socket gets a ``{"type": "ping"}`` frame.
+    Clients answer ``{"type": "pong"}``, though any frame they send counts
+    as a sign of life. A socket silent for ``timeout`` seconds is reaped:
+    it leaves its groups at once and is closed with ``close_code``.
+
+    Live sockets also re-add their group memberships every
+    ``group_refresh`` seconds. With the channel layer's ``group_expiry``
+    set above that, memberships of sockets whose worker died without
+    cleaning up expire on their own.
+    """
+
+    def __init__(self, interval=25, timeout=75, close_code=4000, group_refresh=1800):
+        self.interval = interval
+        self.timeout = timeout
+        self.close_code = close_code
+        self.group_refresh = group_refresh
+
+    @classmethod
+    def from_settings(cls):
+        config = getattr(settings, "WS_HEARTBEAT", {})
+        return cls(
+            interval=config.get("INTERVAL", 25),
+            timeout=config.get("TIMEOUT", 75),
+            close_code=config.get("CLOSE_CODE", 4000),
+            group_refresh=config.get("GROUP_REFRESH", 1800),
+        )
+
+    @property
+    def enabled(self):
+        return self.interval > 0
+
+    async def run(self, consumer):
+        loop = asyncio.get_running_loop()
+        refreshed = loop.time()
+        while True:
+            await asyncio.sleep(self.interval)
+            now = loop.time()
+            if now - consumer.last_seen > self.timeout:
+                await consumer.reap(self.close_code)
+                return
+            if self.group_refresh and now - refreshed >= self.group_refresh:
+                await consumer.refresh_groups()
+                refreshed = now
+            await consumer.send(text_data=PING)
+
+
+heartbeat = Heartbeat.from_settings()
@@ -0,0 +1,47 @@
+from channels.layers import get_channel_layer
+
+from services.metrics import registry
+
+
+def group_type(group):
+    """``chat_<id>`` -> ``chat``; keeps label cardinality bounded."""
+    return group.split("_", 1)[0]
+
+
+def buffered_messages():
+    """Messages waiting in this process' channel layer buffers."""
+    layer = get_channel_layer()
+    # channels_redis layers buffer per local channel, the in-memory layer per channel
+    queues = getattr(layer, "receive_buffer", None) or getattr(layer, "channels", {})
+    return sum(queue.qsize() for queue in list(queues.values()))
+
+
+connections_active = registry.gauge(
+    "ws_connections_active", "Open WebSocket connections.", ["consumer"])
+connections_total = registry.counter(
+    "ws_connections_total", "Accepted WebSocket connections.", ["consumer"])
+connections_reaped_total = registry.counter(
+    "ws_connections_reaped_total", "Sockets closed for missing heartbeats.", ["consumer"])
+group_memberships = registry.gauge(
+    "ws_group_memberships", "Channel layer group memberships held by open sockets.",
+    ["group_type"])
+group_joins_total = registry.counter(
+    "ws_group_joins_total", "Channel layer groups joined.", ["group_type"])
+group_sends_skipped_total = registry.counter(
+    "ws_group_sends_skipped_total", "Group sends skipped for groups without open sockets.",
+    ["group_type"])
+handler_seconds = registry.histogram(
+    "ws_handler_seconds", "Time spent handling a consumer event.",
+    ["consumer", "event_type"])
+frames_sent_total = registry.counter(
+    "ws_frames_sent_total", "WebSocket frames sent to clients.", ["consumer"])
+bytes_sent_total = registry.counter(
+    "ws_bytes_sent_total", "WebSocket payload bytes sent to clients.", ["consumer"])
+layer_buffered_messages = registry.gauge(
+    "ws_channel_layer_buffered_messages",
+    "Messages queued in this process' channel layer receive buffers.",
+    function=buffered_messages)
+presence_suppressed_total = registry.counter(
+    "ws_presence_suppressed_total",
+    "user_status changes not broadcast because another socket of the user is open.",
+    ["online"])
@@ -11,6 +11,9 @@ from django.contrib.auth import get_user_model  # noqa: E402
 from django.contrib.auth.models import AnonymousUser  # noqa: E402
 from rest_framework_simplejwt.tokens import AccessToken  # noqa: E402
 
+from services.authentication import verified_tokens  # noqa: E402
+from services.websocket.user_cache import user_cache  # noqa: E402
+
 User = get_user_model()
 
 
@@ -42,7 +45,7 @@ class JWTAuthMiddleware:
         if token:  # Now checking if token string exists and is not empty
             try:
                 # Log first 20 chars for debugging
-                access = AccessToken(token)
+                access = await verified_tokens.aget_or_verify(token, AccessToken)
                 user_id = access.get('user_id')
                 if user_id:
                     user = await get_user_from_id(user_id)
@@ -54,9 +57,14 @@ class JWTAuthMiddleware:
         return await self.app(scope, receive, send)
 
 
+async def get_user_from_id(user_id):
+    # Local cache hits are answered on the event loop, without a thread hop
+    user = user_cache.get_local(user_id)
+    if user is None:
+        user = await load_user(user_id)
+    return user
+
+
 @database_sync_to_async
-def get_user_from_id(user_id):
-    try:
-        return User.objects.get(pk=user_id)
-    except User.DoesNotExist:
-        return AnonymousUser()
+def load_user(user_id):
+    return user_cache.get(user_id) or AnonymousUser()
@@ -0,0 +1,135 @@
+import asyncio
+import logging
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+from services.websocket import metrics
+from services.websocket.heartbeat import heartbeat
+
+logger = logging.getLogger("django")
+
+
+class Presence:
+    """
+    Debounced online/offline state per user, shared by every worker through
+    the Django cache.
+
+    Each chat socket of a user counts towards one ``ws_presence_<id>``
+    counter, so a second device or a reconnect on another worker does not
+    announce the user again: only the connect that creates the online flag
+    does. Closing the last socket starts a ``grace`` second timer in the
+    closing worker; the user is announced offline only if no socket came
+    back by then, so a phone switching networks is never seen flapping.
+
+    The flag lives under ``user_online_<id>``, which ``PartnerStatusView``
+    reads. Both keys are kept alive by the heartbeat's group refresh and
+    expire after ``ttl`` seconds when a worker dies.
+    """
+
+    key_prefix = "ws_presence_"
+
+    def __init__(self, grace=10, ttl=7200):
+        self.grace = grace
+        self.ttl = ttl
+        # Pending offline announcements, referenced so they are not collected
+        self.pending = set()
+
+    @classmethod
+    def from_settings(cls):
+        config = getattr(settings, "WS_PRESENCE", {})
+        return cls(
+            grace=config.get("GRACE", 10),
+            ttl=config.get("TTL", 7200) if heartbeat.enabled else None,
+        )
+
+    def _count_key(self, user_id):
+        return f"{self.key_prefix}{user_id}"
+
+    def online_key(self, user_id):
+        return f"user_online_{user_id}"
+
+    def count(self, user_id):
+        return cache.get(self._count_key(user_id), 0)
+
+    def connect(self, user_id):
+        """Count a new socket; return whether the user just came online."""
+        key = self._count_key(user_id)
+        cache.add(key, 0, self.ttl)
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Expired between add() and incr()
+            cache.add(key, 1, self.ttl)
+        cache.touch(key, self.ttl)
+        return cache.add(self.online_key(user_id), True, self.ttl)
+
+    def disconnect(self, user_id):
+        """Uncount a socket; return the user's remaining sockets."""
+        key = self._count_key(user_id)
+        try:
+            count = cache.decr(key)
+        except ValueError:
+            return 0
+        if count < 0:
+            cache.set(key, 0, self.ttl)
+        return max(count, 0)
+
+    def go_offline(self, user_id):
+        """Clear the online flag if no socket is left; return whether it was cleared."""
+        if self.count(user_id) > 0:
+            return False
+        # Only one worker wins the delete and announces
+        if not cache.delete(self.online_key(user_id)):
+            return False
+        if self.count(user_id) > 0:
+            # A socket came back in between: it found the flag set and
+            # stayed quiet, so restore it rather than announce
+            cache.add(self.online_key(user_id), True, self.ttl)
+            return False
+        return True
+
+    def refresh(self, user_id):
+        cache.touch(self._count_key(user_id), self.ttl)
+        cache.touch(self.online_key(user_id), self.ttl)
+
+    async def aconnect(self, user_id):
+        online = await sync_to_async(self.connect)(user_id)
+        if not online:
+            metrics.presence_suppressed_total.inc(online="true")
+        return online
+
+    async def adisconnect(self, user_id, announce):
+        """
+        Uncount a socket and, once the user has been gone for ``grace``
+        seconds, await ``announce()`` to tell their partner.
+        """
+        if await sync_to_async(self.disconnect)(user_id) > 0:
+            metrics.presence_suppressed_total.inc(online="false")
+            return
+        if not self.grace:
+            await self._settle(user_id, announce)
+            return
+        task = asyncio.create_task(self._settle_later(user_id, announce))
+        self.pending.add(task)
+        task.add_done_callback(self.pending.discard)
+
+    async def arefresh(self, user_id):
+        await sync_to_async(self.refresh)(user_id)
+
+    async def _settle(self, user_id, announce):
+        if await sync_to_async(self.go_offline)(user_id):
+            await announce()
+        else:
+            metrics.presence_suppressed_total.inc(online="false")
+
+    async def _settle_later(self, user_id, announce):
+        await asyncio.sleep(self.grace)
+        try:
+            await self._settle(user_id, announce)
+        except Exception:
+            logger.exception("Offline announcement for %s failed", user_id)
+
+
+presence = Presence.from_settings()
@@ -0,0 +1,52 @@
+import json
+
+from services.ratelimit import rate_limiter
+from services.websocket.heartbeat import is_pong
+
+
+class RateLimitMixin:
+    """
+    Consumer mixin applying the ``RATE_LIMITS`` token buckets to incoming
+    frames, per user and event ``type``: a frame of type ``typing`` takes a
+    token from the ``<rate_limit_prefix>.typing`` scope, falling back to
+    ``<rate_limit_prefix>.default``, which also pays for frames without a
+    type (bytes, invalid JSON). Only heartbeat pongs are free. Refused frames never reach
+    ``receive()`` and are answered with
+    ``{"type": "rate_limited", "event": ..., "retry_after": seconds}``.
+
+    List it before ``BaseConsumer``: ``class ChatConsumer(RateLimitMixin, BaseConsumer)``.
+    """
+
+    rate_limit_prefix = "ws"
+
+    def rate_limit_scope(self, event_type):
+        scope = f"{self.rate_limit_prefix}.{event_type}"
+        if rate_limiter.get_limit(scope) is None:
+            return f"{self.rate_limit_prefix}.default"
+        return scope
+
+    async def websocket_receive(self, message):
+        text = message.get("text")
+        if text is None or not is_pong(text):
+            event_type = None
+            if text is not None:
+                try:
+                    event_type = json.loads(text).get("type")
+                except (ValueError, AttributeError):
+                    pass
+            # Frames without a type (or bytes, or not JSON) still reach the
+            # consumer, so they are charged to the default scope
+            if event_type is not None:
+                event_type = str(event_type)
+                scope = self.rate_limit_scope(event_type)
+            else:
+                scope = f"{self.rate_limit_prefix}.default"
+            allowed, wait = await rate_limiter.atake(scope, self.scope["user"].id)
+            if not allowed:
+                await self.send(text_data=json.dumps({
+                    "type": "rate_limited",
+                    "event": event_type,
+                    "retry_after": round(wait, 3),
+                }))
+                return
+        await super().websocket_receive(message)
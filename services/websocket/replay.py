@@ -0,0 +1,101 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+
+# Backends whose entries other processes cannot see
+LOCAL_CACHE_BACKENDS = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+class ReplayLog:
+    """
+    Per-user, sequence-numbered log of recent socket events, kept in the
+    Django cache so the HTTP workers that record events and the daphne
+    workers that replay them see the same log.
+
+    Each event is stored under its own key and sequence numbers come from an
+    atomic ``incr``, so concurrent writers never clobber each other. The
+    per-user counter is stored without a timeout, so sequence numbers keep
+    increasing. Only the last ``max_events`` events are reachable and each
+    one expires after ``ttl`` seconds; older ones are deleted as new ones
+    arrive.
+
+    With a process-local cache backend the workers would each see their own
+    log, so ``from_settings`` refuses one unless ``ALLOW_LOCAL_CACHE`` is set
+    (single-process setups and tests).
+    """
+
+    key_prefix = "ws_replay_"
+
+    def __init__(self, max_events=100, ttl=86400):
+        self.max_events = max_events
+        self.ttl = ttl
+
+    @classmethod
+    def from_settings(cls):
+        config = getattr(settings, "WS_REPLAY_LOG", {})
+        backend = settings.CACHES["default"]["BACKEND"]
+        if backend in LOCAL_CACHE_BACKENDS and not config.get("ALLOW_LOCAL_CACHE", False):
+            raise ImproperlyConfigured(
+                f"WS_REPLAY_LOG needs a cache shared by all workers, not {backend}; "
+                "configure a shared CACHES backend or set ALLOW_LOCAL_CACHE")
+        return cls(
+            max_events=config.get("MAX_EVENTS", 100),
+            ttl=config.get("TTL", 86400),
+        )
+
+    def _seq_key(self, user_id):
+        return f"{self.key_prefix}{user_id}_seq"
+
+    def _event_key(self, user_id, seq):
+        return f"{self.key_prefix}{user_id}_{seq}"
+
+    def next_seq(self, user_id):
+        key = self._seq_key(user_id)
+        # No timeout: a client's last_seq must stay below every later event
+        cache.add(key, 0, None)
+        try:
+            return cache.incr(key)
+        except ValueError:
+            # Evicted between add() and incr()
+            cache.add(key, 0, None)
+            return cache.incr(key)
+
+    def record(self, user_id, type, content, event_id=None):
+        """
+        Store a ``send_socket_message`` style event and return it, with its
+        sequence number added to the content as ``seq``. Recording the same
+        ``event_id`` again (an outbox row that is retried) returns the first
+        recording instead of adding a copy.
+        """
+        if event_id is not None:
+            id_key = f"{self.key_prefix}{user_id}_id_{event_id}"
+            seq = cache.get(id_key)
+            if seq is not None:
+                return {"type": type, "content": {**content, "seq": seq}}
+        seq = self.next_seq(user_id)
+        event = {"type": type, "content": {**content, "seq": seq}}
+        cache.set(self._event_key(user_id, seq), event, self.ttl)
+        if event_id is not None:
+            cache.set(id_key, seq, self.ttl)
+        if seq > self.max_events:
+            cache.delete(self._event_key(user_id, seq - self.max_events))
+        return event
+
+    def last_seq(self, user_id):
+        return cache.get(self._seq_key(user_id), 0)
+
+    def events_since(self, user_id, last_seq):
+        """Return the stored events newer than ``last_seq``, oldest first."""
+        current = self.last_seq(user_id)
+        first = max(last_seq + 1, current - self.max_events + 1, 1)
+        if first > current:
+            return []
+        keys = [self._event_key(user_id, seq) for seq in range(first, current + 1)]
+        found = cache.get_many(keys)
+        return [found[key] for key in keys if key in found]
+
+
+replay_log = ReplayLog.from_settings()
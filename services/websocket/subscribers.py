@@ -0,0 +1,148 @@
+import math
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+from services.websocket.heartbeat import heartbeat
+
+# Member kept with score 0 in every known group, so a group whose last
+# socket left (an empty set, which Redis would delete) is told apart from
+# one whose membership was lost
+KNOWN = ""
+
+
+class SubscriberRegistry:
+    """
+    The open sockets of each channel layer group, kept in the Django cache
+    so producers in any process can tell whether a group has listeners.
+
+    Membership is stored per socket, as ``channel_name -> expiry``: a Redis
+    sorted set with the Redis backend, a dict under a process-wide lock
+    otherwise. ``BaseConsumer.join_group``/``leave_group`` add and remove
+    their channel, and the heartbeat's group refresh re-adds it; sockets of
+    a crashed worker drop out ``ttl`` seconds after their last refresh.
+
+    Errors only ever lean towards publishing: a group whose membership is
+    unknown (never joined, evicted, expired, or lost with Redis) has
+    subscribers as far as ``has_subscribers`` is concerned, and a stale
+    member merely costs a wasted ``group_send``. ``has_live_subscribers``
+    answers the inbox's question instead: is a socket known to be open?
+    """
+
+    key_prefix = "ws_subscribers_"
+
+    def __init__(self, enabled=True, ttl=7200, backend=cache, timer=time.time):
+        self.enabled = enabled
+        self.ttl = ttl
+        self.cache = backend
+        self._timer = timer
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls):
+        config = getattr(settings, "WS_SUBSCRIBERS", {})
+        return cls(
+            enabled=config.get("ENABLED", True),
+            # Without heartbeats nothing refreshes the members of long-lived
+            # sockets, so they must not expire
+            ttl=config.get("TTL", 7200) if heartbeat.enabled else None,
+        )
+
+    def _key(self, group):
+        return f"{self.key_prefix}{group}"
+
+    def _redis(self):
+        # django.core.cache.backends.redis.RedisCache keeps its client here
+        client = getattr(getattr(self.cache, "_cache", None), "get_client", None)
+        return client(write=True) if client is not None else None
+
+    def _expiry(self, now):
+        return math.inf if self.ttl is None else now + self.ttl
+
+    def subscribe(self, group, channel_name):
+        """Add (or re-add) ``channel_name`` to ``group`` and drop expired members."""
+        key = self._key(group)
+        now = self._timer()
+        client = self._redis()
+        if client is not None:
+            key = self.cache.make_and_validate_key(key)
+            pipe = client.pipeline()
+            pipe.zadd(key, {KNOWN: 0, channel_name: self._expiry(now)})
+            pipe.zremrangebyscore(key, "(0", f"({now}")
+            if self.ttl is not None:
+                pipe.expire(key, self.ttl)
+            pipe.execute()
+            return
+        with self._lock:
+            members = self.cache.get(key) or {}
+            members = {channel: expiry for channel, expiry in members.items() if expiry > now}
+            members[channel_name] = self._expiry(now)
+            self.cache.set(key, members, self.ttl)
+
+    def unsubscribe(self, group, channel_name):
+        key = self._key(group)
+        client = self._redis()
+        if client is not None:
+            # ZREM leaves a lost group unknown rather than known to be empty
+            client.zrem(self.cache.make_and_validate_key(key), channel_name)
+            return
+        with self._lock:
+            members = self.cache.get(key)
+            if members is not None and channel_name in members:
+                del members[channel_name]
+                self.cache.set(key, members, self.ttl)
+
+    def refresh(self, group, channel_name):
+        self.subscribe(group, channel_name)
+
+    def count(self, group):
+        """Unexpired members of ``group``, or None when its membership is unknown."""
+        key = self._key(group)
+        now = self._timer()
+        client = self._redis()
+        if client is not None:
+            key = self.cache.make_and_validate_key(key)
+            pipe = client.pipeline(transaction=False)
+            pipe.exists(key)
+            pipe.zcount(key, now, "+inf")
+            known, count = pipe.execute()
+            return count if known else None
+        members = self.cache.get(key)
+        if members is None:
+            return None
+        return sum(1 for expiry in members.values() if expiry > now)
+
+    def has_subscribers(self, group):
+        """Whether to publish to ``group``: True unless it is known to be empty."""
+        if not self.enabled:
+            return True
+        count = self.count(group)
+        return count is None or count > 0
+
+    def has_live_subscribers(self, group):
+        """Whether a socket of ``group`` is known to be open; False when unknown."""
+        if not self.enabled:
+            return True
+        return bool(self.count(group))
+
+    # Django's cache has no native async backend here: one thread hop per
+    # call rather than one per cache operation
+    async def asubscribe(self, group, channel_name):
+        await sync_to_async(self.subscribe)(group, channel_name)
+
+    async def aunsubscribe(self, group, channel_name):
+        await sync_to_async(self.unsubscribe)(group, channel_name)
+
+    async def arefresh(self, group, channel_name):
+        await sync_to_async(self.refresh)(group, channel_name)
+
+    async def ahas_subscribers(self, group):
+        if not self.enabled:
+            return True
+        return await sync_to_async(self.has_subscribers)(group)
+
+
+subscribers = SubscriberRegistry.from_settings()
@@ -0,0 +1,116 @@
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+
+from services.ttl_cache import TTLCache
+
+# Only what the consumers need to identify and greet a user. The full row is
+# never cached so that password hashes and profile data stay out of memory.
+USER_CACHE_FIELDS = (
+    "id",
+    "username",
+    "email",
+    "first_name",
+    "last_name",
+    "connection_code",
+    "is_active",
+)
+
+
+@dataclass(frozen=True)
+class CachedUser:
+    """
+    Read-only stand-in for the authenticated user of a socket. Not a model
+    instance, so it cannot be saved over the full row or used as one in
+    queries; load the ``Users`` row by ``id`` when more is needed.
+    """
+    id: object
+    username: str
+    email: str
+    first_name: str
+    last_name: str
+    connection_code: str
+    is_active: bool
+
+    is_authenticated = True
+    is_anonymous = False
+
+    @property
+    def pk(self):
+        return self.id
+
+
+class UserCache:
+    """
+    Minimal user records keyed by user id, used by ``JWTAuthMiddleware`` so a
+    reconnecting client does not cost a database round trip.
+
+    Lookups hit a process-local TTL'd LRU first and, when
+    ``USE_SHARED_CACHE`` is on, the Django cache second. Entries are dropped
+    on ``Users`` save/delete (see ``apps.Account.signals``); other processes
+    converge once their local TTL runs out.
+    """
+
+    key_prefix = "ws_user_"
+
+    def __init__(self, max_size=10000, ttl=300, use_shared_cache=False):
+        self.local = TTLCache(max_size=max_size, ttl=ttl)
+        self.ttl = ttl
+        self.use_shared_cache = use_shared_cache
+
+    @classmethod
+    def from_settings(cls):
+        config = getattr(settings, "WS_USER_CACHE", {})
+        return cls(
+            max_size=config.get("MAX_SIZE", 10000),
+            ttl=config.get("TTL", 300),
+            use_shared_cache=config.get("USE_SHARED_CACHE", False),
+        )
+
+    def get_local(self, user_id):
+        """Return a ``CachedUser`` from the local cache, or None. Never blocks."""
+        record = self.local.get(str(user_id))
+        return self._build(record) if record is not None else None
+
+    def get(self, user_id):
+        """Return a ``CachedUser`` for ``user_id`` or None if it does not exist."""
+        key = str(user_id)
+        record = self.local.get(key)
+        if record is None and self.use_shared_cache:
+            record = cache.get(self.key_prefix + key)
+            if record is not None:
+                self.local.set(key, record)
+        if record is None:
+            record = self._fetch(user_id)
+            if record is None:
+                return None
+            self.local.set(key, record)
+            if self.use_shared_cache:
+                cache.set(self.key_prefix + key, record, self.ttl)
+        return self._build(record)
+
+    def invalidate(self, user_id):
+        key = str(user_id)
+        self.local.delete(key)
+        if self.use_shared_cache:
+            cache.delete(self.key_prefix + key)
+
+    def clear(self):
+        self.local.clear()
+
+    @staticmethod
+    def _fetch(user_id):
+        User = get_user_model()
+        try:
+            return User.objects.values(*USER_CACHE_FIELDS).get(pk=user_id)
+        except User.DoesNotExist:
+            return None
+
+    @staticmethod
+    def _build(record):
+        return CachedUser(**record)
+
+
+user_cache = UserCache.from_settings()
@@ -0,0 +1,130 @@
+import collections
+import inspect
+import uuid
+
+import pytest
+from channels_redis.core import RedisChannelLayer
+from channels_redis.utils import _consistent_hash
+from django.test import SimpleTestCase
+
+from benchmarks.redis_servers import local_redis_servers, redis_server_available
+from services.channel_layers import (
+    HashRing,
+    LocalFirstRedisChannelLayer,
+    ShardedRedisChannelLayer,
+)
+from services.socket_message import chat_group, user_group
+
+GROUPS = [chat_group(uuid.uuid4()) for _ in range(2000)] + \
+    [user_group(uuid.uuid4()) for _ in range(2000)]
+
+
+class HashRingTests(SimpleTestCase):
+    """Test group placement on the consistent hash ring"""
+
+    def test_placement_is_deterministic(self):
+        first, second = HashRing(4), HashRing(4)
+        for group in GROUPS[:100]:
+            self.assertEqual(first.get_shard(group), second.get_shard(group))
+
+    def test_single_shard(self):
+        ring = HashRing(1)
+        self.assertEqual({ring.get_shard(g) for g in GROUPS}, {0})
+
+    def test_groups_are_balanced(self):
+        counts = collections.Counter(HashRing(4).get_shard(g) for g in GROUPS)
+        self.assertEqual(set(counts), {0, 1, 2, 3})
+        for count in counts.values():
+            self.assertLess(abs(count - len(GROUPS) / 4), len(GROUPS) * 0.08)
+
+    def test_adding_a_shard_moves_few_groups(self):
+        before, after = HashRing(4), HashRing(5)
+        moved = sum(before.get_shard(g) != after.get_shard(g) for g in GROUPS)
+        default_moved = sum(
+            _consistent_hash(g, 4) != _consistent_hash(g, 5) for g in GROUPS)
+
+        # Ideal is 1/5 of the groups; channels_redis' ranges move far more
+        self.assertLess(moved, len(GROUPS) * 0.3)
+        self.assertLess(moved, default_moved)
+
+
+class ShardedRedisChannelLayerTests(SimpleTestCase):
+    def test_layer_uses_ring(self):
+        layer = ShardedRedisChannelLayer(
+            hosts=[("127.0.0.1", 6379), ("127.0.0.1", 6380)])
+        for group in GROUPS[:50]:
+            self.assertEqual(layer.group_shard(group), layer.ring.get_shard(group))
+
+
+class ChannelsRedisContractTests(SimpleTestCase):
+    """Fail on a channels_redis upgrade that changes what LocalFirstRedisChannelLayer overrides"""
+
+    def test_private_group_send_hook_is_unchanged(self):
+        parameters = inspect.signature(RedisChannelLayer._map_channel_keys_to_connection).parameters
+        self.assertEqual(list(parameters), ["self", "channel_names", "message"])
+        self.assertIn(
+            "self._map_channel_keys_to_connection(channel_names, message)",
+            inspect.getsource(RedisChannelLayer.group_send))
+
+
+@pytest.mark.asyncio
+class TestLocalFirstRedisChannelLayer:
+    """Test in-process delivery to channels owned by this process"""
+
+    @pytest.mark.asyncio
+    async def test_send_to_local_channel_skips_redis(self):
+        # No Redis is listening on this port: any round trip would fail
+        layer = LocalFirstRedisChannelLayer(hosts=[("127.0.0.1", 1)])
+        channel = await layer.new_channel()
+        message = {"type": "typing_status", "payload": {"is_typing": True}}
+
+        await layer.send(channel, message)
+        received = await layer.receive(channel)
+
+        assert received == message
+        assert received is not message
+        assert received["payload"] is not message["payload"]
+
+    @pytest.mark.asyncio
+    async def test_group_members_are_split_by_owner(self):
+        layer = LocalFirstRedisChannelLayer(hosts=[("127.0.0.1", 1)])
+        local_channel = await layer.new_channel()
+        remote_channel = "specific.0123456789abcdef!remote"
+
+        connection_to_keys, key_to_message, _ = \
+            layer._map_channel_keys_to_connection(
+                [local_channel, remote_channel], {"type": "user_status"})
+
+        assert list(key_to_message) == [layer.prefix + "specific.0123456789abcdef!"]
+        assert sum(len(keys) for keys in connection_to_keys.values()) == 1
+        assert (await layer.receive(local_channel)) == {"type": "user_status"}
+
+    @pytest.mark.asyncio
+    async def test_foreign_channels_are_not_local(self):
+        layer = LocalFirstRedisChannelLayer(hosts=[("127.0.0.1", 1)])
+        assert not layer.is_local_channel("specific.0123456789abcdef!remote")
+        assert not layer.is_local_channel("background-tasks")
+        assert layer.is_local_channel(await layer.new_channel())
+
+
+@pytest.mark.skipif(not redis_server_available(), reason="redis-server not installed")
+@pytest.mark.asyncio
+async def test_group_send_across_shards():
+    """Test group_send reaches members of groups living on different shards"""
+    with local_redis_servers(3, base_port=26379) as hosts:
+        layer = ShardedRedisChannelLayer(hosts=hosts)
+        groups = [chat_group(uuid.uuid4()) for _ in range(12)]
+        assert len({layer.group_shard(g) for g in groups}) > 1
+
+        members = {}
+        for group in groups:
+            members[group] = await layer.new_channel()
+            await layer.group_add(group, members[group])
+        for group in groups:
+            await layer.group_send(group, {"type": "typing_status", "group": group})
+        for group in groups:
+            message = await layer.receive(members[group])
+            assert message["group"] == group
+
+        await layer.flush()
+        await layer.close_pools()
@@ -6,7 +6,7 @@ from datetime import date, timedelta
 
 from apps.Account.models import Users
 from apps.Privacy.models import UserPrivacy
-from apps.Relationships.models import Relationship, RelationshipRequest
+from apps.Relationships.models import Relationship, RelationshipRequest, Status
 
 
 class TestDataFactory:
@@ -71,7 +71,7 @@ class TestDataFactory:
         )
 
     @staticmethod
-    def create_relationship_request(requester, receiver, status="PENDING"):
+    def create_relationship_request(requester, receiver, status=Status.PENDING):
         """Create a relationship request"""
         return RelationshipRequest.objects.create(
             requester=requester, receiver=receiver, status=status
@@ -0,0 +1,128 @@
+import pytest
+from channels.db import database_sync_to_async
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from apps.Chat.routing import chat_ws_urlpatterns
+from services.metrics import Registry
+from services.websocket import metrics
+
+User = get_user_model()
+
+
+class RegistryTests(SimpleTestCase):
+    """Test the Prometheus text rendering"""
+
+    def test_counter_and_gauge_samples(self):
+        registry = Registry()
+        counter = registry.counter("requests_total", "Requests.", ["path"])
+        gauge = registry.gauge("in_flight", "In flight.")
+        counter.inc(path="/a")
+        counter.inc(2, path='/"b"')
+        gauge.inc()
+        gauge.dec()
+
+        output = registry.render()
+        self.assertIn("# TYPE requests_total counter", output)
+        self.assertIn('requests_total{path="/a"} 1.0', output)
+        self.assertIn('requests_total{path="/\\"b\\""} 2.0', output)
+        self.assertIn("in_flight 0.0", output)
+
+    def test_histogram_buckets_are_cumulative(self):
+        registry = Registry()
+        histogram = registry.histogram("latency_seconds", "Latency.", buckets=(0.1, 1))
+        histogram.observe(0.05)
+        histogram.observe(0.5)
+
+        output = registry.render()
+        self.assertIn('latency_seconds_bucket{le="0.1"} 1', output)
+        self.assertIn('latency_seconds_bucket{le="1.0"} 2', output)
+        self.assertIn('latency_seconds_bucket{le="+Inf"} 2', output)
+        self.assertIn("latency_seconds_count 2", output)
+        self.assertEqual(histogram.get(), 2)
+
+    def test_labels_must_match(self):
+        counter = Registry().counter("events_total", "Events.", ["type"])
+        with self.assertRaises(ValueError):
+            counter.inc()
+
+    def test_registering_twice_returns_the_same_metric(self):
+        registry = Registry()
+        self.assertIs(registry.counter("a_total", "A."), registry.counter("a_total", "A."))
+
+
+@database_sync_to_async
+def create_user(username, connection_code):
+    return User.objects.create_user(
+        username=username, email=f"{username}@example.com",
+        connection_code=connection_code, password="testpass")
+
+
+@pytest.mark.asyncio
+class TestConsumerMetrics(TransactionTestCase):
+    @pytest.mark.asyncio
+    async def test_connection_and_group_metrics(self):
+        """Test sockets, group memberships and sent frames are tracked"""
+        user = await create_user("metrics", "METRIC")
+        active = metrics.connections_active.get(consumer="ChatConsumer")
+        total = metrics.connections_total.get(consumer="ChatConsumer")
+        chats = metrics.group_memberships.get(group_type="chat")
+        users = metrics.group_memberships.get(group_type="user")
+        frames = metrics.frames_sent_total.get(consumer="ChatConsumer")
+        handled = metrics.handler_seconds.get(
+            consumer="ChatConsumer", event_type="user_status")
+
+        communicator = WebsocketCommunicator(
+            URLRouter(chat_ws_urlpatterns), "/ws/chat/1/")
+        communicator.scope["user"] = user
+        connected, _ = await communicator.connect()
+        assert connected
+        await communicator.receive_from()  # Connected!
+        await communicator.receive_from()  # Own online status
+
+        assert metrics.connections_active.get(consumer="ChatConsumer") == active + 1
+        assert metrics.connections_total.get(consumer="ChatConsumer") == total + 1
+        assert metrics.group_memberships.get(group_type="chat") == chats + 1
+        assert metrics.group_memberships.get(group_type="user") == users + 1
+        assert metrics.frames_sent_total.get(consumer="ChatConsumer") >= frames + 1
+        assert metrics.handler_seconds.get(
+            consumer="ChatConsumer", event_type="user_status") == handled + 1
+
+        await communicator.disconnect()
+
+        assert metrics.connections_active.get(consumer="ChatConsumer") == active
+        assert metrics.group_memberships.get(group_type="chat") == chats
+        assert metrics.group_memberships.get(group_type="user") == users
+
+    @pytest.mark.asyncio
+    async def test_rejected_socket_leaves_its_groups(self):
+        """Test an anonymous chat socket does not leak its chat membership"""
+        chats = metrics.group_memberships.get(group_type="chat")
+        communicator = WebsocketCommunicator(
+            URLRouter(chat_ws_urlpatterns), "/ws/chat/2/")
+        communicator.scope["user"] = AnonymousUser()
+        connected, _ = await communicator.connect()
+        assert not connected
+        await communicator.disconnect()
+
+        assert metrics.group_memberships.get(group_type="chat") == chats
+
+
+class MetricsViewTests(TestCase):
+    def test_metrics_from_allowed_ip(self):
+        """Test the scrape endpoint renders the registry"""
+        response = self.client.get(reverse("metrics"), REMOTE_ADDR="127.0.0.1")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        self.assertIn("# TYPE ws_connections_active gauge", response.content.decode())
+        self.assertIn("ws_channel_layer_buffered_messages", response.content.decode())
+
+    @override_settings(METRICS_ALLOWED_IPS=["10.0.0.1"])
+    def test_metrics_from_other_ip(self):
+        """Test other clients cannot scrape the endpoint"""
+        response = self.client.get(reverse("metrics"), REMOTE_ADDR="127.0.0.1")
+        self.assertIn(response.status_code, (401, 403))
@@ -0,0 +1,167 @@
+import asyncio
+from datetime import timedelta
+from unittest import mock
+
+import pytest
+from asgiref.sync import async_to_sync
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TransactionTestCase
+from django.utils import timezone
+
+from apps.Account.models import Users
+from apps.Global.models import Notification, SocketOutbox
+from services.outbox import (
+    OutboxDispatcher,
+    enqueue_socket_message,
+    enqueue_user_message,
+    outbox_dispatcher,
+)
+from services.socket_message import chat_group, user_group
+from services.websocket.replay import replay_log
+from services.websocket.subscribers import subscribers
+
+
+class OutboxTests(TransactionTestCase):
+    """Test notifications are only published for committed transactions"""
+
+    def setUp(self):
+        cache.clear()
+        self.layer = get_channel_layer()
+
+    def join(self, group):
+        channel = async_to_sync(self.layer.new_channel)()
+        async_to_sync(self.layer.group_add)(group, channel)
+        subscribers.subscribe(group, channel)
+        return channel
+
+    def receive(self, channel):
+        async def receive():
+            return await asyncio.wait_for(self.layer.receive(channel), timeout=1)
+        return async_to_sync(receive)()
+
+    def test_committed_message_is_published(self):
+        channel = self.join(chat_group("c1"))
+        with transaction.atomic():
+            enqueue_socket_message(chat_group("c1"), "typing_status", {"is_typing": True})
+            self.assertEqual(SocketOutbox.objects.count(), 1)
+
+        self.assertEqual(self.receive(channel), {
+            "type": "typing_status", "content": {"is_typing": True}})
+        self.assertFalse(SocketOutbox.objects.exists())
+
+    def test_rolled_back_message_is_never_published(self):
+        channel = self.join(chat_group("c2"))
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                enqueue_socket_message(chat_group("c2"), "typing_status", {"is_typing": True})
+                raise RuntimeError("write failed")
+
+        self.assertFalse(SocketOutbox.objects.exists())
+        with self.assertRaises(asyncio.TimeoutError):
+            self.receive(channel)
+
+    def test_groups_without_sockets_are_skipped(self):
+        enqueue_user_message(
+            "0d9b1f0e-2a51-4a5e-8d8e-6f1f3c2d4b10", "relationship_request_notification",
+            {"message": "offline"})
+
+        self.assertFalse(SocketOutbox.objects.exists())
+        # Still kept for when the user reconnects
+        self.assertEqual(replay_log.last_seq("0d9b1f0e-2a51-4a5e-8d8e-6f1f3c2d4b10"), 1)
+        # Unknown users get no inbox entry
+        self.assertFalse(Notification.objects.exists())
+
+    def test_offline_users_get_an_inbox_notification(self):
+        user = Users.objects.create_user(
+            username="outboxoffline", email="outboxoffline@example.com",
+            password="testpassword123", connection_code="OBOF01")
+        enqueue_user_message(user.id, "relationship_request_notification", {"message": "offline"})
+
+        notification = Notification.objects.get(user=user)
+        self.assertEqual(notification.type, "relationship_request_notification")
+        self.assertEqual(notification.payload, {"message": "offline", "seq": 1})
+        self.assertEqual(notification.seq, 1)
+        self.assertFalse(notification.read)
+
+    def test_user_messages_go_through_the_replay_log(self):
+        channel = self.join(user_group("3f1c7c2e-6d0b-4f57-9d43-3c9a51a1b2c4"))
+        enqueue_user_message(
+            "3f1c7c2e-6d0b-4f57-9d43-3c9a51a1b2c4", "relationship_request_notification",
+            {"message": "hi"})
+
+        event = self.receive(channel)
+        self.assertEqual(event["content"], {"message": "hi", "seq": 1})
+
+    def test_dispatch_in_batches(self):
+        SocketOutbox.objects.bulk_create(
+            SocketOutbox(group=chat_group("c3"), type="typing_status", content={"n": i})
+            for i in range(25))
+        channel = self.join(chat_group("c3"))
+
+        sent = async_to_sync(OutboxDispatcher(batch_size=10).dispatch_pending)()
+
+        self.assertEqual(sent, 25)
+        self.assertFalse(SocketOutbox.objects.exists())
+        self.assertEqual([self.receive(channel)["content"]["n"] for _ in range(25)],
+                         list(range(25)))
+
+    def test_claimed_rows_are_retried_after_lease(self):
+        now = timezone.now()
+        SocketOutbox.objects.create(
+            group=chat_group("c4"), type="typing_status", content={"n": 1},
+            claimed_until=now + timedelta(seconds=30))
+        SocketOutbox.objects.create(
+            group=chat_group("c4"), type="typing_status", content={"n": 2},
+            claimed_until=now - timedelta(seconds=1))
+
+        sent = async_to_sync(OutboxDispatcher().dispatch_pending)()
+
+        self.assertEqual(sent, 1)
+        self.assertEqual(SocketOutbox.objects.get().content, {"n": 1})
+
+    def test_retried_rows_are_recorded_once(self):
+        """Test a row retried after a failed publish adds no replay or inbox copies"""
+        user = Users.objects.create_user(
+            username="outboxretry", email="outboxretry@example.com",
+            password="testpassword123", connection_code="OBRT01")
+        SocketOutbox.objects.create(
+            group=user_group(user.id), type="relationship_request_notification",
+            content={"message": "retry"}, user_id=user.id)
+
+        with mock.patch.object(self.layer, "group_send", side_effect=ConnectionError("layer down")):
+            with self.assertRaises(ConnectionError):
+                async_to_sync(OutboxDispatcher().dispatch_pending)()
+        self.assertFalse(Notification.objects.exists())
+        SocketOutbox.objects.update(claimed_until=None)
+
+        self.assertEqual(async_to_sync(OutboxDispatcher().dispatch_pending)(), 1)
+        self.assertEqual(replay_log.last_seq(user.id), 1)
+        self.assertEqual(Notification.objects.get(user=user).seq, 1)
+
+
+@database_sync_to_async
+def commit_notification(group):
+    with transaction.atomic():
+        enqueue_socket_message(group, "typing_status", {"is_typing": False})
+
+
+@pytest.mark.asyncio
+class TestRunningDispatcher(TransactionTestCase):
+    @pytest.mark.asyncio
+    async def test_commit_wakes_the_worker_dispatcher(self):
+        """Test the ASGI worker's dispatcher task publishes committed rows"""
+        layer = get_channel_layer()
+        channel = await layer.new_channel()
+        await layer.group_add(chat_group("c5"), channel)
+        await subscribers.asubscribe(chat_group("c5"), channel)
+        outbox_dispatcher.start()
+        try:
+            await commit_notification(chat_group("c5"))
+            event = await asyncio.wait_for(layer.receive(channel), timeout=1)
+        finally:
+            outbox_dispatcher.task.cancel()
+
+        assert event["content"] == {"is_typing": False}
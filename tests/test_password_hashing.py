@@ -0,0 +1,92 @@
+import hashlib
+import subprocess
+import sys
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.contrib.auth import authenticate, get_user_model
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, check_password, get_hasher, make_password
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from services import password_hashing
+from services.password_hashing import PasswordHashingPool, PooledPBKDF2PasswordHasher
+
+User = get_user_model()
+
+
+class FastStockHasher(PBKDF2PasswordHasher):
+    iterations = 1000
+
+
+class FastPooledHasher(PooledPBKDF2PasswordHasher):
+    iterations = 1000
+
+
+class PooledHasherTests(SimpleTestCase):
+    def test_hashes_match_the_stock_hasher(self):
+        """Test hashes are interchangeable with PBKDF2PasswordHasher's"""
+        pooled, stock = FastPooledHasher(), FastStockHasher()
+
+        encoded = pooled.encode("correct horse", "somesalt")
+
+        assert encoded == stock.encode("correct horse", "somesalt")
+        assert pooled.verify("correct horse", encoded)
+        assert not pooled.verify("wrong horse", encoded)
+        assert stock.verify("correct horse", encoded)
+
+    def test_pool_is_opt_in(self):
+        assert isinstance(get_hasher(), PooledPBKDF2PasswordHasher) == \
+            bool(settings.PASSWORD_HASHING["WORKERS"])
+
+    def test_workers_do_not_import_django(self):
+        """Test spawned workers import a module that keeps Django out"""
+        result = subprocess.run(
+            [sys.executable, "-c",
+             "import sys, services.password_hashing_worker; assert 'django' not in sys.modules"],
+            cwd=settings.BASE_DIR, capture_output=True, text=True)
+        assert result.returncode == 0, result.stderr
+
+    def test_inline_without_workers(self):
+        pool = PasswordHashingPool(workers=0)
+
+        assert pool.pbkdf2("pw", "salt", 1000, PBKDF2PasswordHasher.digest) == \
+            hashlib.pbkdf2_hmac("sha256", b"pw", b"salt", 1000)
+        assert pool.executor is None
+
+    def test_broken_pool_falls_back_and_restarts(self):
+        pool = PasswordHashingPool(workers=1)
+        expected = pool.pbkdf2("pw", "salt", 1000, PBKDF2PasswordHasher.digest)
+        broken = pool.executor
+
+        def submit(*args, **kwargs):
+            raise BrokenProcessPool("worker died")
+
+        broken.submit = submit
+        assert pool.pbkdf2("pw", "salt", 1000, PBKDF2PasswordHasher.digest) == expected
+        assert pool.executor is None
+        assert pool.pbkdf2("pw", "salt", 1000, PBKDF2PasswordHasher.digest) == expected
+        assert pool.executor is not broken
+        pool.shutdown()
+        broken.shutdown()
+
+
+@override_settings(PASSWORD_HASHERS=["services.password_hashing.PooledPBKDF2PasswordHasher"])
+class PasswordHashingTests(TestCase):
+    def setUp(self):
+        self.pool = password_hashing.password_hashing_pool
+        password_hashing.password_hashing_pool = PasswordHashingPool(workers=1)
+
+    def tearDown(self):
+        password_hashing.password_hashing_pool.shutdown()
+        password_hashing.password_hashing_pool = self.pool
+
+    def test_registration_and_login_hash_in_the_pool(self):
+        user = User.objects.create_user(
+            username="hashed", email="hashed@example.com", password="s3cret-pass",
+            connection_code="HASH01")
+
+        assert user.password.startswith("pbkdf2_sha256$")
+        assert check_password("s3cret-pass", make_password("s3cret-pass"))
+        assert authenticate(username="hashed", password="s3cret-pass") == user
+        assert authenticate(username="hashed", password="wrong") is None
+        assert password_hashing.password_hashing_pool.executor is not None
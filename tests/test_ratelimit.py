@@ -0,0 +1,175 @@
+import json
+
+import pytest
+from channels.db import database_sync_to_async
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.cache.backends.redis import RedisCache
+from django.test import SimpleTestCase, TransactionTestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from apps.Relationships.routing import relationship_ws_urlpatterns
+from benchmarks.redis_servers import local_redis_servers, redis_server_available
+from services.ratelimit import Limit, LocalBuckets, RateLimiter, SharedBuckets, rate_limiter, throttled_total
+
+User = get_user_model()
+
+
+class FakeTimer:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TokenBucketTests(SimpleTestCase):
+    def test_burst_then_refill(self):
+        timer = FakeTimer()
+        buckets = LocalBuckets(timer=timer)
+        limit = Limit(rate=2, burst=3)
+
+        assert [buckets.take("k", limit)[0] for _ in range(4)] == [True, True, True, False]
+        allowed, tokens = buckets.take("k", limit)
+        assert not allowed
+        assert limit.wait(tokens) == pytest.approx(0.5)
+
+        timer.now += 0.5
+        assert buckets.take("k", limit)[0]
+        assert not buckets.take("k", limit)[0]
+        # Never more than the burst, however long the bucket sat idle
+        timer.now += 3600
+        assert [buckets.take("k", limit)[0] for _ in range(4)] == [True, True, True, False]
+
+    def test_shared_bucket_holds_across_processes(self):
+        """Test two limiters (two workers) draw from the same cache bucket"""
+        cache.clear()
+        limits = {"scope": Limit(rate=0.001, burst=4)}
+        workers = [RateLimiter(limits=limits), RateLimiter(limits=limits)]
+
+        results = [workers[i % 2].take("scope", "user")[0] for i in range(6)]
+
+        assert results == [True, True, True, True, False, False]
+
+    def test_local_fast_path_spares_the_cache(self):
+        cache.clear()
+        limiter = RateLimiter(limits={"scope": Limit(rate=0.001, burst=2)})
+        refused = throttled_total.get(scope="scope", backend="local")
+
+        for _ in range(5):
+            limiter.take("scope", "user")
+
+        assert throttled_total.get(scope="scope", backend="local") == refused + 3
+        # The shared bucket only saw the two calls the local one let through
+        assert limiter.shared_buckets.take("scope_user", Limit(rate=0.001, burst=2))[0] is False
+
+    def test_unknown_scopes_are_unlimited(self):
+        limiter = RateLimiter(limits={})
+        assert all(limiter.take("other", "user")[0] for _ in range(100))
+
+
+@pytest.mark.skipif(not redis_server_available(), reason="redis-server not installed")
+def test_redis_script_is_atomic_and_shared():
+    """Test the Lua token bucket against a real Redis"""
+    with local_redis_servers(1, base_port=26479) as hosts:
+        host, port = hosts[0]
+        limit = Limit(rate=0.001, burst=3)
+        workers = [SharedBuckets(RedisCache(f"redis://{host}:{port}/0", {})) for _ in range(2)]
+
+        results = [workers[i % 2].take("user", limit)[0] for i in range(5)]
+
+        assert results == [True, True, True, False, False]
+
+
+class ThrottleTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        rate_limiter.local.clear()
+        self.limits = dict(rate_limiter.limits)
+        rate_limiter.limits["partner_status"] = Limit(rate=0.01, burst=2)
+        self.user = User.objects.create_user(
+            username="throttled", email="throttled@example.com",
+            connection_code="THRT01", password="testpass")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def tearDown(self):
+        rate_limiter.limits = self.limits
+
+    def test_partner_status_posts_are_throttled(self):
+        url = reverse("partner_status", kwargs={"user_id": self.user.id})
+        data = {"type": "typing", "chat_id": "1", "is_typing": True}
+
+        codes = [self.client.post(url, data, format="json").status_code for _ in range(3)]
+        response = self.client.post(url, data, format="json")
+
+        assert codes == [200, 200, 429]
+        assert int(response["Retry-After"]) > 0
+        # Reads are not throttled
+        assert self.client.get(url).status_code == 200
+
+
+@pytest.mark.asyncio
+class TestConsumerRateLimit(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        rate_limiter.local.clear()
+        self.limits = dict(rate_limiter.limits)
+        rate_limiter.limits["ws.default"] = Limit(rate=0.01, burst=2)
+
+    def tearDown(self):
+        rate_limiter.limits = self.limits
+
+    @pytest.mark.asyncio
+    async def test_flooded_frames_are_refused(self):
+        """Test frames over the limit are answered with rate_limited and never handled"""
+        user = await database_sync_to_async(User.objects.create_user)(
+            username="wsflood", email="wsflood@example.com",
+            connection_code="WSFL01", password="testpass")
+        communicator = WebsocketCommunicator(
+            URLRouter(relationship_ws_urlpatterns), "/ws/relationship-requests/")
+        communicator.scope["user"] = user
+        await communicator.connect()
+        await communicator.receive_from()  # Connected!
+
+        for _ in range(3):
+            await communicator.send_to(text_data=json.dumps({"type": "hello"}))
+        # The consumer echoes what it handles
+        for _ in range(2):
+            assert json.loads(await communicator.receive_from())["message"] == "Received"
+        refused = json.loads(await communicator.receive_from())
+        assert refused["type"] == "rate_limited"
+        assert refused["event"] == "hello"
+        assert refused["retry_after"] > 0
+
+        # Heartbeat replies never count
+        await communicator.send_to(text_data=json.dumps({"type": "pong"}))
+        assert await communicator.receive_nothing()
+        await communicator.disconnect()
+
+    @pytest.mark.asyncio
+    async def test_frames_without_a_type_are_charged(self):
+        """Test leaving out "type" (or sending bytes or invalid JSON) does not bypass the limit"""
+        user = await database_sync_to_async(User.objects.create_user)(
+            username="wsuntyped", email="wsuntyped@example.com",
+            connection_code="WSUT01", password="testpass")
+        communicator = WebsocketCommunicator(
+            URLRouter(relationship_ws_urlpatterns), "/ws/relationship-requests/")
+        communicator.scope["user"] = user
+        await communicator.connect()
+        await communicator.receive_from()  # Connected!
+
+        for _ in range(2):
+            await communicator.send_to(text_data=json.dumps({"message": "no type"}))
+            assert json.loads(await communicator.receive_from())["message"] == "Received"
+
+        await communicator.send_to(bytes_data=b"\x00")
+        await communicator.send_to(text_data="not json")
+        for _ in range(2):
+            refused = json.loads(await communicator.receive_from())
+            assert refused["type"] == "rate_limited"
+            assert refused["event"] is None
+        await communicator.disconnect()
@@ -0,0 +1,130 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.tokens import AccessToken
+
+from services.authentication import (
+    VerifiedTokenCache,
+    token_digest,
+    verified_tokens,
+)
+
+User = get_user_model()
+
+
+class VerifiedTokenCacheTests(TestCase):
+    """Test memoisation of verified JWTs"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="tokenuser",
+            email="token@example.com",
+            password="testpass",
+            connection_code="TOKEN1",
+        )
+        self.raw_token = str(AccessToken.for_user(self.user))
+
+    def test_signature_is_verified_once(self):
+        cache = VerifiedTokenCache(max_size=10, ttl=60)
+        with patch.object(AccessToken, "verify", autospec=True,
+                          side_effect=AccessToken.verify) as verify:
+            first = cache.get_or_verify(self.raw_token, AccessToken)
+            second = cache.get_or_verify(self.raw_token, AccessToken)
+
+        self.assertEqual(verify.call_count, 1)
+        self.assertIs(first, second)
+        self.assertEqual(second["user_id"], str(self.user.id))
+
+    def test_invalid_token_is_not_cached(self):
+        cache = VerifiedTokenCache(max_size=10, ttl=60)
+        for _ in range(2):
+            with self.assertRaises(TokenError):
+                cache.get_or_verify(self.raw_token + "x", AccessToken)
+        self.assertEqual(len(cache.tokens), 0)
+
+    def test_entry_does_not_outlive_token(self):
+        token = AccessToken.for_user(self.user)
+        token.set_exp(lifetime=timedelta(seconds=30))
+        raw_token = str(token)
+        cache = VerifiedTokenCache(max_size=10, ttl=600)
+        cache.get_or_verify(raw_token, AccessToken)
+        self.assertIn(token_digest(raw_token), cache.tokens)
+
+        now = cache.tokens._timer()
+        cache.tokens._timer = lambda: now + 31
+        self.assertNotIn(token_digest(raw_token), cache.tokens)
+
+    def test_expired_token_is_rejected(self):
+        token = AccessToken.for_user(self.user)
+        token.set_exp(lifetime=timedelta(seconds=-1))
+        cache = VerifiedTokenCache(max_size=10, ttl=600)
+        with self.assertRaises(TokenError):
+            cache.get_or_verify(str(token), AccessToken)
+
+    def test_revocation_hook_is_honoured(self):
+        revoked = set()
+        cache = VerifiedTokenCache(
+            max_size=10, ttl=60,
+            revocation_check=lambda token: token["jti"] in revoked)
+        token = cache.get_or_verify(self.raw_token, AccessToken)
+
+        revoked.add(token["jti"])
+        with self.assertRaises(TokenError):
+            cache.get_or_verify(self.raw_token, AccessToken)
+        self.assertEqual(len(cache.tokens), 0)
+
+    def test_async_revocation_hook_may_query_the_database(self):
+        """Test the WebSocket path runs the hook off the event loop"""
+        cache = VerifiedTokenCache(
+            max_size=10, ttl=60,
+            revocation_check=lambda token: not User.objects.filter(
+                id=token["user_id"], is_active=True).exists())
+        token = async_to_sync(cache.aget_or_verify)(self.raw_token, AccessToken)
+        self.assertEqual(str(token["user_id"]), str(self.user.id))
+
+        User.objects.filter(id=self.user.id).update(is_active=False)
+        with self.assertRaises(TokenError):
+            async_to_sync(cache.aget_or_verify)(self.raw_token, AccessToken)
+        self.assertEqual(len(cache.tokens), 0)
+
+    def test_revoke_forgets_token(self):
+        cache = VerifiedTokenCache(max_size=10, ttl=60)
+        cache.get_or_verify(self.raw_token, AccessToken)
+        cache.revoke(self.raw_token)
+        self.assertEqual(len(cache.tokens), 0)
+
+
+class CachedJWTAuthenticationTests(TestCase):
+    """Test the DRF authentication class shares the verified token cache"""
+
+    def setUp(self):
+        verified_tokens.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username="httpuser",
+            email="http@example.com",
+            password="testpass",
+            connection_code="HTTP01",
+        )
+        self.raw_token = str(AccessToken.for_user(self.user))
+
+    def test_authenticates_with_bearer_token(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.raw_token}")
+        for _ in range(2):
+            response = self.client.get(reverse("manage_user"))
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.data["username"], "httpuser")
+        self.assertEqual(len(verified_tokens.tokens), 1)
+
+    def test_rejects_tampered_token(self):
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {self.raw_token[:-2]}xx")
+        response = self.client.get(reverse("manage_user"))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -8,6 +8,7 @@ from django.contrib.auth import get_user_model
 from django.test import TransactionTestCase, override_settings
 
 from apps.Chat.routing import chat_ws_urlpatterns
+from services.websocket.presence import presence
 
 User = get_user_model()
 
@@ -74,6 +75,14 @@ def create_test_relationship_and_chat(user1, user2):
 @override_settings(CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}})
 @pytest.mark.asyncio
 class TestChatMessagesWebSocket(TransactionTestCase):
+    def setUp(self):
+        # Announce offline as soon as the last socket closes
+        self.grace = presence.grace
+        presence.grace = 0
+
+    def tearDown(self):
+        presence.grace = self.grace
+
     @pytest.mark.asyncio
     async def test_ws_connection(self):
         """Test basic WebSocket connection and connection message"""
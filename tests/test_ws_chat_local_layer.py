@@ -0,0 +1,30 @@
+import pytest
+from django.test import override_settings
+
+import tests.test_ws_chat as chat_tests
+from benchmarks.redis_servers import local_redis_servers, redis_server_available
+
+REDIS_PORT = 26479
+
+
+# Runs every chat WebSocket scenario again on the hybrid layer backed by a
+# real redis-server, so in-process delivery is checked against the same
+# expectations as the in-memory layer.
+@pytest.mark.skipif(not redis_server_available(), reason="redis-server not installed")
+@override_settings(CHANNEL_LAYERS={
+    "default": {
+        "BACKEND": "services.channel_layers.LocalFirstRedisChannelLayer",
+        "CONFIG": {"hosts": [("127.0.0.1", REDIS_PORT)]},
+    },
+})
+class TestChatMessagesWebSocketLocalFirstLayer(chat_tests.TestChatMessagesWebSocket):
+    @classmethod
+    def setUpClass(cls):
+        cls._redis = local_redis_servers(1, base_port=REDIS_PORT)
+        cls._redis.__enter__()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls._redis.__exit__(None, None, None)
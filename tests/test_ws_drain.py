@@ -0,0 +1,87 @@
+import asyncio
+import json
+
+import pytest
+from channels.db import database_sync_to_async
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth import get_user_model
+from django.test import TransactionTestCase
+
+from apps.Relationships.routing import relationship_ws_urlpatterns
+from services.websocket.drain import drainer
+
+User = get_user_model()
+
+
+@database_sync_to_async
+def create_user(username, connection_code):
+    return User.objects.create_user(
+        username=username, email=f"{username}@example.com",
+        connection_code=connection_code, password="testpass")
+
+
+async def connect(user):
+    communicator = WebsocketCommunicator(
+        URLRouter(relationship_ws_urlpatterns), "/ws/relationship-requests/")
+    communicator.scope["user"] = user
+    connected, _ = await communicator.connect()
+    return communicator, connected
+
+
+@pytest.mark.asyncio
+class TestConnectionDraining(TransactionTestCase):
+    def setUp(self):
+        self.settings = (drainer.window, drainer.waves)
+        drainer.window, drainer.waves = 0.2, 2
+
+    def tearDown(self):
+        drainer.window, drainer.waves = self.settings
+        drainer.draining = False
+        drainer.consumers.clear()
+
+    @pytest.mark.asyncio
+    async def test_drain_asks_clients_to_reconnect_and_refuses_new_ones(self):
+        """Test open sockets get a jittered reconnect frame and are closed"""
+        users = [await create_user(f"drain{i}", f"DRAIN{i}") for i in range(3)]
+        communicators = []
+        for user in users:
+            communicator, connected = await connect(user)
+            assert connected
+            await communicator.receive_from()  # Connected!
+            communicators.append(communicator)
+        assert len(drainer.consumers) == 3
+
+        emptied = []
+        await drainer.drain(on_empty=lambda: emptied.append(True))
+
+        for communicator in communicators:
+            frame = json.loads(await communicator.receive_from())
+            assert frame["type"] == "reconnect"
+            assert 0 <= frame["delay_ms"] <= 100
+            closed = await communicator.receive_output()
+            assert closed == {"type": "websocket.close", "code": 1012}
+            await communicator.disconnect()
+        assert emptied == [True]
+
+        _, connected = await connect(users[0])
+        assert not connected
+
+    @pytest.mark.asyncio
+    async def test_worker_stops_once_the_last_socket_closes(self):
+        """Test on_empty fires as soon as the last socket is gone, not after the wait"""
+        drainer.window, drainer.waves = 30, 1
+        communicator, connected = await connect(await create_user("drainlast", "DRAINL"))
+        assert connected
+        await communicator.receive_from()  # Connected!
+
+        emptied = []
+        drain = asyncio.create_task(drainer.drain(on_empty=lambda: emptied.append(True)))
+        frame = json.loads(await communicator.receive_from())
+        assert frame["type"] == "reconnect"
+        assert emptied == []
+        await communicator.disconnect()
+
+        # The drain would otherwise wait out the 30s wave interval
+        await asyncio.wait_for(drain, timeout=5)
+        assert emptied == [True]
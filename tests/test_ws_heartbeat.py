@@ -0,0 +1,105 @@
+import asyncio
+import json
+
+import pytest
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TransactionTestCase
+
+from apps.Relationships.routing import relationship_ws_urlpatterns
+from services.socket_message import user_group
+from services.websocket import metrics
+from services.websocket.heartbeat import heartbeat, is_pong
+
+User = get_user_model()
+
+
+class IsPongTests(SimpleTestCase):
+    def test_is_pong(self):
+        self.assertTrue(is_pong('{"type": "pong"}'))
+        self.assertFalse(is_pong('{"type": "typing", "message": "pong"}'))
+        self.assertFalse(is_pong('"pong"'))
+        self.assertFalse(is_pong('{"type": "typing"}'))
+
+
+@database_sync_to_async
+def create_user(username, connection_code):
+    return User.objects.create_user(
+        username=username, email=f"{username}@example.com",
+        connection_code=connection_code, password="testpass")
+
+
+async def connect(user):
+    communicator = WebsocketCommunicator(
+        URLRouter(relationship_ws_urlpatterns), "/ws/relationship-requests/")
+    communicator.scope["user"] = user
+    connected, _ = await communicator.connect()
+    assert connected
+    await communicator.receive_from()  # Connected!
+    return communicator
+
+
+@pytest.mark.asyncio
+class TestHeartbeat(TransactionTestCase):
+    def setUp(self):
+        self.settings = (heartbeat.interval, heartbeat.timeout, heartbeat.group_refresh)
+        heartbeat.interval, heartbeat.timeout, heartbeat.group_refresh = 0.05, 0.2, 0
+
+    def tearDown(self):
+        heartbeat.interval, heartbeat.timeout, heartbeat.group_refresh = self.settings
+
+    @pytest.mark.asyncio
+    async def test_pongs_keep_the_socket_open(self):
+        """Test answered pings keep the socket alive and pongs are not echoed"""
+        communicator = await connect(await create_user("beat1", "BEAT01"))
+
+        for _ in range(8):
+            assert json.loads(await communicator.receive_from()) == {"type": "ping"}
+            await communicator.send_to(text_data=json.dumps({"type": "pong"}))
+
+        await communicator.disconnect()
+
+    @pytest.mark.asyncio
+    async def test_silent_socket_is_reaped(self):
+        """Test a socket that never answers leaves its groups and is closed"""
+        reaped = metrics.connections_reaped_total.get(consumer="RelationshipConsumer")
+        users = metrics.group_memberships.get(group_type="user")
+        communicator = await connect(await create_user("beat2", "BEAT02"))
+        assert metrics.group_memberships.get(group_type="user") == users + 1
+
+        output = await communicator.receive_output(timeout=1)
+        while output["type"] == "websocket.send":
+            output = await communicator.receive_output(timeout=1)
+
+        assert output == {"type": "websocket.close", "code": heartbeat.close_code}
+        assert metrics.connections_reaped_total.get(consumer="RelationshipConsumer") == reaped + 1
+        assert metrics.group_memberships.get(group_type="user") == users
+        await communicator.disconnect()
+
+    @pytest.mark.asyncio
+    async def test_live_sockets_refresh_their_groups(self):
+        """Test memberships of live sockets outlast the layer's group_expiry"""
+        layer = get_channel_layer()
+        group_expiry = layer.group_expiry
+        layer.group_expiry = 1
+        heartbeat.group_refresh = 0.3
+        user = await create_user("beat3", "BEAT03")
+        stale = await layer.new_channel()
+        await layer.group_add(user_group(user.id), stale)
+        communicator = await connect(user)
+        try:
+            deadline = asyncio.get_running_loop().time() + 3
+            while asyncio.get_running_loop().time() < deadline:
+                await communicator.receive_from()
+                await communicator.send_to(text_data=json.dumps({"type": "pong"}))
+            layer._clean_expired()
+
+            members = layer.groups[user_group(user.id)]
+            assert stale not in members
+            assert len(members) == 1
+        finally:
+            layer.group_expiry = group_expiry
+            await communicator.disconnect()
@@ -0,0 +1,115 @@
+import json
+from datetime import date
+
+import pytest
+from channels.db import database_sync_to_async
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TransactionTestCase, override_settings
+
+from apps.Chat.routing import chat_ws_urlpatterns
+from services.websocket import metrics
+from services.websocket.presence import presence
+
+User = get_user_model()
+
+
+@database_sync_to_async
+def create_couple(prefix):
+    from apps.Chat.models import Chat
+    from apps.Relationships.models import Relationship
+
+    users = [
+        User.objects.create_user(
+            username=f"{prefix}{side}", email=f"{prefix}{side}@example.com",
+            connection_code=f"{prefix}{side}".upper(), password="testpass")
+        for side in "ab"
+    ]
+    relationship = Relationship.objects.create(
+        user_one=users[0], user_two=users[1], relationship_start_date=date.today())
+    return users, Chat.objects.get(relationship=relationship)
+
+
+async def connect(user, chat):
+    communicator = WebsocketCommunicator(
+        URLRouter(chat_ws_urlpatterns), f"/ws/chat/{chat.id}/")
+    communicator.scope["user"] = user
+    connected, _ = await communicator.connect()
+    assert connected
+    return communicator
+
+
+async def statuses(communicator, user, timeout=0.3):
+    """The user_status frames about ``user`` received within ``timeout``."""
+    received = []
+    while not await communicator.receive_nothing(timeout=timeout):
+        data = json.loads(await communicator.receive_from())
+        if data.get("type") == "user_status" and data["message"]["user_id"] == str(user.id):
+            received.append(data["message"]["online"])
+    return received
+
+
+@override_settings(CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}})
+@pytest.mark.asyncio
+class TestPresence(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.grace = presence.grace
+        presence.grace = 0.5
+
+    def tearDown(self):
+        presence.grace = self.grace
+
+    @pytest.mark.asyncio
+    async def test_devices_are_aggregated(self):
+        """Test a second device announces nothing and the user stays online until the last one closes"""
+        (user, partner), chat = await create_couple("pres1")
+        observer = await connect(partner, chat)
+        phone = await connect(user, chat)
+        assert await statuses(observer, user) == [True]
+
+        suppressed = metrics.presence_suppressed_total.get(online="true")
+        laptop = await connect(user, chat)
+        assert await statuses(observer, user) == []
+        assert metrics.presence_suppressed_total.get(online="true") == suppressed + 1
+
+        await phone.disconnect()
+        assert await statuses(observer, user, timeout=1) == []
+        assert await cache.aget(presence.online_key(user.id))
+
+        await laptop.disconnect()
+        assert await statuses(observer, user, timeout=1) == [False]
+        assert await cache.aget(presence.online_key(user.id)) is None
+        await observer.disconnect()
+
+    @pytest.mark.asyncio
+    async def test_reconnect_within_grace_period_is_silent(self):
+        """Test a flapping connection produces no user_status at all"""
+        (user, partner), chat = await create_couple("pres2")
+        observer = await connect(partner, chat)
+        socket = await connect(user, chat)
+        assert await statuses(observer, user) == [True]
+
+        for _ in range(3):
+            await socket.disconnect()
+            socket = await connect(user, chat)
+        assert await statuses(observer, user, timeout=1) == []
+
+        await socket.disconnect()
+        assert await statuses(observer, user, timeout=1) == [False]
+        await observer.disconnect()
+
+    def test_offline_race_keeps_the_user_online(self):
+        """Test a socket opened while the last one is being settled keeps the flag"""
+        presence.connect("race")
+        presence.disconnect("race")
+        presence.connect("race")  # flag already set: no announcement
+
+        assert not presence.go_offline("race")
+        assert cache.get(presence.online_key("race"))
+        presence.disconnect("race")
+        assert presence.go_offline("race")
+        # Only one worker announces
+        assert not presence.go_offline("race")
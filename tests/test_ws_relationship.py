@@ -24,11 +24,11 @@ def create_test_user_with_username(username, connection_code):
 
 @database_sync_to_async
 def create_relationship_request(requester, receiver):
-    from apps.Relationships.models import RelationshipRequest
+    from apps.Relationships.models import RelationshipRequest, Status
     return RelationshipRequest.objects.create(
         requester=requester,
         receiver=receiver,
-        status="PENDING"
+        status=Status.PENDING
     )
 
 
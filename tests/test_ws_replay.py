@@ -0,0 +1,134 @@
+import json
+import time
+from unittest import mock
+
+import pytest
+from channels.db import database_sync_to_async
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase, TransactionTestCase
+from rest_framework.test import APIClient
+
+from apps.Relationships.routing import relationship_ws_urlpatterns
+from services.websocket.replay import ReplayLog
+
+User = get_user_model()
+
+
+class ReplayLogTests(SimpleTestCase):
+    """Test the per-user replay log"""
+
+    def setUp(self):
+        cache.clear()
+        self.log = ReplayLog(max_events=3, ttl=60)
+
+    def test_events_are_sequence_numbered(self):
+        first = self.log.record("u1", "relationship_request_notification", {"message": "a"})
+        second = self.log.record("u1", "relationship_request_notification", {"message": "b"})
+        other = self.log.record("u2", "relationship_request_notification", {"message": "c"})
+
+        self.assertEqual(first["content"]["seq"], 1)
+        self.assertEqual(second["content"]["seq"], 2)
+        self.assertEqual(other["content"]["seq"], 1)
+        self.assertEqual(self.log.last_seq("u1"), 2)
+
+    def test_events_since_returns_only_newer_events(self):
+        for message in "abc":
+            self.log.record("u1", "relationship_request_notification", {"message": message})
+
+        events = self.log.events_since("u1", 1)
+        self.assertEqual([e["content"]["message"] for e in events], ["b", "c"])
+        self.assertEqual(self.log.events_since("u1", 3), [])
+        self.assertEqual(self.log.events_since("unknown", 0), [])
+
+    def test_log_is_bounded(self):
+        for message in "abcde":
+            self.log.record("u1", "relationship_request_notification", {"message": message})
+
+        events = self.log.events_since("u1", 0)
+        self.assertEqual([e["content"]["seq"] for e in events], [3, 4, 5])
+        self.assertIsNone(cache.get("ws_replay_u1_1"))
+
+    def test_sequence_outlives_the_events(self):
+        """Test numbering continues after the events have expired"""
+        self.log.record("u1", "relationship_request_notification", {"message": "a"})
+        self.log.record("u1", "relationship_request_notification", {"message": "b"})
+
+        later = time.time() + 3600
+        with mock.patch("django.core.cache.backends.locmem.time.time", return_value=later):
+            self.assertEqual(self.log.events_since("u1", 0), [])
+            event = self.log.record("u1", "relationship_request_notification", {"message": "c"})
+
+        self.assertEqual(event["content"]["seq"], 3)
+
+    def test_refuses_a_process_local_cache(self):
+        """Test workers cannot end up with separate logs"""
+        local = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+        with self.settings(CACHES=local, WS_REPLAY_LOG={}):
+            with self.assertRaises(ImproperlyConfigured):
+                ReplayLog.from_settings()
+        with self.settings(CACHES=local, WS_REPLAY_LOG={"ALLOW_LOCAL_CACHE": True}):
+            self.assertEqual(ReplayLog.from_settings().max_events, 100)
+
+
+@database_sync_to_async
+def create_user(username, connection_code, first_name):
+    return User.objects.create_user(
+        username=username, email=f"{username}@example.com",
+        connection_code=connection_code, password="testpass",
+        first_name=first_name)
+
+
+@database_sync_to_async
+def request_relationship(requester, connection_code):
+    client = APIClient()
+    client.force_authenticate(user=requester)
+    return client.post("/api/relationship/request/", {"connection_code": connection_code})
+
+
+@pytest.mark.asyncio
+class TestRelationshipReplay(TransactionTestCase):
+    @pytest.mark.asyncio
+    async def test_offline_user_catches_up_on_reconnect(self):
+        """Test a notification sent while offline is replayed from last_seq"""
+        cache.clear()
+        requester = await create_user("replay1", "RPLY01", "Alice")
+        receiver = await create_user("replay2", "RPLY02", "Bob")
+
+        response = await request_relationship(requester, "RPLY02")
+        assert response.status_code == 200
+
+        communicator = WebsocketCommunicator(
+            URLRouter(relationship_ws_urlpatterns),
+            "/ws/relationship-requests/?last_seq=0")
+        communicator.scope["user"] = receiver
+        connected, _ = await communicator.connect()
+        assert connected
+
+        assert json.loads(await communicator.receive_from())["message"] == "Connected!"
+        replayed = json.loads(await communicator.receive_from())
+        assert replayed["seq"] == 1
+        assert replayed["requester_id"] == str(requester.id)
+        assert await communicator.receive_nothing()
+
+        await communicator.disconnect()
+
+    @pytest.mark.asyncio
+    async def test_no_replay_without_last_seq(self):
+        cache.clear()
+        requester = await create_user("replay3", "RPLY03", "Carol")
+        receiver = await create_user("replay4", "RPLY04", "Dave")
+        await request_relationship(requester, "RPLY04")
+
+        communicator = WebsocketCommunicator(
+            URLRouter(relationship_ws_urlpatterns), "/ws/relationship-requests/")
+        communicator.scope["user"] = receiver
+        await communicator.connect()
+
+        assert json.loads(await communicator.receive_from())["message"] == "Connected!"
+        assert await communicator.receive_nothing()
+
+        await communicator.disconnect()
@@ -0,0 +1,123 @@
+import pytest
+from channels.db import database_sync_to_async
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.cache.backends.redis import RedisCache
+from django.test import SimpleTestCase, TransactionTestCase
+
+from apps.Relationships.routing import relationship_ws_urlpatterns
+from benchmarks.redis_servers import local_redis_servers, redis_server_available
+from services.socket_message import send_socket_message, user_group
+from services.websocket import metrics
+from services.websocket.subscribers import SubscriberRegistry, subscribers
+
+User = get_user_model()
+
+
+class SubscriberRegistryTests(SimpleTestCase):
+    """Test the per-group socket membership"""
+
+    def setUp(self):
+        cache.clear()
+        self.now = 1000.0
+        self.registry = SubscriberRegistry(ttl=60, timer=lambda: self.now)
+
+    def test_counts_follow_subscriptions(self):
+        self.registry.subscribe("user_1", "specific.a")
+        self.registry.subscribe("user_1", "specific.b")
+        self.registry.subscribe("user_1", "specific.b")
+        self.assertEqual(self.registry.count("user_1"), 2)
+
+        self.registry.unsubscribe("user_1", "specific.a")
+        self.assertTrue(self.registry.has_subscribers("user_1"))
+        self.registry.unsubscribe("user_1", "specific.b")
+        self.registry.unsubscribe("user_1", "specific.b")
+        self.assertEqual(self.registry.count("user_1"), 0)
+        self.assertFalse(self.registry.has_subscribers("user_1"))
+
+    def test_unknown_group_has_subscribers(self):
+        """Test a group never joined, or whose membership was lost, is published to"""
+        self.assertIsNone(self.registry.count("user_2"))
+        self.assertTrue(self.registry.has_subscribers("user_2"))
+        self.assertFalse(self.registry.has_live_subscribers("user_2"))
+
+        self.registry.subscribe("user_3", "specific.a")
+        self.registry.unsubscribe("user_3", "specific.a")
+        cache.clear()
+        self.registry.unsubscribe("user_3", "specific.b")
+        self.assertTrue(self.registry.has_subscribers("user_3"))
+
+    def test_unrefreshed_members_expire(self):
+        """Test a crashed worker's sockets drop out while refreshed ones stay"""
+        self.registry.subscribe("user_4", "specific.crashed")
+        self.registry.subscribe("user_4", "specific.alive")
+        self.now += 45
+        self.registry.refresh("user_4", "specific.alive")
+        self.now += 30
+
+        self.assertEqual(self.registry.count("user_4"), 1)
+        self.now += 60
+        self.assertEqual(self.registry.count("user_4"), 0)
+        self.assertFalse(self.registry.has_subscribers("user_4"))
+
+    def test_disabled_registry_always_publishes(self):
+        self.assertTrue(SubscriberRegistry(enabled=False).has_subscribers("user_5"))
+
+    def test_send_to_empty_group_is_skipped(self):
+        subscribers.subscribe("user_6", "specific.a")
+        subscribers.unsubscribe("user_6", "specific.a")
+        skipped = metrics.group_sends_skipped_total.get(group_type="user")
+        self.assertFalse(send_socket_message("user_6", "relationship_request_notification", {}))
+        self.assertEqual(metrics.group_sends_skipped_total.get(group_type="user"), skipped + 1)
+
+
+@pytest.mark.skipif(not redis_server_available(), reason="redis-server not installed")
+def test_redis_membership_is_shared_and_expires():
+    """Test the sorted set membership against a real Redis"""
+    with local_redis_servers(1, base_port=26579) as hosts:
+        host, port = hosts[0]
+        now = [1000.0]
+        workers = [
+            SubscriberRegistry(ttl=60, backend=RedisCache(f"redis://{host}:{port}/0", {}),
+                               timer=lambda: now[0])
+            for _ in range(2)]
+
+        assert workers[0].count("user_1") is None
+        workers[0].subscribe("user_1", "specific.a")
+        workers[1].subscribe("user_1", "specific.b")
+        assert workers[1].count("user_1") == 2
+
+        workers[0].unsubscribe("user_1", "specific.a")
+        now[0] += 90
+        assert workers[0].count("user_1") == 0
+        assert not workers[1].has_subscribers("user_1")
+
+
+@database_sync_to_async
+def create_user(username, connection_code):
+    return User.objects.create_user(
+        username=username, email=f"{username}@example.com",
+        connection_code=connection_code, password="testpass")
+
+
+@pytest.mark.asyncio
+class TestConsumerSubscriptions(TransactionTestCase):
+    @pytest.mark.asyncio
+    async def test_sockets_are_counted_while_open(self):
+        """Test connect and disconnect maintain the user group's count"""
+        user = await create_user("subs1", "SUBS01")
+        communicators = []
+        for _ in range(2):
+            communicator = WebsocketCommunicator(
+                URLRouter(relationship_ws_urlpatterns), "/ws/relationship-requests/")
+            communicator.scope["user"] = user
+            connected, _ = await communicator.connect()
+            assert connected
+            communicators.append(communicator)
+        assert await database_sync_to_async(subscribers.count)(user_group(user.id)) == 2
+
+        for communicator in communicators:
+            await communicator.disconnect()
+        assert not await subscribers.ahas_subscribers(user_group(user.id))
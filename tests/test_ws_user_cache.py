@@ -0,0 +1,157 @@
+from dataclasses import FrozenInstanceError
+
+import pytest
+from channels.db import database_sync_to_async
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.test import TestCase, TransactionTestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from services.ttl_cache import TTLCache
+from services.websocket.middleware import JWTAuthMiddleware
+from services.websocket.user_cache import CachedUser, UserCache, user_cache
+
+User = get_user_model()
+
+
+class FakeTimer:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TTLCacheTests(TestCase):
+    """Test the process-local TTL'd LRU"""
+
+    def test_get_and_set(self):
+        cache = TTLCache(max_size=2, ttl=10)
+        cache.set("a", 1)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("missing"))
+
+    def test_entries_expire(self):
+        timer = FakeTimer()
+        cache = TTLCache(max_size=2, ttl=10, timer=timer)
+        cache.set("a", 1)
+        timer.now = 9.9
+        self.assertEqual(cache.get("a"), 1)
+        timer.now = 10
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(len(cache), 0)
+
+    def test_least_recently_used_is_evicted(self):
+        cache = TTLCache(max_size=2, ttl=10)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertIn("a", cache)
+        self.assertNotIn("b", cache)
+        self.assertIn("c", cache)
+
+    def test_zero_size_disables_caching(self):
+        cache = TTLCache(max_size=0, ttl=10)
+        cache.set("a", 1)
+        self.assertIsNone(cache.get("a"))
+
+
+class UserCacheTests(TestCase):
+    """Test the minimal user record cache used during WebSocket handshakes"""
+
+    def setUp(self):
+        user_cache.clear()
+        self.user = User.objects.create_user(
+            username="cacheduser",
+            email="cached@example.com",
+            password="testpass",
+            connection_code="CACHE1",
+            first_name="Cached",
+        )
+
+    def test_second_lookup_skips_database(self):
+        cache = UserCache(max_size=10, ttl=60)
+        with self.assertNumQueries(1):
+            cache.get(self.user.id)
+        with self.assertNumQueries(0):
+            user = cache.get(self.user.id)
+
+        self.assertEqual(user.id, self.user.id)
+        self.assertEqual(user.first_name, "Cached")
+        self.assertTrue(user.is_authenticated)
+        self.assertFalse(hasattr(user, "password"))
+
+    def test_cached_users_cannot_be_saved(self):
+        """Test a cached record can never be written over the full row"""
+        user = UserCache(max_size=10, ttl=60).get(self.user.id)
+
+        self.assertIsInstance(user, CachedUser)
+        self.assertFalse(hasattr(user, "save"))
+        with self.assertRaises(FrozenInstanceError):
+            user.first_name = "Changed"
+
+    def test_unknown_user_returns_none(self):
+        cache = UserCache(max_size=10, ttl=60)
+        self.assertIsNone(cache.get("00000000-0000-0000-0000-000000000000"))
+
+    def test_save_invalidates_entry(self):
+        user_cache.get(self.user.id)
+        self.user.first_name = "Renamed"
+        self.user.save()
+
+        self.assertIsNone(user_cache.get_local(self.user.id))
+        self.assertEqual(user_cache.get(self.user.id).first_name, "Renamed")
+
+    def test_delete_invalidates_entry(self):
+        user_id = self.user.id
+        user_cache.get(user_id)
+        self.user.delete()
+
+        self.assertIsNone(user_cache.get_local(user_id))
+        self.assertIsNone(user_cache.get(user_id))
+
+    def test_shared_cache_backs_local_cache(self):
+        writer = UserCache(max_size=10, ttl=60, use_shared_cache=True)
+        reader = UserCache(max_size=10, ttl=60, use_shared_cache=True)
+        writer.get(self.user.id)
+
+        with self.assertNumQueries(0):
+            user = reader.get(self.user.id)
+        self.assertEqual(user.username, "cacheduser")
+        writer.invalidate(self.user.id)
+
+
+@pytest.mark.asyncio
+class TestJWTAuthMiddlewareUserCache(TransactionTestCase):
+    @pytest.mark.asyncio
+    async def test_handshake_populates_scope_user(self):
+        """Test the middleware resolves the token's user through the cache"""
+        user_cache.clear()
+        user = await database_sync_to_async(User.objects.create_user)(
+            username="wsuser", email="ws@example.com",
+            connection_code="WSUSR1", password="testpass")
+        token = str(AccessToken.for_user(user))
+        scopes = []
+
+        async def app(scope, receive, send):
+            scopes.append(scope)
+
+        middleware = JWTAuthMiddleware(app)
+        for _ in range(2):
+            await middleware(
+                {"type": "websocket", "query_string": f"token={token}".encode()},
+                None, None)
+
+        assert [scope["user"].id for scope in scopes] == [user.id, user.id]
+        assert user_cache.get_local(user.id) is not None
+
+    @pytest.mark.asyncio
+    async def test_handshake_without_token_is_anonymous(self):
+        scopes = []
+
+        async def app(scope, receive, send):
+            scopes.append(scope)
+
+        await JWTAuthMiddleware(app)({"type": "websocket"}, None, None)
+        assert isinstance(scopes[0]["user"], AnonymousUser)
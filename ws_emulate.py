@@ -1,24 +1,307 @@
+"""
+WebSocket client emulator and load generator for the realtime tier.
+
+    python ws_emulate.py listen                      # print the chat frames of USER_TWO_TOKEN / CHAT_ID
+    python ws_emulate.py listen --token-env USER_ONE_TOKEN --relationship
+    python ws_emulate.py load --couples 1000 --duration 60 --message-rate 0.2 --typing-rate 1
+    python ws_emulate.py cleanup                     # delete the synthetic couples
+
+``load`` creates N synthetic couples (users, relationship, chat) directly in
+the database configured for this checkout, so run it against a local stack.
+Both partners of every couple open a chat socket; each socket then sends
+chat messages and typing events as Poisson processes at the given per-socket
+rates. Every message carries its send time, so the frames fanned out to the
+couple give end-to-end delivery latency; frames that never arrive within
+``--drain`` seconds after the run are reported as dropped.
+"""
+
+import argparse
 import asyncio
+import json
 import os
+import random
+import resource
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
 
 import websockets
 from dotenv import load_dotenv
 
+from benchmarks.common import percentile, report
+
 load_dotenv(dotenv_path='.env')
-token = os.getenv('USER_TWO_TOKEN')
-chat_id = os.getenv('CHAT_ID')
-chat_uri = f"ws://localhost:8000/ws/chat/{chat_id}/?token={token}"
-relationship_uri = f"ws://localhost:8000/ws/relationship-requests/?token={token}"
+
+MESSAGE_MARKER = "load"
+PING = json.dumps({"type": "ping"})
+PONG = json.dumps({"type": "pong"})
 
 
-async def listen():
-    async with websockets.connect(
-        chat_uri,
-        origin="http://localhost:8000"
-    ) as websocket:
+async def listen(uri, origin):
+    async with websockets.connect(uri, origin=origin) as websocket:
         print("Connected to WebSocket.")
         while True:
             msg = await websocket.recv()
+            if msg == PING:
+                # Answer the server heartbeat so the socket is not reaped
+                await websocket.send(PONG)
+                continue
             print("Received:", msg)
 
-asyncio.run(listen())
+
+def setup_django():
+    import django
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mcda_api_project.settings')
+    django.setup()
+
+
+def seed_couples(count, prefix):
+    """Create (or reuse) ``count`` couples; return ``[(chat_id, [(user_id, token), ...])]``."""
+    setup_django()
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    from apps.Account.models import Users
+    from apps.Chat.models import Chat
+    from apps.Relationships.models import Relationship
+
+    users = {user.username: user for user in Users.objects.filter(username__startswith=prefix)}
+    chats = {chat.user_one_id: chat for chat in Chat.objects.filter(user_one__username__startswith=prefix)}
+
+    couples = []
+    for i in range(count):
+        pair = []
+        for side in "ab":
+            username = f"{prefix}{i}{side}"
+            user = users.get(username)
+            if user is None:
+                user = Users(
+                    username=username, email=f"{username}@loadtest.invalid",
+                    connection_code=username.upper(), first_name=username)
+                user.set_unusable_password()
+                user.save()
+            pair.append(user)
+
+        chat = chats.get(pair[0].id)
+        if chat is None:
+            relationship = Relationship.objects.create(user_one=pair[0], user_two=pair[1])
+            chat = Chat.objects.get(relationship=relationship)
+        couples.append((str(chat.id), [(str(user.id), str(AccessToken.for_user(user))) for user in pair]))
+    return couples
+
+
+def delete_couples(prefix):
+    setup_django()
+    from apps.Account.models import Users
+
+    deleted, _ = Users.objects.filter(username__startswith=prefix).delete()
+    print(f"Deleted {deleted} rows")
+
+
+def raise_open_file_limit(sockets):
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    wanted = sockets + 256
+    if soft < wanted:
+        limit = wanted if hard == resource.RLIM_INFINITY else min(wanted, hard)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (limit, hard))
+        if limit < wanted:
+            print(f"Open file limit is {limit}; some of the {sockets} sockets will fail")
+
+
+@dataclass
+class Stats:
+    connect_latencies: list = field(default_factory=list)
+    connect_failures: int = 0
+    disconnects: int = 0
+    # (sender, seq) -> number of sockets in the chat when it was sent
+    expected: dict = field(default_factory=dict)
+    delivered: int = 0
+    latencies: list = field(default_factory=list)
+    typing_expected: int = 0
+    typing_delivered: int = 0
+    # chat id -> open sockets
+    open_sockets: dict = field(default_factory=lambda: defaultdict(int))
+
+
+class LoadClient:
+    def __init__(self, stats, uri, origin, chat_id, user_id):
+        self.stats = stats
+        self.uri = uri
+        self.origin = origin
+        self.chat_id = chat_id
+        self.user_id = user_id
+        self.websocket = None
+        self.seq = 0
+
+    async def connect(self, semaphore):
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                self.websocket = await websockets.connect(
+                    self.uri, origin=self.origin, open_timeout=30, max_queue=None)
+                await self.websocket.recv()  # Connected!
+            except Exception:
+                self.stats.connect_failures += 1
+                self.websocket = None
+                return
+            self.stats.connect_latencies.append(time.perf_counter() - start)
+            self.stats.open_sockets[self.chat_id] += 1
+
+    async def read(self):
+        try:
+            async for raw in self.websocket:
+                frame = json.loads(raw)
+                if frame.get("type") == "ping":
+                    await self.websocket.send(PONG)
+                elif frame.get("type") == "new_message_notification":
+                    self.on_message(frame["message"]["chat_message"])
+                elif frame.get("type") == "typing_status":
+                    self.stats.typing_delivered += 1
+        except websockets.ConnectionClosed:
+            pass
+
+    def on_message(self, payload):
+        parts = str(payload).split(" ")
+        if len(parts) != 4 or parts[0] != MESSAGE_MARKER:
+            return
+        _, sender, seq, sent_at = parts
+        if (sender, seq) in self.stats.expected:
+            self.stats.delivered += 1
+            self.stats.latencies.append(time.perf_counter() - float(sent_at))
+
+    async def send(self, payload):
+        try:
+            await self.websocket.send(json.dumps(payload))
+            return True
+        except websockets.ConnectionClosed:
+            self.stats.disconnects += 1
+            return False
+
+    @staticmethod
+    async def wait_next(deadline, rate):
+        """Sleep until the next event of a Poisson process; False once past ``deadline``."""
+        delay = random.expovariate(rate)
+        remaining = deadline - time.perf_counter()
+        await asyncio.sleep(max(0, min(delay, remaining)))
+        return delay < remaining
+
+    async def send_messages(self, deadline, rate):
+        while rate > 0 and await self.wait_next(deadline, rate):
+            self.seq += 1
+            key = (self.user_id, str(self.seq))
+            self.stats.expected[key] = self.stats.open_sockets[self.chat_id]
+            sent = await self.send({
+                "type": "new_message_notification",
+                "chat_id": self.chat_id,
+                "sender": self.user_id,
+                "message": f"{MESSAGE_MARKER} {self.user_id} {self.seq} {time.perf_counter()}",
+            })
+            if not sent:
+                self.stats.expected.pop(key)
+                return
+
+    async def send_typing(self, deadline, rate):
+        while rate > 0 and await self.wait_next(deadline, rate):
+            self.stats.typing_expected += self.stats.open_sockets[self.chat_id]
+            if not await self.send({"type": "typing", "chat_id": self.chat_id, "is_typing": True}):
+                return
+
+
+async def run_load(args, couples):
+    stats = Stats()
+    clients = [
+        LoadClient(stats, f"{args.url}/ws/chat/{chat_id}/?token={token}", args.origin, chat_id, user_id)
+        for chat_id, members in couples for user_id, token in members
+    ]
+
+    semaphore = asyncio.Semaphore(args.connect_concurrency)
+    start = time.perf_counter()
+    await asyncio.gather(*(client.connect(semaphore) for client in clients))
+    report("connect", len(stats.connect_latencies), time.perf_counter() - start,
+           stats.connect_latencies)
+    if stats.connect_failures:
+        print(f"  {stats.connect_failures} sockets failed to connect")
+
+    connected = [client for client in clients if client.websocket is not None]
+    readers = [asyncio.create_task(client.read()) for client in connected]
+
+    start = time.perf_counter()
+    deadline = start + args.duration
+    await asyncio.gather(*(
+        coroutine for client in connected for coroutine in (
+            client.send_messages(deadline, args.message_rate),
+            client.send_typing(deadline, args.typing_rate),
+        )
+    ))
+    elapsed = time.perf_counter() - start
+
+    # Give in-flight frames a chance to arrive before counting drops
+    expected = sum(stats.expected.values())
+    drain_deadline = time.perf_counter() + args.drain
+    while stats.delivered < expected and time.perf_counter() < drain_deadline:
+        await asyncio.sleep(0.1)
+
+    for client in connected:
+        await client.websocket.close()
+    await asyncio.gather(*readers, return_exceptions=True)
+
+    report("messages delivered", stats.delivered, elapsed, stats.latencies)
+    if stats.latencies:
+        print(f"  p90 {percentile(stats.latencies, 90) * 1000:.2f}ms"
+              f"  max {max(stats.latencies) * 1000:.2f}ms")
+    dropped = expected - stats.delivered
+    print(f"  {len(stats.expected)} sent, {expected} frames expected, {dropped} dropped"
+          f" ({dropped / expected * 100 if expected else 0:.2f}%)")
+    typing_dropped = stats.typing_expected - stats.typing_delivered
+    print(f"typing: {stats.typing_expected} frames expected, {typing_dropped} dropped")
+    if stats.disconnects:
+        print(f"{stats.disconnects} sockets closed by the server during the run")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command")
+
+    listen_parser = commands.add_parser("listen", help="print the frames of one socket")
+    listen_parser.add_argument("--token-env", default="USER_TWO_TOKEN")
+    listen_parser.add_argument("--relationship", action="store_true",
+                               help="listen to relationship requests instead of the chat")
+
+    load_parser = commands.add_parser("load", help="run a multi-client load test")
+    load_parser.add_argument("--couples", type=int, default=100)
+    load_parser.add_argument("--duration", type=float, default=30, help="seconds")
+    load_parser.add_argument("--message-rate", type=float, default=0.2,
+                             help="chat messages per second per socket")
+    load_parser.add_argument("--typing-rate", type=float, default=1.0,
+                             help="typing events per second per socket")
+    load_parser.add_argument("--drain", type=float, default=5, help="seconds to wait for late frames")
+    load_parser.add_argument("--connect-concurrency", type=int, default=200)
+    load_parser.add_argument("--prefix", default="loadtest")
+
+    cleanup_parser = commands.add_parser("cleanup", help="delete the synthetic couples")
+    cleanup_parser.add_argument("--prefix", default="loadtest")
+
+    for sub in (listen_parser, load_parser):
+        sub.add_argument("--url", default="ws://localhost:8000")
+        sub.add_argument("--origin", default="http://localhost:8000")
+
+    args = parser.parse_args()
+    if args.command in (None, "listen"):
+        url = getattr(args, "url", "ws://localhost:8000")
+        origin = getattr(args, "origin", "http://localhost:8000")
+        token = os.getenv(getattr(args, "token_env", "USER_TWO_TOKEN"))
+        if getattr(args, "relationship", False):
+            uri = f"{url}/ws/relationship-requests/?token={token}"
+        else:
+            uri = f"{url}/ws/chat/{os.getenv('CHAT_ID')}/?token={token}"
+        asyncio.run(listen(uri, origin))
+    elif args.command == "load":
+        couples = seed_couples(args.couples, args.prefix)
+        raise_open_file_limit(len(couples) * 2)
+        asyncio.run(run_load(args, couples))
+    elif args.command == "cleanup":
+        delete_couples(args.prefix)
+
+
+if __name__ == "__main__":
+    main()